@@ -1,3 +1,4 @@
 from . import configurable_unit
 from . import configurable_unit_tag
 from . import configurable_unit_version
+from . import configurable_unit_version_closure
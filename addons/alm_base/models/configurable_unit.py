@@ -1,4 +1,7 @@
+from collections import defaultdict
+
 from odoo import api, models, fields, _
+from odoo.tools import SQL
 
 class ConfigurableUnit(models.Model):
     _name = 'alm.configurable.unit'
@@ -45,6 +48,12 @@ class ConfigurableUnit(models.Model):
         string=_('Versions'),
     )
 
+    latest_published_version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string=_('Latest Published Version'),
+        compute='_compute_latest_published_version',
+    )
+
     active = fields.Boolean(
         default=True,
     )
@@ -59,12 +68,58 @@ class ConfigurableUnit(models.Model):
 
     @api.depends('version_ids', 'version_ids.state')
     def _compute_counts(self):
+        version_counts = defaultdict(int)
+        bug_counts = defaultdict(int)
+        # В onchange записи новые: счётчики берутся по исходной записи
+        unit_ids = [unit_id for unit_id in self._origin.ids if unit_id]
+
+        if unit_ids:
+            for unit, state, count in self.env['alm.configurable.unit.version']._read_group(
+                [('unit_id', 'in', unit_ids)], ['unit_id', 'state'], ['__count'],
+            ):
+                version_counts[unit.id, state] = count
+
+            # Модель ошибок объявлена в alm_bug_tracker
+            if 'alm.bug' in self.env:
+                bug_counts.update(self._get_bug_counts(unit_ids))
+
+        for unit in self:
+            unit_id = unit._origin.id
+            unit.development_version_count = version_counts[unit_id, 'development']
+            unit.published_version_count = version_counts[unit_id, 'published']
+            unit.unsupported_version_count = version_counts[unit_id, 'unsupported']
+
+            unit.new_bug_count = bug_counts[unit_id, 'new']
+            unit.confirmed_bug_count = bug_counts[unit_id, 'confirmed']
+            unit.fixed_bug_count = bug_counts[unit_id, 'fixed']
+
+    def _get_bug_counts(self, unit_ids):
+        """Число различных ошибок по (единица, состояние), зарегистрированных в ее версиях"""
+        Bug = self.env['alm.bug']
+        Bug.flush_model(['state', 'reported_in_version_ids'])
+        self.env['alm.configurable.unit.version'].flush_model(['unit_id'])
+        field = Bug._fields['reported_in_version_ids']
+        self.env.cr.execute(SQL("""
+            SELECT v.unit_id, b.state, count(DISTINCT b.id)
+              FROM %(bug_table)s b
+              JOIN %(relation)s rel ON rel.%(bug_col)s = b.id
+              JOIN %(version_table)s v ON v.id = rel.%(version_col)s
+             WHERE v.unit_id = ANY(%(unit_ids)s)
+             GROUP BY v.unit_id, b.state
+        """,
+            bug_table=SQL.identifier(Bug._table),
+            relation=SQL.identifier(field.relation),
+            bug_col=SQL.identifier(field.column1),
+            version_col=SQL.identifier(field.column2),
+            version_table=SQL.identifier(self.env['alm.configurable.unit.version']._table),
+            unit_ids=unit_ids,
+        ))
+        return {(unit_id, state): count for unit_id, state, count in self.env.cr.fetchall()}
+
+    @api.depends('version_ids.state', 'version_ids.name')
+    def _compute_latest_published_version(self):
+        unit_ids = [unit_id for unit_id in self._origin.ids if unit_id]
+        latest = self.env['alm.configurable.unit.version']._get_latest_versions(unit_ids, state='published')
+        latest_by_unit = {version.unit_id.id: version for version in latest}
         for unit in self:
-            unit.development_version_count = len(unit.version_ids.filtered(lambda v: v.state == 'development'))
-            unit.published_version_count = len(unit.version_ids.filtered(lambda v: v.state == 'published'))
-            unit.unsupported_version_count = len(unit.version_ids.filtered(lambda v: v.state == 'unsupported'))
-
-            bugs = self.env['alm.bug'].search([('reported_in_version_ids', 'in', unit.version_ids.ids)])
-            unit.new_bug_count = len(bugs.filtered(lambda b: b.state == 'new'))
-            unit.confirmed_bug_count = len(bugs.filtered(lambda b: b.state == 'confirmed'))
-            unit.fixed_bug_count = len(bugs.filtered(lambda b: b.state == 'fixed'))
+            unit.latest_published_version_id = latest_by_unit.get(unit._origin.id, False)
@@ -1,11 +1,18 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL, create_index
 import re
 
+# Поддерживаем форматы: X, X.Y, X.Y.Z, X.Y.Z.BUILD
+VERSION_PATTERN = r'^(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:\.(\d+))?$'
+
+# Компоненты версии хранятся в колонках int4
+MAX_VERSION_COMPONENT = 2**31 - 1
+
 class ConfigurableUnitVersion(models.Model):
     _name = 'alm.configurable.unit.version'
     _description = 'ALM Configurable Unit Version'
-    _order = 'name desc'
+    _order = 'version_major desc, version_minor desc, version_patch desc, version_build desc, name desc'
     _inherit = ['mail.thread', 'mail.activity.mixin']
 
     name = fields.Char(
@@ -59,19 +66,90 @@ class ConfigurableUnitVersion(models.Model):
         string=_('Included In'),
     )
 
+    # Разобранные компоненты версии для сортировки и сравнения средствами БД
+    version_major = fields.Integer(
+        string=_('Major'),
+        compute='_compute_version_parts',
+        store=True,
+    )
+
+    version_minor = fields.Integer(
+        string=_('Minor'),
+        compute='_compute_version_parts',
+        store=True,
+    )
+
+    version_patch = fields.Integer(
+        string=_('Patch'),
+        compute='_compute_version_parts',
+        store=True,
+    )
+
+    version_build = fields.Integer(
+        string=_('Build'),
+        compute='_compute_version_parts',
+        store=True,
+    )
+
+    version_is_valid = fields.Boolean(
+        string=_('Valid Version Format'),
+        compute='_compute_version_parts',
+        store=True,
+    )
+
     _sql_constraints = [
         ('unit_id_name_uniq', 'unique (unit_id, name)', _("Version must be unique per configurable unit!"))
     ]
 
+    def init(self):
+        create_index(
+            self.env.cr,
+            'alm_configurable_unit_version_parsed_key_idx',
+            self._table,
+            ['unit_id', 'version_major DESC', 'version_minor DESC', 'version_patch DESC', 'version_build DESC'],
+        )
+
+    @api.depends('name')
+    def _compute_version_parts(self):
+        for version in self:
+            parts = self._parse_version(version.name)
+            if parts and max(parts) > MAX_VERSION_COMPONENT:
+                # Не помещается в колонку; такое имя отклоняет _check_version_component_range
+                parts = None
+            version.version_is_valid = bool(parts)
+            version.version_major, version.version_minor, version.version_patch, version.version_build = parts or [0, 0, 0, 0]
+
+    @api.constrains('name')
+    def _check_version_component_range(self):
+        for version in self:
+            parts = self._parse_version(version.name)
+            if parts and max(parts) > MAX_VERSION_COMPONENT:
+                raise ValidationError(_(
+                    "Version %s is invalid: each version component must not exceed %s."
+                ) % (version.name, MAX_VERSION_COMPONENT))
+
+    @api.model
+    def _get_latest_versions(self, unit_ids, state=None):
+        """Возвращает последнюю версию каждой конфигурационной единицы одним запросом по индексу"""
+        if not unit_ids:
+            return self.browse()
+        self.flush_model(['unit_id', 'state', 'version_major', 'version_minor', 'version_patch', 'version_build'])
+        state_clause = SQL("AND state = %s", state) if state else SQL()
+        self.env.cr.execute(SQL("""
+            SELECT DISTINCT ON (unit_id) id
+              FROM %(table)s
+             WHERE unit_id = ANY(%(unit_ids)s) %(state_clause)s
+             ORDER BY unit_id, version_major DESC, version_minor DESC, version_patch DESC, version_build DESC
+        """, table=SQL.identifier(self._table), unit_ids=list(unit_ids), state_clause=state_clause))
+        return self.browse(row[0] for row in self.env.cr.fetchall())
+
     @api.model
     def _parse_version(self, version_str):
         """Парсит строку версии на компоненты"""
         if not version_str:
             return None
         
-        # Поддерживаем форматы: X, X.Y, X.Y.Z, X.Y.Z.BUILD
-        pattern = r'^(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:\.(\d+))?$'
-        match = re.match(pattern, version_str)
+        match = re.match(VERSION_PATTERN, version_str)
         if not match:
             return None
         
@@ -81,101 +159,107 @@ class ConfigurableUnitVersion(models.Model):
             parts.append(0)
         return parts
 
-    def _check_version_compatibility(self, version1, version2):
-        """Проверяет совместимость версий до 3-го разряда включительно"""
-        v1_parts = self._parse_version(version1)
-        v2_parts = self._parse_version(version2)
-        
-        if not v1_parts or not v2_parts:
-            return False
-        
-        # Сравниваем первые 3 компонента (мажорная, минорная, патч версии)
-        return v1_parts[0] == v2_parts[0] and v1_parts[1] == v2_parts[1] and v1_parts[2] == v2_parts[2]
+    def _validate_fields(self, field_names, excluded_names=()):
+        field_names = set(field_names)
+        if field_names & {'includes_ids', 'included_in_ids'}:
+            # Замыкание должно быть актуальным до запуска ограничений
+            self.env['alm.configurable.unit.version.closure']._refresh_closure(self.ids)
+        return super()._validate_fields(field_names, excluded_names)
 
-    def _get_all_dependencies(self, visited=None):
+    def unlink(self):
+        closure = self.env['alm.configurable.unit.version.closure']
+        ancestor_ids = closure._get_ancestor_ids(self.ids) - set(self.ids)
+        res = super().unlink()
+        closure._refresh_closure(ancestor_ids)
+        return res
+
+    def _get_all_dependencies(self):
         """Возвращает все зависимости (прямые и непрямые) БЕЗ самой версии"""
-        if visited is None:
-            visited = set()
-        
-        if self.id in visited:
-            return visited
-        
-        visited.add(self.id)
-        for dependency in self.includes_ids:
-            # Рекурсивно собираем зависимости зависимостей
-            dependency._get_all_dependencies(visited)
-        return visited - {self.id}  # Исключаем саму версию
-
-    def _check_unit_version_conflicts(self, new_dependency):
-        """Проверяет конфликты версий для одной конфигурационной единицы"""
-        # Получаем ID всех существующих зависимостей (без самой версии)
-        all_dependency_ids = self._get_all_dependencies()
-        # Преобразуем ID в рекордсет
-        all_dependencies = self.browse(all_dependency_ids)
-        
-        # Находим все версии той же единицы что и новая зависимость
-        same_unit_versions = all_dependencies.filtered(
-            lambda v: v.unit_id == new_dependency.unit_id
-        )
-        
-        # Если это первая версия этой единицы в зависимостях - конфликтов нет
-        if not same_unit_versions:
-            return None
-        
-        # Проверяем совместимость новой зависимости с уже существующими версиями этой единицы
-        for existing_version in same_unit_versions:
-            if not self._check_version_compatibility(existing_version.name, new_dependency.name):
-                return (existing_version, new_dependency)
-        
-        return None
+        return self.env['alm.configurable.unit.version.closure']._get_descendant_ids(self.ids) - set(self.ids)
+
+    def _get_all_dependents(self):
+        """Возвращает все версии, которые включают данную (прямо или косвенно), БЕЗ самой версии"""
+        return self.env['alm.configurable.unit.version.closure']._get_ancestor_ids(self.ids) - set(self.ids)
+
+    def _get_includes_conflicts(self):
+        """
+        Находит все конфликты версий в зависимостях одним запросом.
+        Версии группируются по конфигурационной единице и ключу X.Y.Z;
+        возвращает список кортежей (версия, единица, конфликтующие версии).
+        """
+        if not self.ids:
+            return []
+        self.flush_model(['unit_id', 'version_major', 'version_minor', 'version_patch', 'version_is_valid'])
+        self.env.cr.execute(SQL("""
+            SELECT c.ancestor_id, v.unit_id, array_agg(DISTINCT v.id)
+              FROM %(closure)s c
+              JOIN %(table)s v ON v.id = c.descendant_id
+             WHERE c.ancestor_id = ANY(%(ids)s)
+               AND c.descendant_id != c.ancestor_id
+             GROUP BY c.ancestor_id, v.unit_id
+            HAVING count(DISTINCT v.id) > 1
+               AND (bool_or(NOT v.version_is_valid)
+                    OR count(DISTINCT (v.version_major, v.version_minor, v.version_patch)) > 1)
+        """,
+            closure=SQL.identifier(self.env['alm.configurable.unit.version.closure']._table),
+            table=SQL.identifier(self._table),
+            ids=self.ids,
+        ))
+        return [
+            (self.browse(version_id), self.env['alm.configurable.unit'].browse(unit_id), self.browse(conflict_ids))
+            for version_id, unit_id, conflict_ids in self.env.cr.fetchall()
+        ]
 
     @api.constrains('includes_ids')
     def _check_includes_compatibility(self):
         """Проверяет совместимость версий одной конфигурационной единицы в зависимостях"""
-        for version in self:
-            for included_version in version.includes_ids:
-                # Проверяем нет ли конфликтов с уже существующими зависимостями
-                conflict = version._check_unit_version_conflicts(included_version)
-                if conflict:
-                    existing, new = conflict
-                    raise ValidationError(_(
-                        "Version conflict detected! Cannot include %s (%s) because "
-                        "version %s (%s) is already included and they are not compatible. "
-                        "Versions of the same configurable unit must match in first 3 components (X.Y.Z)."
-                    ) % (new.unit_id.name, new.name, existing.unit_id.name, existing.name))
+        conflicts = self._get_includes_conflicts()
+        if conflicts:
+            details = "\n".join(
+                "%s: %s -> %s (%s)" % (
+                    version.unit_id.name, version.name, unit.name,
+                    ", ".join(sorted(conflict_versions.mapped('name'))),
+                )
+                for version, unit, conflict_versions in conflicts
+            )
+            raise ValidationError(_(
+                "Version conflict detected! The following configurable units are included "
+                "in incompatible versions:\n%s\n"
+                "Versions of the same configurable unit must match in first 3 components (X.Y.Z)."
+            ) % details)
 
     def _check_cycles(self):
         """
-        Check for cycles for a set of starting nodes.
+        Check for cycles going through the given versions.
+        A single recursive CTE walks includes from self and stops as soon as
+        one of the starting versions is reached again.
         Returns True if a cycle is detected.
         """
-        visiting = set()
-        visited = set()
-
-        for record in self:
-            if record.id not in visited:
-                if record._has_cycle_dfs(visiting, visited):
-                    return True
-        return False
-
-    def _has_cycle_dfs(self, visiting, visited):
-        """
-        Recursive DFS helper.
-        """
-        visiting.add(self.id)
-
-        for dependency in self.includes_ids:
-            if dependency.id in visiting:
-                return True
-            if dependency.id not in visited:
-                if dependency._has_cycle_dfs(visiting, visited):
-                    return True
-
-        visiting.remove(self.id)
-        visited.add(self.id)
-        return False
+        if not self.ids:
+            return False
+        self.flush_model(['includes_ids', 'included_in_ids'])
+        field = self._fields['includes_ids']
+        self.env.cr.execute(SQL("""
+            WITH RECURSIVE reachable(root_id, version_id) AS (
+                SELECT %(parent_col)s, %(child_col)s
+                  FROM %(relation)s
+                 WHERE %(parent_col)s = ANY(%(ids)s)
+                UNION
+                SELECT r.root_id, rel.%(child_col)s
+                  FROM reachable r
+                  JOIN %(relation)s rel ON rel.%(parent_col)s = r.version_id
+                 WHERE r.version_id != r.root_id
+            )
+            SELECT 1 FROM reachable WHERE version_id = root_id LIMIT 1
+        """,
+            relation=SQL.identifier(field.relation),
+            parent_col=SQL.identifier(field.column1),
+            child_col=SQL.identifier(field.column2),
+            ids=self.ids,
+        ))
+        return bool(self.env.cr.rowcount)
 
-    @api.constrains('includes_ids')
+    @api.constrains('includes_ids', 'included_in_ids')
     def _check_no_cycles(self):
         """Проверяет отсутствие циклических зависимостей."""
         if self._check_cycles():
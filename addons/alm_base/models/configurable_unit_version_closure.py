@@ -0,0 +1,149 @@
+from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+
+class ConfigurableUnitVersionClosure(models.Model):
+    """Transitive closure of alm_configurable_unit_version_includes_rel.
+
+    One row per (ancestor, descendant) pair reachable through includes_ids,
+    with the length of the shortest path in ``depth``. Rows are maintained
+    with plain SQL by ``_refresh_closure`` and must not be edited by hand.
+    """
+    _name = 'alm.configurable.unit.version.closure'
+    _description = 'ALM Configurable Unit Version Dependency Closure'
+    _log_access = False
+    _order = 'depth, id'
+
+    ancestor_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string=_('Version'),
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    descendant_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string=_('Dependency'),
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    depth = fields.Integer(
+        string=_('Depth'),
+        required=True,
+    )
+
+    _ancestor_descendant_uniq = models.Constraint(
+        'unique (ancestor_id, descendant_id)',
+        "Dependency pair must be unique!",
+    )
+
+    def init(self):
+        # Первичное заполнение при установке/обновлении модуля
+        self.env.cr.execute(SQL("SELECT 1 FROM %s LIMIT 1", SQL.identifier(self._table)))
+        if not self.env.cr.rowcount:
+            self._refresh_closure(self._get_all_parent_version_ids())
+
+    def _get_includes_relation(self):
+        field = self.env['alm.configurable.unit.version']._fields['includes_ids']
+        return (
+            SQL.identifier(field.relation),
+            SQL.identifier(field.column1),
+            SQL.identifier(field.column2),
+        )
+
+    def _get_all_parent_version_ids(self):
+        relation, parent_col, _child_col = self._get_includes_relation()
+        self.env.cr.execute(SQL("SELECT DISTINCT %s FROM %s", parent_col, relation))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_descendant_ids(self, version_ids):
+        """All versions reachable from version_ids through includes_ids."""
+        if not version_ids:
+            return set()
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT descendant_id FROM %s WHERE ancestor_id = ANY(%s)",
+            SQL.identifier(self._table), list(version_ids),
+        ))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_ancestor_ids(self, version_ids):
+        """All versions that reach version_ids through includes_ids."""
+        if not version_ids:
+            return set()
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT ancestor_id FROM %s WHERE descendant_id = ANY(%s)",
+            SQL.identifier(self._table), list(version_ids),
+        ))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _refresh_closure(self, version_ids):
+        """Rebuild closure rows affected by a change of edges around version_ids.
+
+        Only versions whose set of dependencies may have changed are touched:
+        version_ids themselves and all their ancestors, both through the
+        stored closure (paths that may have been removed) and through the
+        relation table (paths that may have been added). Their rows are
+        rebuilt breadth-first, one INSERT ... SELECT per dependency level,
+        so the shortest depth wins and cycles terminate.
+        """
+        if not version_ids:
+            return
+        self.env['alm.configurable.unit.version'].flush_model(['includes_ids', 'included_in_ids'])
+        self.flush_model()
+
+        cr = self.env.cr
+        table = SQL.identifier(self._table)
+        relation, parent_col, child_col = self._get_includes_relation()
+        version_ids = list(version_ids)
+
+        cr.execute(SQL("""
+            WITH RECURSIVE affected(version_id) AS (
+                SELECT version_id FROM (
+                    SELECT unnest(%(ids)s::int[]) AS version_id
+                    UNION
+                    SELECT ancestor_id FROM %(table)s WHERE descendant_id = ANY(%(ids)s)
+                ) AS seed
+                UNION
+                SELECT rel.%(parent_col)s
+                  FROM %(relation)s rel
+                  JOIN affected a ON rel.%(child_col)s = a.version_id
+            )
+            SELECT version_id FROM affected
+        """, ids=version_ids, table=table, relation=relation, parent_col=parent_col, child_col=child_col))
+        affected_ids = [row[0] for row in cr.fetchall()]
+
+        cr.execute(SQL("DELETE FROM %s WHERE ancestor_id = ANY(%s)", table, affected_ids))
+        cr.execute(SQL("""
+            INSERT INTO %(table)s (ancestor_id, descendant_id, depth)
+            SELECT DISTINCT rel.%(parent_col)s, rel.%(child_col)s, 1
+              FROM %(relation)s rel
+             WHERE rel.%(parent_col)s = ANY(%(ids)s)
+        """, table=table, relation=relation, parent_col=parent_col, child_col=child_col, ids=affected_ids))
+
+        depth = 1
+        while cr.rowcount:
+            depth += 1
+            cr.execute(SQL("""
+                INSERT INTO %(table)s (ancestor_id, descendant_id, depth)
+                SELECT DISTINCT c.ancestor_id, rel.%(child_col)s, %(depth)s
+                  FROM %(table)s c
+                  JOIN %(relation)s rel ON rel.%(parent_col)s = c.descendant_id
+                 WHERE c.ancestor_id = ANY(%(ids)s)
+                   AND c.depth = %(prev_depth)s
+                   AND NOT EXISTS (
+                       SELECT 1 FROM %(table)s x
+                        WHERE x.ancestor_id = c.ancestor_id
+                          AND x.descendant_id = rel.%(child_col)s
+                   )
+            """, table=table, relation=relation, parent_col=parent_col, child_col=child_col,
+                ids=affected_ids, depth=depth, prev_depth=depth - 1))
+
+        self.invalidate_model()
@@ -3,3 +3,5 @@
 from . import test_configurable_unit
 from . import test_configurable_unit_version
 from . import test_dependencies
+from . import test_dependency_closure
+from . import test_configurable_unit_counts
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+class TestConfigurableUnitCounts(TransactionCase):
+
+    def setUp(self):
+        super(TestConfigurableUnitCounts, self).setUp()
+        self.Unit = self.env['alm.configurable.unit']
+        self.Version = self.env['alm.configurable.unit.version']
+
+        self.unit1 = self.Unit.create({'name': 'Unit 1', 'unit_type': 'configuration'})
+        self.unit2 = self.Unit.create({'name': 'Unit 2', 'unit_type': 'library'})
+        self.v1_0, self.v1_1, self.v2_0, self.v0_9 = self.Version.create([
+            {'name': '1.0.0', 'unit_id': self.unit1.id, 'state': 'published'},
+            {'name': '1.1.0', 'unit_id': self.unit1.id, 'state': 'published'},
+            {'name': '2.0.0', 'unit_id': self.unit1.id},
+            {'name': '0.9.0', 'unit_id': self.unit2.id, 'state': 'unsupported'},
+        ])
+
+    def test_version_counts_batched(self):
+        """Тест: счётчики версий вычисляются для всего набора записей"""
+        units = self.unit1 | self.unit2
+        units.invalidate_recordset()
+
+        self.assertEqual(self.unit1.published_version_count, 2)
+        self.assertEqual(self.unit1.development_version_count, 1)
+        self.assertEqual(self.unit1.unsupported_version_count, 0)
+        self.assertEqual(self.unit2.unsupported_version_count, 1)
+        self.assertEqual(self.unit2.published_version_count, 0)
+
+    def test_bug_counts(self):
+        """Тест: ошибка, зарегистрированная в нескольких версиях единицы, считается один раз"""
+        if 'alm.bug' not in self.env:
+            self.skipTest("alm_bug_tracker is not installed")
+        self.env['alm.bug'].create([
+            {'name': 'Bug 1', 'reported_in_version_ids': [(6, 0, [self.v1_0.id, self.v1_1.id])]},
+            {'name': 'Bug 2', 'state': 'confirmed', 'reported_in_version_ids': [(6, 0, [self.v1_0.id, self.v0_9.id])]},
+            {'name': 'Bug 3', 'state': 'fixed', 'reported_in_version_ids': [(6, 0, [self.v0_9.id])]},
+        ])
+        (self.unit1 | self.unit2).invalidate_recordset()
+
+        self.assertEqual(self.unit1.new_bug_count, 1)
+        self.assertEqual(self.unit1.confirmed_bug_count, 1)
+        self.assertEqual(self.unit1.fixed_bug_count, 0)
+        self.assertEqual(self.unit2.new_bug_count, 0)
+        self.assertEqual(self.unit2.confirmed_bug_count, 1)
+        self.assertEqual(self.unit2.fixed_bug_count, 1)
+
+    def test_latest_published_version(self):
+        """Тест: последняя опубликованная версия выбирается по числовым компонентам"""
+        self.assertEqual(self.unit1.latest_published_version_id, self.v1_1)
+        self.assertFalse(self.unit2.latest_published_version_id)
+
+        self.v2_0.state = 'published'
+        self.unit1.invalidate_recordset()
+        self.assertEqual(self.unit1.latest_published_version_id, self.v2_0)
+
+    def test_counts_in_onchange(self):
+        """Тест: в onchange (новая запись) значения берутся по исходной записи"""
+        draft = self.Unit.new({'name': 'Unit 1 (edited)'}, origin=self.unit1)
+
+        self.assertEqual(draft.published_version_count, 2)
+        self.assertEqual(draft.development_version_count, 1)
+        self.assertEqual(draft.latest_published_version_id, self.v1_1)
@@ -2,6 +2,7 @@
 
 from odoo.tests.common import TransactionCase
 from psycopg2 import IntegrityError
+from odoo.exceptions import ValidationError
 
 class TestConfigurableUnitVersion(TransactionCase):
     
@@ -144,3 +145,26 @@ class TestConfigurableUnitVersion(TransactionCase):
         # Attempt to include itself
         with self.assertRaises(IntegrityError): # Or ValidationError, depending on Odoo's internal handling
             version_config.write({'includes_ids': [(4, version_config.id)]})
+
+    def test_version_numeric_ordering(self):
+        """Тест: версии сортируются по числовым компонентам, а не лексически"""
+        Version = self.env['alm.configurable.unit.version']
+        unit = self.env['alm.configurable.unit'].create({'name': 'Lib A', 'unit_type': 'library'})
+        v9 = Version.create({'name': '9.0', 'unit_id': unit.id, 'state': 'published'})
+        v10 = Version.create({'name': '10.0', 'unit_id': unit.id, 'state': 'published'})
+        v10_dev = Version.create({'name': '10.1', 'unit_id': unit.id})
+
+        self.assertEqual((v10.version_major, v10.version_minor), (10, 0))
+        self.assertEqual(unit.version_ids[:3], v10_dev + v10 + v9)
+        self.assertEqual(unit.latest_published_version_id, v10)
+
+    def test_version_component_overflow(self):
+        """Тест: компонент версии больше int4 отклоняется ограничением, а не ошибкой БД"""
+        Version = self.env['alm.configurable.unit.version']
+        unit = self.env['alm.configurable.unit'].create({'name': 'Lib A', 'unit_type': 'library'})
+        with self.assertRaises(ValidationError):
+            Version.create({'name': '2024010112345.1', 'unit_id': unit.id})
+
+        version = Version.create({'name': '2147483647.1', 'unit_id': unit.id})
+        self.assertTrue(version.version_is_valid)
+        self.assertEqual(version.version_major, 2147483647)
@@ -111,30 +111,23 @@ class TestConfigurableUnitDependencies(TransactionCase):
             self.assertEqual(result, expected, f"Failed for version: {version_str}")
 
     def test_05_version_compatibility(self):
-        """Тест: проверка совместимости версий"""
+        """Тест: проверка совместимости версий (первые 3 компонента)"""
         version_model = self.env['one_c_alm.configurable.unit.version']
-        
+        trade_version = version_model.create({
+            'name': '11.5.4.112',
+            'unit_id': self.unit_trade.id,
+        })
+        bsp_1 = version_model.create({'name': '1.1.1.1', 'unit_id': self.unit_bsp.id})
+        bsp_2 = version_model.create({'name': '1.1.1.2', 'unit_id': self.unit_bsp.id})
+        bsp_3 = version_model.create({'name': '1.1.2.1', 'unit_id': self.unit_bsp.id})
+
         # Совместимые версии (первые 3 компонента одинаковы)
-        compatible_cases = [
-            ('1.1.1.1', '1.1.1.2'),
-            ('1.2.3.100', '1.2.3.200'),
-            ('1.0.0.1', '1.0.0.999'),
-        ]
-        
-        for v1, v2 in compatible_cases:
-            self.assertTrue(version_model._check_version_compatibility(v1, v2),
-                          f"Should be compatible: {v1} vs {v2}")
-        
+        trade_version.includes_ids = [(6, 0, (bsp_1 | bsp_2).ids)]
+        self.assertEqual(trade_version._get_includes_conflicts(), [])
+
         # Несовместимые версии (первые 3 компонента разные)
-        incompatible_cases = [
-            ('1.1.1.1', '1.1.2.1'),
-            ('1.2.3.100', '1.2.4.100'),
-            ('1.0.0.1', '2.0.0.1'),
-        ]
-        
-        for v1, v2 in incompatible_cases:
-            self.assertFalse(version_model._check_version_compatibility(v1, v2),
-                           f"Should be incompatible: {v1} vs {v2}")
+        with self.assertRaises(ValidationError):
+            trade_version.includes_ids = [(4, bsp_3.id)]
 
     def test_06_no_self_reference(self):
         """Тест: нельзя добавить зависимость на саму себя"""
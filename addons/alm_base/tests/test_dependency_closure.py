@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+from odoo.exceptions import ValidationError
+
+class TestDependencyClosure(TransactionCase):
+
+    def setUp(self):
+        super(TestDependencyClosure, self).setUp()
+        self.Unit = self.env['alm.configurable.unit']
+        self.Version = self.env['alm.configurable.unit.version']
+
+        self.platform = self.Version.create({
+            'name': '1.0.0',
+            'unit_id': self.Unit.create({'name': 'Platform', 'unit_type': 'configuration'}).id,
+        })
+        self.lib_a = self.Version.create({
+            'name': '2.0.0',
+            'unit_id': self.Unit.create({'name': 'Lib A', 'unit_type': 'library'}).id,
+        })
+        self.lib_b = self.Version.create({
+            'name': '3.0.0',
+            'unit_id': self.Unit.create({'name': 'Lib B', 'unit_type': 'library'}).id,
+        })
+
+    def test_01_transitive_dependencies(self):
+        """Тест: замыкание содержит косвенные зависимости"""
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+        self.platform.includes_ids = [(4, self.lib_a.id)]
+
+        self.assertEqual(self.platform._get_all_dependencies(), {self.lib_a.id, self.lib_b.id})
+        self.assertEqual(self.lib_b._get_all_dependents(), {self.lib_a.id, self.platform.id})
+
+        closure = self.env['alm.configurable.unit.version.closure'].search([
+            ('ancestor_id', '=', self.platform.id),
+            ('descendant_id', '=', self.lib_b.id),
+        ])
+        self.assertEqual(closure.depth, 2)
+
+    def test_02_remove_dependency(self):
+        """Тест: удаление связи обновляет замыкание предков"""
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+        self.platform.includes_ids = [(4, self.lib_a.id)]
+
+        self.lib_a.includes_ids = [(3, self.lib_b.id)]
+
+        self.assertEqual(self.platform._get_all_dependencies(), {self.lib_a.id})
+        self.assertFalse(self.lib_b._get_all_dependents())
+
+    def test_03_included_in_side(self):
+        """Тест: изменение со стороны 'Included In' тоже учитывается"""
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+        self.lib_a.included_in_ids = [(4, self.platform.id)]
+
+        self.assertEqual(self.platform._get_all_dependencies(), {self.lib_a.id, self.lib_b.id})
+
+    def test_04_unlink_intermediate_version(self):
+        """Тест: удаление промежуточной версии обновляет замыкание"""
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+        self.platform.includes_ids = [(4, self.lib_a.id)]
+
+        self.lib_a.unlink()
+
+        self.assertFalse(self.platform._get_all_dependencies())
+
+    def test_05_all_conflicts_reported(self):
+        """Тест: все конфликты версий сообщаются сразу"""
+        lib_a_new = self.Version.create({'name': '2.1.0', 'unit_id': self.lib_a.unit_id.id})
+        lib_b_new = self.Version.create({'name': '3.0.1', 'unit_id': self.lib_b.unit_id.id})
+
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+        lib_a_new.includes_ids = [(4, lib_b_new.id)]
+
+        with self.assertRaises(ValidationError) as error:
+            self.platform.includes_ids = [(4, self.lib_a.id), (4, lib_a_new.id)]
+        self.assertIn('Lib A', str(error.exception))
+        self.assertIn('Lib B', str(error.exception))
+
+    def test_06_compatible_build(self):
+        """Тест: сборка той же версии X.Y.Z конфликтом не считается"""
+        lib_b_build = self.Version.create({'name': '3.0.0.5', 'unit_id': self.lib_b.unit_id.id})
+
+        self.lib_a.includes_ids = [(4, self.lib_b.id), (4, lib_b_build.id)]
+
+        self.assertFalse(self.lib_a._get_includes_conflicts())
+
+    def test_07_indirect_cycle(self):
+        """Тест: косвенный цикл обнаруживается с обеих сторон связи"""
+        self.platform.includes_ids = [(4, self.lib_a.id)]
+        self.lib_a.includes_ids = [(4, self.lib_b.id)]
+
+        with self.assertRaises(ValidationError):
+            self.lib_b.includes_ids = [(4, self.platform.id)]
+
+        with self.assertRaises(ValidationError):
+            self.platform.included_in_ids = [(4, self.lib_b.id)]
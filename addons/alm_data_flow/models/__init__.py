@@ -6,4 +6,7 @@ from . import alm_data_flow_process_edge
 from . import alm_data_flow_data_flow_node
 from . import alm_data_flow_data_flow_edge
 from . import alm_data_flow_integration
-from . import alm_data_flow_field_map
\ No newline at end of file
+from . import alm_data_flow_field_map
+from . import alm_metadata_object
+from . import alm_metadata_object_attribute
+from . import alm_configurable_unit
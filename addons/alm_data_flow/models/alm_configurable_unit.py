@@ -0,0 +1,13 @@
+from odoo import models
+
+
+class AlmConfigurableUnit(models.Model):
+    _inherit = 'alm.configurable.unit'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'technical_name' in vals:
+            # Техническое имя приложения входит в подписи узлов потоков данных
+            data_flow_nodes = self.env['alm_data_flow.data_flow.node'].sudo().search([('application_id', 'in', self.ids)])
+            data_flow_nodes.data_flow_id._bump_diagram_revision()
+        return res
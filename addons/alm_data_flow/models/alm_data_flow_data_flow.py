@@ -1,13 +1,33 @@
 from odoo import models, fields, api, _
+from odoo.addons.alm_diagram.tools.mxgraph import (
+    edge_style, extract_root, index_cells, node_style,
+)
 from lxml import etree
 import logging
+from collections import defaultdict
 
 _logger = logging.getLogger(__name__)
 
+# Поля, которые читаются одним search_read при синхронизации с диаграммой
+DATA_FLOW_NODE_SYNC_FIELDS = [
+    'name', 'key', 'node_type', 'position_x', 'position_y', 'width', 'height',
+    'fill_color', 'stroke_color', 'stroke_width', 'font_color', 'font_size',
+]
+# Поля узла, которые видны на диаграмме потока данных (подпись узла процесса - из процесса)
+DATA_FLOW_NODE_DIAGRAM_FIELDS = [
+    'name', 'node_type', 'process_id', 'position_x', 'position_y', 'width', 'height',
+    'fill_color', 'stroke_color', 'stroke_width', 'font_color', 'font_size',
+]
+DATA_FLOW_EDGE_SYNC_FIELDS = [
+    'source_node_id', 'target_node_id', 'edge_type', 'condition_expression',
+    'stroke_color', 'stroke_width', 'font_color', 'font_size',
+]
+
 class AlmDataFlow(models.Model):
     _name = 'alm.data.flow'
     _description = 'ALM Data Flow'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'alm.diagram.mixin']
+    _diagram_data_field = 'diagram'
 
     name = fields.Char(string='Name', required=True, tracking=True)
     description = fields.Html(string='Description')
@@ -40,7 +60,12 @@ class AlmDataFlow(models.Model):
         string='Edges',
     )
 
-    diagram = fields.Text(string='Diagram', help="XML or other format for visual layout of the data flow diagram.")
+    diagram = fields.Text(
+        string='Diagram',
+        compute='_compute_diagram_data',
+        inverse='_inverse_diagram_data',
+        help="XML or other format for visual layout of the data flow diagram."
+    )
 
     input_metadata_object_ids = fields.Many2many(
         'alm.metadata.object',
@@ -94,115 +119,39 @@ class AlmDataFlow(models.Model):
         for record in self:
             record.all_metadata_object_ids = record.input_metadata_object_ids | record.output_metadata_object_ids
 
-    def _get_node_style(self, node):
-        """Generate style string for node with colors and styling"""
-        style_parts = ["whiteSpace=wrap", "html=1"]
-        
-        if node.node_type == 'gateway':
-            style_parts.extend(["shape=rhombus", "perimeter=rhombusPerimeter"])
-            default_fill = '#fff59d'
-            default_stroke = '#f9a825'
-        elif node.node_type == 'start':
-            style_parts.extend(["shape=ellipse", "perimeter=ellipsePerimeter"])
-            default_fill = '#c5e1a5'
-            default_stroke = '#388e3c'
-        elif node.node_type == 'end':
-            style_parts.extend(["shape=ellipse", "perimeter=ellipsePerimeter"])
-            default_fill = '#ef9a9a'
-            default_stroke = '#c62828'
-        elif node.node_type == 'event':
-            style_parts.extend(["shape=circle", "perimeter=ellipsePerimeter"])
-            default_fill = '#e1bee7'
-            default_stroke = '#7b1fa2'
-        elif node.node_type == 'loop':
-            style_parts.extend(["shape=hexagon", "perimeter=hexagonPerimeter"])
-            default_fill = '#ffcc80'
-            default_stroke = '#ef6c00'
-        else:
-            style_parts.extend(["shape=rectangle", "perimeter=rectanglePerimeter", "rounded=0"])
-            default_fill = '#bbdefb'
-            default_stroke = '#1976d2'
-        
-        fill_color = node.fill_color if node.fill_color and node.fill_color != '#ffffff' else default_fill
-        stroke_color = node.stroke_color if node.stroke_color and node.stroke_color != '#000000' else default_stroke
-        font_color = node.font_color if node.font_color else '#000000'
-        font_size = node.font_size if node.font_size else 12
-        stroke_width = node.stroke_width if node.stroke_width else 1
-        
-        style_parts.extend([
-            f"fillColor={fill_color}",
-            f"strokeColor={stroke_color}",
-            f"fontColor={font_color}",
-            f"fontSize={font_size}",
-            f"strokeWidth={stroke_width}"
-        ])
-        
-        return ";".join(style_parts)
-
-    def _get_edge_style(self, edge):
-        style_parts = ["endArrow=classic", "html=1", "rounded=0"]
-        
-        stroke_color = edge.stroke_color if edge.stroke_color and edge.stroke_color != '#000000' else '#2e7d32'
-        font_color = edge.font_color if edge.font_color else '#000000'
-        font_size = edge.font_size if edge.font_size else 11
-        stroke_width = edge.stroke_width if edge.stroke_width else 1
-        
-        style_parts.extend([
-            f"strokeColor={stroke_color}",
-            f"fontColor={font_color}",
-            f"fontSize={font_size}",
-            f"strokeWidth={stroke_width}"
-        ])
-        
-        if edge.edge_type == 'message':
-            style_parts.append("dashed=1")
-        elif edge.edge_type == 'data':
-            style_parts.extend(["dashed=1", "dashPattern=3 3"])
-        
-        return ";".join(style_parts)
-
     @api.model
     def action_generate_diagram_xml(self, data_flow_id):
         data_flow = self.browse(data_flow_id)
         data_flow.ensure_one()
-        _logger.info(f"Generating diagram for data flow: {data_flow.name}")
+        return data_flow._get_cached_diagram_xml(data_flow._generate_diagram_xml)
+
+    def _generate_diagram_xml(self):
+        self.ensure_one()
+        _logger.info(f"Generating diagram for data flow: {self.name}")
 
         try:
             positions = {}
-            for node in data_flow.node_ids:
+            for node in self.node_ids:
                 if node.position_x is not None and node.position_y is not None and (node.position_x != 0 or node.position_y != 0):
                     positions[node.id] = {'x': node.position_x, 'y': node.position_y}
 
-            if len(positions) != len(data_flow.node_ids):
+            if len(positions) != len(self.node_ids):
                 layout_successful = False
                 try:
-                    import networkx as nx
-                    G = nx.DiGraph()
-                    node_ids = [n.id for n in data_flow.node_ids]
-                    G.add_nodes_from(node_ids)
-                    edge_tuples = [(e.source_node_id.id, e.target_node_id.id) for e in data_flow.edge_ids]
-                    G.add_edges_from(edge_tuples)
-
-                    if G.nodes:
-                        pos = nx.spring_layout(G, seed=42, iterations=100)
-                        x_coords = [p[0] for p in pos.values()]
-                        y_coords = [p[1] for p in pos.values()]
-                        min_x, max_x = min(x_coords, default=0), max(x_coords, default=1)
-                        min_y, max_y = min(y_coords, default=0), max(y_coords, default=1)
-                        SCALE_X, SCALE_Y = 800, 600
-                        for node_id, (x, y) in pos.items():
-                            norm_x = (x - min_x) / (max_x - min_x) if max_x > min_x else 0.5
-                            norm_y = (y - min_y) / (max_y - min_y) if max_y > min_y else 0.5
-                            positions[node_id] = {'x': int(norm_x * SCALE_X), 'y': int(norm_y * SCALE_Y)}
-                        layout_successful = True
-                except ImportError:
-                    _logger.warning("networkx library not found. Skipping auto-layout.")
+                    layout = self._compute_diagram_layout(
+                        self.node_ids.ids,
+                        [(e.source_node_id.id, e.target_node_id.id) for e in self.edge_ids],
+                        {n.id: (n.width or 160, n.height or 80) for n in self.node_ids},
+                        fixed_positions=positions,
+                    )
+                    positions.update(layout)
+                    layout_successful = True
                 except Exception as e:
                     _logger.error(f"Error during auto-layout: {e}", exc_info=True)
 
                 if not layout_successful:
                     _logger.info("Falling back to simple mathematical layout.")
-                    nodes_without_positions = [n for n in data_flow.node_ids if n.id not in positions]
+                    nodes_without_positions = [n for n in self.node_ids if n.id not in positions]
                     if nodes_without_positions:
                         existing_x = [pos['x'] for pos in positions.values()] if positions else [0]
                         existing_y = [pos['y'] for pos in positions.values()] if positions else [0]
@@ -224,12 +173,12 @@ class AlmDataFlow(models.Model):
 
             node_cell_map = {}
             cell_id_counter = 2
-            for node in data_flow.node_ids:
+            for node in self.node_ids:
                 node_cell_id = str(cell_id_counter)
                 node_cell_map[node.id] = node_cell_id
                 cell_id_counter += 1
                 
-                style = self._get_node_style(node)
+                style = node_style(node.node_type, node.fill_color, node.stroke_color, node.font_color, node.font_size, node.stroke_width)
                 
                 if node.node_type == 'process' and node.process_id:
                     label = f"{node.application_id.technical_name}.{node.process_id.name}" if node.application_id else node.process_id.name
@@ -244,14 +193,13 @@ class AlmDataFlow(models.Model):
                 geom_attrib = {'x': str(pos_x), 'y': str(pos_y), 'width': str(node.width), 'height': str(node.height), 'as': "geometry"}
                 etree.SubElement(node_cell, "mxGeometry", attrib=geom_attrib)
 
-            for edge in data_flow.edge_ids:
+            for edge in self.edge_ids:
                 if edge.source_node_id.id in node_cell_map and edge.target_node_id.id in node_cell_map:
                     source_cell_id = node_cell_map[edge.source_node_id.id]
                     target_cell_id = node_cell_map[edge.target_node_id.id]
                     edge_cell_id = str(cell_id_counter)
                     cell_id_counter += 1
-                    edge_style = self._get_edge_style(edge)
-                    edge_attrib = {'id': edge_cell_id, 'style': edge_style, 'parent': "1", 'source': source_cell_id, 'target': target_cell_id, 'edge': "1"}
+                    edge_attrib = {'id': edge_cell_id, 'style': edge_style(edge.edge_type, edge.stroke_color, edge.font_color, edge.font_size, edge.stroke_width), 'parent': "1", 'source': source_cell_id, 'target': target_cell_id, 'edge': "1"}
                     if edge.condition_expression:
                         edge_attrib['value'] = edge.condition_expression
                     edge_cell = etree.SubElement(root_cell, "mxCell", attrib=edge_attrib)
@@ -271,12 +219,17 @@ class AlmDataFlow(models.Model):
             data_flow = self.env['alm.data.flow'].browse(data_flow_id)
             data_flow.ensure_one()
             
-            root = self._extract_diagram_root(xml_data)
-            if not root:
+            root = extract_root(xml_data)
+            if root is None:
                 return {'success': False, 'error': 'Could not extract diagram data'}
 
-            nodes_result = self._synchronize_nodes(data_flow, root)
-            edges_result = self._synchronize_edges(data_flow, root)
+            cells = index_cells(root)
+            # Ревизия диаграммы меняется один раз за синхронизацию, а не на каждую запись узла или связи
+            sync = self.with_context(alm_diagram_defer_revision=True)
+            nodes_result, nodes = sync._synchronize_nodes(data_flow, cells)
+            edges_result = sync._synchronize_edges(data_flow, cells, nodes)
+            if any(nodes_result.values()) or any(edges_result.values()):
+                data_flow._bump_diagram_revision()
 
             message = f"Nodes: +{nodes_result['created']} ↑{nodes_result['updated']} ↓{nodes_result['deleted']} | Edges: +{edges_result['created']} ↑{edges_result['updated']} ↓{edges_result['deleted']}"
             
@@ -285,26 +238,6 @@ class AlmDataFlow(models.Model):
             _logger.error(f"Error updating data flow from diagram: {e}", exc_info=True)
             return {'success': False, 'error': str(e)}
 
-    def _extract_diagram_root(self, xml_data):
-        try:
-            if xml_data.startswith('<mxfile'):
-                root = etree.fromstring(xml_data.encode('utf-8'))
-                diagram_elem = root.find('diagram')
-                if diagram_elem is not None and diagram_elem.text is not None:
-                    import base64, zlib, urllib.parse
-                    decoded = base64.b64decode(diagram_elem.text)
-                    try:
-                        decompressed = zlib.decompress(decoded, -15)
-                    except zlib.error:
-                        decompressed = decoded
-                    unquoted = urllib.parse.unquote(decompressed.decode('utf-8'))
-                    return etree.fromstring(unquoted.encode('utf-8'))
-            else:
-                return etree.fromstring(xml_data.encode('utf-8'))
-        except Exception as e:
-            _logger.error(f"Error extracting diagram root: {e}")
-            return None
-
     def _determine_node_type(self, style, value):
         if not style: return 'process'
         style_lower = style.lower()
@@ -317,27 +250,36 @@ class AlmDataFlow(models.Model):
         if 'hexagon' in style_lower: return 'loop'
         return 'process'
 
-    def _synchronize_nodes(self, data_flow, root):
+    def _synchronize_nodes(self, data_flow, cells):
+        """
+        Применяет разницу между узлами диаграммы и потока данных пакетно:
+        один create, write сгруппированы по одинаковым значениям, один
+        unlink. Возвращает счётчики и итоговое состояние узлов {id: значения}.
+        """
         result = {'created': 0, 'updated': 0, 'deleted': 0}
-        existing_nodes = {node.id: node for node in data_flow.node_ids}
+        Node = self.env['alm_data_flow.data_flow.node']
+        nodes = {
+            node['id']: node
+            for node in Node.search_read([('data_flow_id', '=', data_flow.id)], DATA_FLOW_NODE_SYNC_FIELDS, order='id', load=None)
+        }
         diagram_node_ids = set()
+        updates = {}
+        creates = []
 
-        for cell in root.xpath("//mxCell[@vertex='1']"):
-            odoo_id_str = cell.get('odoo_id')
-            value = self._clean_html_tags(cell.get('value', ''))
-            if not value: continue
+        for cell in cells.values():
+            if not cell.vertex or not cell.value:
+                continue
 
-            geom = cell.find('mxGeometry')
-            style_dict = self._parse_style(cell.get('style', ''))
-            node_type = self._determine_node_type(cell.get('style', ''), value)
+            style_dict = cell.style_dict
+            node_type = self._determine_node_type(cell.style, cell.value)
             
-            updates = {
-                'name': value,
+            vals = {
+                'name': cell.value,
                 'node_type': node_type,
-                'position_x': int(float(geom.get('x', 0))),
-                'position_y': int(float(geom.get('y', 0))),
-                'width': int(float(geom.get('width', 160))),
-                'height': int(float(geom.get('height', 80))),
+                'position_x': int(cell.x or 0),
+                'position_y': int(cell.y or 0),
+                'width': 160 if cell.width is None else int(cell.width),
+                'height': 80 if cell.height is None else int(cell.height),
                 'fill_color': style_dict.get('fillColor', '#ffffff'),
                 'stroke_color': style_dict.get('strokeColor', '#000000'),
                 'stroke_width': int(style_dict.get('strokeWidth', 1)),
@@ -345,88 +287,116 @@ class AlmDataFlow(models.Model):
                 'font_size': int(style_dict.get('fontSize', 12)),
             }
 
-            if odoo_id_str:
-                odoo_id = int(odoo_id_str)
+            if cell.odoo_id:
+                odoo_id = cell.odoo_id
                 diagram_node_ids.add(odoo_id)
-                if odoo_id in existing_nodes:
-                    node = existing_nodes[odoo_id]
-                    if node.node_type == 'process':
-                        updates.pop('name', None)
-                    node.write(updates)
-                    result['updated'] += 1
-            else:
-                if node_type != 'process':
-                    updates['data_flow_id'] = data_flow.id
-                    self.env['alm_data_flow.data_flow.node'].create(updates)
-                    result['created'] += 1
-        
-        nodes_to_delete_ids = set(existing_nodes.keys()) - diagram_node_ids
+                node = nodes.get(odoo_id)
+                if node:
+                    if node['node_type'] == 'process':
+                        vals.pop('name', None)
+                    changes = {field: value for field, value in vals.items() if value != node[field]}
+                    if changes:
+                        updates.setdefault(odoo_id, {}).update(changes)
+            elif node_type != 'process':
+                creates.append(vals)
+
+        nodes_to_delete_ids = [node_id for node_id in nodes if node_id not in diagram_node_ids]
         if nodes_to_delete_ids:
-            nodes_to_delete = self.env['alm_data_flow.data_flow.node'].browse(nodes_to_delete_ids)
-            nodes_to_delete.unlink()
-            result['deleted'] = len(nodes_to_delete)
-            
-        return result
-
-    def _synchronize_edges(self, data_flow, root):
+            Node.browse(nodes_to_delete_ids).unlink()
+            result['deleted'] = len(nodes_to_delete_ids)
+            for node_id in nodes_to_delete_ids:
+                del nodes[node_id]
+
+        grouped_updates = defaultdict(list)
+        for node_id, changes in updates.items():
+            grouped_updates[tuple(sorted(changes.items()))].append(node_id)
+            node = nodes[node_id]
+            node.update(changes)
+            if node['node_type'] != 'process':
+                node['key'] = node['name']
+        for changes, node_ids in grouped_updates.items():
+            Node.browse(node_ids).write(dict(changes))
+        result['updated'] = len(updates)
+
+        if creates:
+            new_nodes = Node.create([dict(vals, data_flow_id=data_flow.id) for vals in creates])
+            for node, vals in zip(new_nodes, creates):
+                nodes[node.id] = dict(vals, id=node.id, key=vals['name'])
+            result['created'] = len(new_nodes)
+
+        return result, nodes
+
+    def _synchronize_edges(self, data_flow, cells, nodes):
         result = {'created': 0, 'updated': 0, 'deleted': 0}
-        existing_edges = {(e.source_node_id.id, e.target_node_id.id): e for e in data_flow.edge_ids}
+        Edge = self.env['alm_data_flow.data_flow.edge']
+        # Повторяющиеся связи в базе обновляются и удаляются вместе
+        existing_edges = defaultdict(list)
+        for edge in Edge.search_read([('data_flow_id', '=', data_flow.id)], DATA_FLOW_EDGE_SYNC_FIELDS, order='id', load=None):
+            existing_edges[(edge['source_node_id'], edge['target_node_id'])].append(edge)
         diagram_edges = {}
 
-        data_flow.invalidate_recordset(['node_ids'])
-        node_map_by_key = {node.key: node for node in data_flow.node_ids}
-        node_map_by_id = {node.id: node for node in data_flow.node_ids}
+        node_id_by_key = {node['key']: node_id for node_id, node in nodes.items()}
         
         cell_to_node = {}
-        for cell in root.xpath("//mxCell[@vertex='1']"):
-            odoo_id_str = cell.get('odoo_id')
-            if odoo_id_str:
-                cell_to_node[cell.get('id')] = node_map_by_id.get(int(odoo_id_str))
-            else:
-                key = self._clean_html_tags(cell.get('value', ''))
-                cell_to_node[cell.get('id')] = node_map_by_key.get(key)
+        edge_cells = []
+        for cell in cells.values():
+            if cell.edge:
+                edge_cells.append(cell)
+            elif cell.vertex:
+                if cell.odoo_id:
+                    cell_to_node[cell.id] = cell.odoo_id if cell.odoo_id in nodes else None
+                else:
+                    cell_to_node[cell.id] = node_id_by_key.get(cell.value)
 
-        for cell in root.xpath("//mxCell[@edge='1']"):
-            source_node = cell_to_node.get(cell.get('source'))
-            target_node = cell_to_node.get(cell.get('target'))
+        for cell in edge_cells:
+            source_id = cell_to_node.get(cell.source)
+            target_id = cell_to_node.get(cell.target)
             
-            if source_node and target_node:
-                style_dict = self._parse_style(cell.get('style', ''))
+            if source_id and target_id:
+                style_dict = cell.style_dict
                 edge_type = 'sequence'
                 if style_dict.get('dashed') == '1':
                     edge_type = 'data' if 'dashPattern' in style_dict else 'message'
 
                 edge_data = {
                     'edge_type': edge_type,
-                    'condition_expression': self._clean_html_tags(cell.get('value', '')),
+                    'condition_expression': cell.value,
                     'stroke_color': style_dict.get('strokeColor', '#000000'),
                     'stroke_width': int(style_dict.get('strokeWidth', 1)),
                     'font_color': style_dict.get('fontColor', '#000000'),
                     'font_size': int(style_dict.get('fontSize', 11)),
                 }
-                diagram_edges[(source_node.id, target_node.id)] = edge_data
+                diagram_edges[(source_id, target_id)] = edge_data
 
-        edges_to_delete = set(existing_edges.keys()) - set(diagram_edges.keys())
+        edges_to_delete = [
+            edge['id']
+            for edge_key, edges in existing_edges.items() if edge_key not in diagram_edges
+            for edge in edges
+        ]
         if edges_to_delete:
-            for source_id, target_id in edges_to_delete:
-                existing_edges[(source_id, target_id)].unlink()
-                result['deleted'] += 1
+            Edge.browse(edges_to_delete).unlink()
+            result['deleted'] = len(edges_to_delete)
 
+        # Связь, у которой изменился только стиль, обновляется на месте
+        grouped_updates = defaultdict(list)
+        creates = []
         for (source_id, target_id), data in diagram_edges.items():
-            if (source_id, target_id) in existing_edges:
-                existing_edges[(source_id, target_id)].write(data)
-                result['updated'] += 1
+            edges = existing_edges.get((source_id, target_id))
+            if edges:
+                for edge in edges:
+                    current = dict(edge, condition_expression=edge['condition_expression'] or '')
+                    changes = {field: value for field, value in data.items() if value != current[field]}
+                    if changes:
+                        grouped_updates[tuple(sorted(changes.items()))].append(edge['id'])
+                        result['updated'] += 1
             else:
-                data.update({'data_flow_id': data_flow.id, 'source_node_id': source_id, 'target_node_id': target_id})
-                self.env['alm_data_flow.data_flow.edge'].create(data)
-                result['created'] += 1
-        
-        return result
+                creates.append(dict(data, data_flow_id=data_flow.id, source_node_id=source_id, target_node_id=target_id))
 
-    def _parse_style(self, style_string):
-        return {p.split('=', 1)[0]: p.split('=', 1)[1] for p in style_string.split(';') if '=' in p}
+        for changes, edge_ids in grouped_updates.items():
+            Edge.browse(edge_ids).write(dict(changes))
 
-    def _clean_html_tags(self, text):
-        if not text: return ""
-        import re
-        return ' '.join(re.sub('<[^<]+?>', '', text).replace('&nbsp;', ' ').split()).strip()
+        if creates:
+            Edge.create(creates)
+            result['created'] = len(creates)
+        
+        return result
@@ -1,9 +1,13 @@
 from odoo import models, fields, api
+from .alm_data_flow_data_flow import DATA_FLOW_EDGE_SYNC_FIELDS
 
 class AlmDataFlowDataFlowEdge(models.Model):
     _name = 'alm_data_flow.data_flow.edge'
     _description = 'Data Flow Edge'
+    _inherit = ['alm.diagram.item.mixin']
     _order = 'id'
+    _diagram_owner_field = 'data_flow_id'
+    _diagram_item_fields = DATA_FLOW_EDGE_SYNC_FIELDS
 
     data_flow_id = fields.Many2one('alm.data.flow', string='Data Flow', required=True, ondelete='cascade')
 
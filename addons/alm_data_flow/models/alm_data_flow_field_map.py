@@ -1,10 +1,15 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from .alm_data_flow_integration import MAPPING_DIAGRAM_FIELDS
 
 class AlmDataFlowFieldMap(models.Model):
     _name = 'alm.data.flow.field.map'
     _description = 'ALM Data Flow Field Mapping'
+    _inherit = ['alm.diagram.item.mixin']
     _order = 'sequence,name'
+    _diagram_owner_field = 'integration_id'
+    # sequence и name задают порядок связей на диаграмме (_order)
+    _diagram_item_fields = MAPPING_DIAGRAM_FIELDS + ['sequence', 'name']
 
     name = fields.Char(string='Name', compute='_compute_name', store=True, readonly=False)
     sequence = fields.Integer(string='Sequence', default=10)
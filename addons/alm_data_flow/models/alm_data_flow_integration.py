@@ -1,18 +1,25 @@
 from odoo import models, fields, api, _
+from odoo.addons.alm_diagram.tools.mxgraph import extract_compressed_root, extract_root, parse_style
 from lxml import etree
 import logging
-import random
-import base64
-import zlib
-import urllib.parse
+from collections import defaultdict
 
 _logger = logging.getLogger(__name__)
 
+MAPPING_DIAGRAM_FIELDS = ['source_field_id', 'target_field_id', 'technical_field']
+ATTRIBUTE_DIAGRAM_FIELDS = ['name', 'object_id', 'parent_id']
+
+ENTITY_STYLE = "shape=table;startSize=26;container=1;collapsible=1;childLayout=tableLayout;fixedRows=1;rowLines=0;fontStyle=1;align=center;resizeLast=1;"
+TECHNICAL_ENTITY_STYLE = ENTITY_STYLE + "fillColor=#dae8fc;strokeColor=#6c8ebf;"
+ATTRIBUTE_STYLE = "shape=partialRectangle;collapsible=0;dropTarget=0;pointerEvents=0;fillColor=none;top=0;left=0;bottom=0;right=0;align=left;spacingLeft=6;"
+CHILD_ATTRIBUTE_STYLE = "shape=partialRectangle;collapsible=0;dropTarget=0;pointerEvents=0;fillColor=none;top=0;left=0;bottom=0;right=0;align=left;spacingLeft=18;fontStyle=2;"
+
 class AlmDataFlowIntegration(models.Model):
     _name = 'alm.data.flow.integration'
     _description = 'ALM Data Flow Integration'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'alm.diagram.mixin']
     _order = 'name'
+    _diagram_data_field = 'diagram_data'
 
     name = fields.Char(string='Name', required=True, tracking=True)
     description = fields.Html(string='Description', tracking=True)
@@ -38,88 +45,71 @@ class AlmDataFlowIntegration(models.Model):
         help="Individual field mappings for this integration."
     )
 
-    diagram_data = fields.Text(string="Diagram Data")
-
-    def _get_predefined_colors(self):
-        return [
-            '#e6194B', '#3cb44b', '#ffe119', '#4363d8', '#f58231', 
-            '#911eb4', '#46f0f0', '#f032e6', '#bcf60c', '#fabebe',
-            '#008080', '#e6beff', '#9A6324', '#fffac8', '#800000',
-            '#aaffc3', '#808000', '#ffd8b1', '#000075', '#808080'
-        ]
-
-    def _extract_diagram_root(self, xml_data):
-        if not xml_data:
-            return None
-        try:
-            if xml_data.strip().startswith('<mxfile'):
-                root = etree.fromstring(xml_data.encode('utf-8'))
-                diagram_elem = root.find('diagram')
-                if diagram_elem is not None and diagram_elem.text is not None:
-                    diagram_content = diagram_elem.text
-                    try:
-                        decoded = base64.b64decode(diagram_content)
-                        decompressed = zlib.decompress(decoded, -15)
-                        unquoted = urllib.parse.unquote(decompressed.decode('utf-8'))
-                        return etree.fromstring(unquoted.encode('utf-8'))
-                    except (base64.binascii.Error, zlib.error, UnicodeDecodeError) as e:
-                        try:
-                            return etree.fromstring(diagram_content.encode('utf-8'))
-                        except etree.XMLSyntaxError:
-                            pass
-                _logger.warning("_extract_diagram_root: No parsable diagram content found in mxfile")
-                return None
-            else:
-                return etree.fromstring(xml_data.encode('utf-8'))
-        except etree.XMLSyntaxError as e:
-            _logger.warning(f"_extract_diagram_root: XML Syntax Error: {e}")
-            return None
-        except Exception as e:
-            _logger.error(f"_extract_diagram_root: Unexpected error: {e}")
-            return None
+    diagram_data = fields.Text(string="Diagram Data", compute='_compute_diagram_data', inverse='_inverse_diagram_data')
 
     def action_generate_mapping_diagram_xml(self, current_diagram_xml=None):
         self.ensure_one()
+        if current_diagram_xml:
+            return self._get_cached_diagram_xml(
+                lambda: self._generate_mapping_diagram_xml(extract_root(current_diagram_xml)),
+                current_diagram_xml,
+            )
+        # Сохранённая диаграмма разбирается прямо из сжатого вида, без промежуточной строки XML
+        payload = self.with_context(bin_size=False).diagram_payload
+        if payload:
+            _logger.info("Using stored diagram data")
+        return self._get_cached_diagram_xml(
+            lambda: self._generate_mapping_diagram_xml(extract_compressed_root(payload)),
+            payload,
+        )
+
+    @api.model
+    def _bump_mapping_diagram_revision(self, object_ids):
+        """
+        Меняет ревизию интеграций, на диаграммах сопоставления которых
+        нарисованы объекты object_ids: их имена и реквизиты не входят
+        в собственные поля интеграции.
+        """
+        if not object_ids:
+            return
+        object_ids = list(object_ids)
+        integrations = self.sudo().search([
+            '|',
+            ('field_map_ids.source_field_id.object_id', 'in', object_ids),
+            ('field_map_ids.target_field_id.object_id', 'in', object_ids),
+        ])
+        integrations._bump_diagram_revision()
+
+    def _generate_mapping_diagram_xml(self, xml_root):
         _logger.info(f"Generating mapping diagram for integration: {self.name}")
-        
-        if (current_diagram_xml is None or current_diagram_xml == '') and self.diagram_data:
-            current_diagram_xml = self.diagram_data
-            _logger.info("Using diagram_data from database")
-        
+
         ENTITY_WIDTH = 200
         ROW_HEIGHT = 26
         ENTITY_X_GAP = 150
         
         existing_positions = {}
         existing_path_colors = {}
-        if current_diagram_xml:
+        if xml_root is not None:
             try:
-                xml_root = self._extract_diagram_root(current_diagram_xml)
-                _logger.info(f"Full XML structure: {etree.tostring(xml_root, encoding='unicode')[:1000]}")
-                if xml_root is None:
-                    _logger.warning("Could not extract valid mxGraphModel from current_diagram_xml. Existing positions/colors will not be restored.")
-                else:
-                    entity_cells = xml_root.xpath("//mxCell[@vertex='1']")
-                    _logger.info(f"Vertex cells found: {len(entity_cells)}")
-                    
-                    for cell in entity_cells:
-                        entity_name = cell.get('value')
-                        geom = cell.find('mxGeometry')
-                        style = cell.get('style', '')
-                        if entity_name and geom is not None and 'shape=table' in style:
-                            existing_positions[entity_name] = {'x': geom.get('x'), 'y': geom.get('y')}
-                    edge_cells = xml_root.xpath("//mxCell[@edge='1']")
-                    
-                    for edge in edge_cells:
-                        path_key = edge.get('path_key')
-                        style = edge.get('style', '')
-                        
-                        if path_key and 'strokeColor=' in style:
-                            color = style.split('strokeColor=')[1].split(';')[0]
-                            if color and path_key not in existing_path_colors:
-                                existing_path_colors[path_key] = color
-                                _logger.info(f"✓ Found color for path {path_key}: {color}")
-                                
+                entity_cells = xml_root.xpath("//mxCell[@vertex='1']")
+                _logger.info(f"Vertex cells found: {len(entity_cells)}")
+
+                for cell in entity_cells:
+                    entity_name = cell.get('value')
+                    geom = cell.find('mxGeometry')
+                    style = cell.get('style', '')
+                    if entity_name and geom is not None and 'shape=table' in style:
+                        existing_positions[entity_name] = {'x': geom.get('x'), 'y': geom.get('y')}
+                edge_cells = xml_root.xpath("//mxCell[@edge='1']")
+
+                for edge in edge_cells:
+                    path_key = edge.get('path_key')
+                    color = parse_style(edge.get('style', '')).get('strokeColor')
+
+                    if path_key and color and path_key not in existing_path_colors:
+                        existing_path_colors[path_key] = color
+                        _logger.info(f"✓ Found color for path {path_key}: {color}")
+
             except Exception as e:
                 _logger.warning(f"Could not parse existing diagram XML: {e}")
         
@@ -131,101 +121,89 @@ class AlmDataFlowIntegration(models.Model):
 
         cell_id_counter = 2
         attribute_cell_map = {}
-        
-        used_object_ids = set()
-        technical_fields = set()
-        for mapping in self.field_map_ids:
-            if mapping.source_field_id: used_object_ids.add(mapping.source_field_id.object_id.id)
-            if mapping.target_field_id: used_object_ids.add(mapping.target_field_id.object_id.id)
-            if mapping.technical_field: technical_fields.add(mapping.technical_field)
-        
-        used_objects = self.env['alm.metadata.object'].browse(list(used_object_ids))
-        sorted_technical_fields = sorted(list(technical_fields))
-        
-        available_colors = self._get_predefined_colors()
-        random.shuffle(available_colors)
-        path_colors = existing_path_colors.copy()
-        
-        path_keys = set()
-        for m in self.field_map_ids:
-            path_key = m.technical_field if m.technical_field else f"direct_{m.id}"
-            path_keys.add(path_key)
 
-        for key in sorted(list(path_keys)):
-            if key not in path_colors:
-                path_colors[key] = available_colors.pop(0) if available_colors else '#666666'
+        mappings = self.env['alm.data.flow.field.map'].search_read(
+            [('integration_id', '=', self.id)], MAPPING_DIAGRAM_FIELDS, load=None,
+        )
+        for mapping in mappings:
+            mapping['path_key'] = mapping['technical_field'] or f"direct_{mapping['id']}"
+        mapped_attribute_ids = {
+            mapping[field] for mapping in mappings for field in ('source_field_id', 'target_field_id') if mapping[field]
+        }
+        technical_fields = sorted({mapping['technical_field'] for mapping in mappings if mapping['technical_field']})
+
+        # Все атрибуты используемых объектов одним упорядоченным запросом;
+        # деревья (корневые атрибуты и их дочерние) собираются в памяти
+        Attribute = self.env['alm.metadata.object.attribute']
+        used_object_ids = sorted({
+            attr['object_id'] for attr in Attribute.browse(list(mapped_attribute_ids)).read(['object_id'], load=None)
+        })
+        root_attributes = defaultdict(list)
+        child_attributes = defaultdict(list)
+        for attr in Attribute.search_read(
+            [('object_id', 'in', used_object_ids)], ATTRIBUTE_DIAGRAM_FIELDS, order='sequence, name, id', load=None,
+        ):
+            if attr['parent_id']:
+                child_attributes[attr['parent_id']].append(attr)
+            else:
+                root_attributes[attr['object_id']].append(attr)
+
+        # (название, стиль, строки (ключ в attribute_cell_map, подпись, стиль строки))
+        entities = []
+        for entity in self.env['alm.metadata.object'].browse(used_object_ids).read(['name']):
+            rows = []
+            for attr in root_attributes[entity['id']]:
+                rows.append((attr['id'], attr['name'], ATTRIBUTE_STYLE))
+                rows.extend((child['id'], child['name'], CHILD_ATTRIBUTE_STYLE) for child in child_attributes[attr['id']])
+            entities.append((entity['name'], ENTITY_STYLE, rows))
+        if technical_fields:
+            entities.append((
+                "Technical Fields",
+                TECHNICAL_ENTITY_STYLE,
+                [(f"tech_{name}", name, ATTRIBUTE_STYLE) for name in technical_fields],
+            ))
+
+        path_colors = self._get_diagram_path_colors(
+            [mapping['path_key'] for mapping in mappings], preset=existing_path_colors,
+        )
 
         current_x, current_y = 50, 50
-        
-        all_entities_to_draw = list(used_objects)
-        if sorted_technical_fields:
-            tech_obj = {'name': "Technical Fields", 'attributes': sorted_technical_fields, 'is_tech': True}
-            all_entities_to_draw.append(tech_obj)
-
-        for entity in all_entities_to_draw:
-            is_tech_block = isinstance(entity, dict) and entity.get('is_tech')
-            entity_name = entity['name'] if is_tech_block else entity.name
-            
+        for entity_name, style, rows in entities:
             pos = existing_positions.get(entity_name, {'x': str(current_x), 'y': str(current_y)})
-
-            if is_tech_block:
-                attributes = [{'name': name} for name in entity['attributes']]
-                entity_height = ROW_HEIGHT * (len(attributes) + 1)
-                style = "shape=table;startSize=26;container=1;collapsible=1;childLayout=tableLayout;fixedRows=1;rowLines=0;fontStyle=1;align=center;resizeLast=1;fillColor=#dae8fc;strokeColor=#6c8ebf;"
-            else:
-                all_attrs = entity.attribute_ids.filtered(lambda a: not a.parent_id)
-                entity_height = ROW_HEIGHT * (len(all_attrs) + 1)
-                for attr in all_attrs: entity_height += ROW_HEIGHT * len(attr.child_ids)
-                style = "shape=table;startSize=26;container=1;collapsible=1;childLayout=tableLayout;fixedRows=1;rowLines=0;fontStyle=1;align=center;resizeLast=1;"
+            entity_height = ROW_HEIGHT * (len(rows) + 1)
 
             entity_cell_id = str(cell_id_counter); cell_id_counter += 1
             entity_cell = etree.SubElement(root_cell, "mxCell", id=entity_cell_id, value=entity_name, style=style, parent="1", vertex="1")
             etree.SubElement(entity_cell, "mxGeometry", {'x': pos['x'], 'y': pos['y'], 'width': str(ENTITY_WIDTH), 'height': str(entity_height), 'as': "geometry"})
 
             attr_y_offset = ROW_HEIGHT
-            if is_tech_block:
-                for attr in attributes:
-                    attr_cell_id = str(cell_id_counter); cell_id_counter += 1
-                    attribute_cell_map[f"tech_{attr['name']}"] = attr_cell_id
-                    attr_style = "shape=partialRectangle;collapsible=0;dropTarget=0;pointerEvents=0;fillColor=none;top=0;left=0;bottom=0;right=0;align=left;spacingLeft=6;"
-                    attr_cell = etree.SubElement(root_cell, "mxCell", id=attr_cell_id, value=attr['name'], style=attr_style, parent=entity_cell_id, vertex="1")
-                    etree.SubElement(attr_cell, "mxGeometry", {'y': str(attr_y_offset), 'width': str(ENTITY_WIDTH), 'height': str(ROW_HEIGHT), 'as': "geometry"})
-                    attr_y_offset += ROW_HEIGHT
-            else:
-                for attr in entity.attribute_ids.filtered(lambda a: not a.parent_id).sorted('sequence'):
-                    attr_cell_id = str(cell_id_counter); cell_id_counter += 1
-                    attribute_cell_map[attr.id] = attr_cell_id
-                    attr_style = "shape=partialRectangle;collapsible=0;dropTarget=0;pointerEvents=0;fillColor=none;top=0;left=0;bottom=0;right=0;align=left;spacingLeft=6;"
-                    attr_cell = etree.SubElement(root_cell, "mxCell", id=attr_cell_id, value=attr.name, style=attr_style, parent=entity_cell_id, vertex="1")
-                    etree.SubElement(attr_cell, "mxGeometry", {'y': str(attr_y_offset), 'width': str(ENTITY_WIDTH), 'height': str(ROW_HEIGHT), 'as': "geometry"})
-                    attr_y_offset += ROW_HEIGHT
-                    for child_attr in attr.child_ids.sorted('sequence'):
-                        child_attr_cell_id = str(cell_id_counter); cell_id_counter += 1
-                        attribute_cell_map[child_attr.id] = child_attr_cell_id
-                        child_attr_style = "shape=partialRectangle;collapsible=0;dropTarget=0;pointerEvents=0;fillColor=none;top=0;left=0;bottom=0;right=0;align=left;spacingLeft=18;fontStyle=2;"
-                        child_attr_cell = etree.SubElement(root_cell, "mxCell", id=child_attr_cell_id, value=child_attr.name, style=child_attr_style, parent=entity_cell_id, vertex="1")
-                        etree.SubElement(child_attr_cell, "mxGeometry", {'y': str(attr_y_offset), 'width': str(ENTITY_WIDTH), 'height': str(ROW_HEIGHT), 'as': "geometry"})
-                        attr_y_offset += ROW_HEIGHT
-            
+            for key, label, attr_style in rows:
+                attr_cell_id = str(cell_id_counter); cell_id_counter += 1
+                attribute_cell_map[key] = attr_cell_id
+                attr_cell = etree.SubElement(root_cell, "mxCell", id=attr_cell_id, value=label, style=attr_style, parent=entity_cell_id, vertex="1")
+                etree.SubElement(attr_cell, "mxGeometry", {'y': str(attr_y_offset), 'width': str(ENTITY_WIDTH), 'height': str(ROW_HEIGHT), 'as': "geometry"})
+                attr_y_offset += ROW_HEIGHT
+
             if entity_name not in existing_positions:
                 current_x += ENTITY_WIDTH + ENTITY_X_GAP
 
-        for mapping in self.field_map_ids:
+        for mapping in mappings:
+            source_id, target_id, technical_field = mapping['source_field_id'], mapping['target_field_id'], mapping['technical_field']
             source_cell_id, target_cell_id = None, None
-            if mapping.source_field_id: source_cell_id = attribute_cell_map.get(mapping.source_field_id.id)
-            elif mapping.technical_field: source_cell_id = attribute_cell_map.get(f"tech_{mapping.technical_field}")
-            
-            if mapping.target_field_id: target_cell_id = attribute_cell_map.get(mapping.target_field_id.id)
-            elif mapping.technical_field and mapping.source_field_id: target_cell_id = attribute_cell_map.get(f"tech_{mapping.technical_field}")
+            if source_id: source_cell_id = attribute_cell_map.get(source_id)
+            elif technical_field: source_cell_id = attribute_cell_map.get(f"tech_{technical_field}")
+
+            if target_id: target_cell_id = attribute_cell_map.get(target_id)
+            elif technical_field and source_id: target_cell_id = attribute_cell_map.get(f"tech_{technical_field}")
 
             if source_cell_id and target_cell_id:
-                path_key = mapping.technical_field if mapping.technical_field else f"direct_{mapping.id}"
+                path_key = mapping['path_key']
                 color = path_colors.get(path_key, '#666666')
-                
+
                 edge_cell_id = str(cell_id_counter); cell_id_counter += 1
                 edge_style = f"edgeStyle=entityRelationEdgeStyle;endArrow=block;endFill=1;strokeWidth=1;rounded=0;strokeColor={color};"
                 edge_attrib = {'id': edge_cell_id, 'style': edge_style, 'parent': "1", 'source': source_cell_id, 'target': target_cell_id, 'edge': "1", 'path_key': path_key}
-                
+
                 edge_cell = etree.SubElement(root_cell, "mxCell", attrib=edge_attrib)
                 etree.SubElement(edge_cell, "mxGeometry", {'relative': "1", 'as': "geometry"})
 
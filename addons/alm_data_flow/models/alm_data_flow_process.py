@@ -1,13 +1,32 @@
 from odoo import models, fields, api, _
+from odoo.addons.alm_diagram.tools.mxgraph import (
+    clean_html_tags, edge_style, extract_root, index_cells, node_style,
+)
 from lxml import etree
 import logging
+from collections import defaultdict
 
 _logger = logging.getLogger(__name__)
 
+# Поля, которые читаются для построения диаграммы одним search_read
+NODE_DIAGRAM_FIELDS = [
+    'name', 'node_type', 'position_x', 'position_y', 'width', 'height',
+    'fill_color', 'stroke_color', 'stroke_width', 'font_color', 'font_size',
+]
+EDGE_DIAGRAM_FIELDS = [
+    'source_node_id', 'target_node_id', 'edge_type', 'condition_expression',
+    'stroke_color', 'stroke_width', 'font_color', 'font_size',
+]
+
+def _has_saved_position(node):
+    return node['position_x'] is not None and node['position_y'] is not None and (node['position_x'] != 0 or node['position_y'] != 0)
+
+
 class AlmProcess(models.Model):
     _name = 'alm.process'
     _description = 'ALM Process'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'alm.diagram.mixin']
+    _diagram_data_field = 'diagram_data'
 
     name = fields.Char(string='Name', required=True, tracking=True)
     description = fields.Html(string='Description')
@@ -39,7 +58,12 @@ class AlmProcess(models.Model):
         string='Edges',
     )
 
-    diagram_data = fields.Text(string='Diagram Data', help="XML or other format for visual layout of the process diagram.")
+    diagram_data = fields.Text(
+        string='Diagram Data',
+        compute='_compute_diagram_data',
+        inverse='_inverse_diagram_data',
+        help="XML or other format for visual layout of the process diagram."
+    )
 
     input_metadata_object_ids = fields.Many2many(
         'alm.metadata.object',
@@ -72,64 +96,58 @@ class AlmProcess(models.Model):
             record.output_metadata_object_ids = output_objects
 
 
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals or 'application_id' in vals:
+            # Имя процесса и приложения входят в подписи узлов потоков данных
+            data_flow_nodes = self.env['alm_data_flow.data_flow.node'].search([('process_id', 'in', self.ids)])
+            data_flow_nodes.data_flow_id._bump_diagram_revision()
+        return res
+
     @api.model
     def action_generate_diagram_xml(self, process_id):
         process = self.browse(process_id)
         process.ensure_one()
-        _logger.info(f"Generating diagram for process: {process.name} using new graph model with styles")
+        return process._get_cached_diagram_xml(process._generate_diagram_xml)
+
+    def _generate_diagram_xml(self):
+        self.ensure_one()
+        _logger.info("Generating diagram for process: %s", self.name)
 
         try:
+            nodes = self.env['alm_data_flow.process.node'].search_read(
+                [('process_id', '=', self.id)], NODE_DIAGRAM_FIELDS, order='id', load=None,
+            )
+            edges = self.env['alm_data_flow.process.edge'].search_read(
+                [('process_id', '=', self.id)], EDGE_DIAGRAM_FIELDS, order='id', load=None,
+            )
+            debug = _logger.isEnabledFor(logging.DEBUG)
+
             positions = {}
-            
-            for node in process.node_ids:
-                if node.position_x is not None and node.position_y is not None and (node.position_x != 0 or node.position_y != 0):
-                    positions[node.id] = {'x': node.position_x, 'y': node.position_y}
-                    _logger.info(f"Node {node.name} has saved position: ({node.position_x}, {node.position_y})")
-                else:
-                    _logger.info(f"Node {node.name} has no valid position: ({node.position_x}, {node.position_y})")
+            for node in nodes:
+                if _has_saved_position(node):
+                    positions[node['id']] = {'x': node['position_x'], 'y': node['position_y']}
+                elif debug:
+                    _logger.debug("Node %s has no valid position: (%s, %s)", node['name'], node['position_x'], node['position_y'])
 
-            if len(positions) != len(process.node_ids):
+            if len(positions) != len(nodes):
                 layout_successful = False
                 try:
-                    import networkx as nx
-                    
-                    G = nx.DiGraph()
-                    node_ids = [n.id for n in process.node_ids]
-                    G.add_nodes_from(node_ids)
-                    
-                    edge_tuples = [(e.source_node_id.id, e.target_node_id.id) for e in process.edge_ids]
-                    G.add_edges_from(edge_tuples)
-
-                    if G.nodes:
-                        pos = nx.spring_layout(G, seed=42, iterations=100)
-
-                        x_coords = [p[0] for p in pos.values()]
-                        y_coords = [p[1] for p in pos.values()]
-                        min_x, max_x = min(x_coords, default=0), max(x_coords, default=1)
-                        min_y, max_y = min(y_coords, default=0), max(y_coords, default=1)
-
-                        SCALE_X = 800
-                        SCALE_Y = 600
-                        
-                        for node_id, (x, y) in pos.items():
-                            norm_x = (x - min_x) / (max_x - min_x) if max_x > min_x else 0.5
-                            norm_y = (y - min_y) / (max_y - min_y) if max_y > min_y else 0.5
-                            positions[node_id] = {
-                                'x': int(norm_x * SCALE_X),
-                                'y': int(norm_y * SCALE_Y),
-                            }
-                        layout_successful = True
-                        _logger.info("Successfully calculated networkx layout.")
-
-                except ImportError:
-                    _logger.warning("networkx library not found. Skipping auto-layout.")
+                    layout = self._compute_diagram_layout(
+                        [node['id'] for node in nodes],
+                        [(edge['source_node_id'], edge['target_node_id']) for edge in edges],
+                        {node['id']: (node['width'] or 120, node['height'] or 60) for node in nodes},
+                        fixed_positions=positions,
+                    )
+                    positions.update(layout)
+                    layout_successful = True
+                    _logger.info("Successfully calculated auto-layout.")
                 except Exception as layout_exc:
-                    _logger.error(f"Error during auto-layout with networkx: {layout_exc}", exc_info=True)
+                    _logger.error(f"Error during auto-layout: {layout_exc}", exc_info=True)
 
                 if not layout_successful:
                     _logger.info("Falling back to simple mathematical layout.")
-                    nodes_without_positions = [n for n in process.node_ids if n.id not in positions]
-                    _logger.info(f"Nodes without positions: {len(nodes_without_positions)}")
+                    nodes_without_positions = [node for node in nodes if node['id'] not in positions]
                     
                     if nodes_without_positions:
                         existing_x = [pos['x'] for pos in positions.values()] if positions else [0]
@@ -141,9 +159,8 @@ class AlmProcess(models.Model):
                         current_x = start_x
                         current_y = start_y
                         
-                        for i, node in enumerate(nodes_without_positions):
-                            positions[node.id] = {'x': current_x, 'y': current_y}
-                            _logger.info(f"Assigned position to {node.name}: ({current_x}, {current_y})")
+                        for node in nodes_without_positions:
+                            positions[node['id']] = {'x': current_x, 'y': current_y}
                             current_y += 150
                             
                             if current_y > 800:
@@ -152,9 +169,6 @@ class AlmProcess(models.Model):
             else:
                 _logger.info("All nodes have valid positions, skipping auto-layout")
 
-            clean_nodes = self.env['alm_data_flow.process.node'].search([('process_id', '=', process.id)])
-            fresh_edges = self.env['alm_data_flow.process.edge'].search([('process_id', '=', process.id)])
-
             root = etree.Element("mxGraphModel")
             root_cell = etree.SubElement(root, "root")
             etree.SubElement(root_cell, "mxCell", id="0")
@@ -162,138 +176,71 @@ class AlmProcess(models.Model):
 
             node_cell_map = {}
             cell_id_counter = 2
-            
-            def _get_node_style(node):
-                style_parts = ["whiteSpace=wrap", "html=1"]
-                
-                if node.node_type == 'gateway':
-                    style_parts.extend(["shape=rhombus", "perimeter=rhombusPerimeter"])
-                    default_fill = '#fff59d'
-                    default_stroke = '#f9a825'
-                elif node.node_type == 'start':
-                    style_parts.extend(["shape=ellipse", "perimeter=ellipsePerimeter"])
-                    default_fill = '#c5e1a5'
-                    default_stroke = '#388e3c'
-                elif node.node_type == 'end':
-                    style_parts.extend(["shape=ellipse", "perimeter=ellipsePerimeter"])
-                    default_fill = '#ef9a9a'
-                    default_stroke = '#c62828'
-                elif node.node_type == 'event':
-                    style_parts.extend(["shape=circle", "perimeter=ellipsePerimeter"])
-                    default_fill = '#e1bee7'
-                    default_stroke = '#7b1fa2'
-                elif node.node_type == 'loop':
-                    style_parts.extend(["shape=hexagon", "perimeter=hexagonPerimeter"])
-                    default_fill = '#ffcc80'
-                    default_stroke = '#ef6c00'
-                else:
-                    style_parts.extend(["shape=rectangle", "perimeter=rectanglePerimeter", "rounded=0"])
-                    default_fill = '#bbdefb'
-                    default_stroke = '#1976d2'
-                
-                fill_color = node.fill_color if node.fill_color and node.fill_color != '#ffffff' else default_fill
-                stroke_color = node.stroke_color if node.stroke_color and node.stroke_color != '#000000' else default_stroke
-                font_color = node.font_color if node.font_color else '#000000'
-                font_size = node.font_size if node.font_size else 12
-                stroke_width = node.stroke_width if node.stroke_width else 1
-                
-                style_parts.extend([
-                    f"fillColor={fill_color}",
-                    f"strokeColor={stroke_color}",
-                    f"fontColor={font_color}",
-                    f"fontSize={font_size}",
-                    f"strokeWidth={stroke_width}"
-                ])
-                
-                return ";".join(style_parts)
-            
-            def _get_edge_style(edge):
-                style_parts = ["endArrow=classic", "html=1", "rounded=0"]
-                
-                stroke_color = edge.stroke_color if edge.stroke_color and edge.stroke_color != '#000000' else '#2e7d32'
-                font_color = edge.font_color if edge.font_color else '#000000'
-                font_size = edge.font_size if edge.font_size else 11
-                stroke_width = edge.stroke_width if edge.stroke_width else 1
-                
-                style_parts.extend([
-                    f"strokeColor={stroke_color}",
-                    f"fontColor={font_color}",
-                    f"fontSize={font_size}",
-                    f"strokeWidth={stroke_width}"
-                ])
-                
-                if edge.edge_type == 'message':
-                    style_parts.append("dashed=1")
-                elif edge.edge_type == 'data':
-                    style_parts.extend(["dashed=1", "dashPattern=3 3"])
-                
-                return ";".join(style_parts)
 
-            for node in clean_nodes:
+            for node in nodes:
                 node_cell_id = str(cell_id_counter)
-                node_cell_map[node.id] = node_cell_id
+                node_cell_map[node['id']] = node_cell_id
                 cell_id_counter += 1
 
-                style = _get_node_style(node)
-                
-                width = node.width if node.width else 120
-                height = node.height if node.height else 60
-                
                 node_cell = etree.SubElement(
                     root_cell, "mxCell",
                     id=node_cell_id,
-                    value=node.name or '',
-                    style=style,
+                    value=node['name'] or '',
+                    style=node_style(
+                        node['node_type'], node['fill_color'], node['stroke_color'],
+                        node['font_color'], node['font_size'], node['stroke_width'],
+                    ),
                     parent="1",
                     vertex="1",
-                    odoo_id=str(node.id)
+                    odoo_id=str(node['id'])
                 )
-                
-                if node.position_x is not None and node.position_y is not None and (node.position_x != 0 or node.position_y != 0):
-                    pos_x = node.position_x
-                    pos_y = node.position_y
-                    _logger.info(f"Using saved position for {node.name}: ({pos_x}, {pos_y})")
+
+                if _has_saved_position(node):
+                    pos_x = node['position_x']
+                    pos_y = node['position_y']
                 else:
-                    pos_x = positions.get(node.id, {}).get('x', 0)
-                    pos_y = positions.get(node.id, {}).get('y', 0)
-                    _logger.info(f"Using calculated position for {node.name}: ({pos_x}, {pos_y})")
-                
-                geom_attrib = {
+                    pos_x = positions.get(node['id'], {}).get('x', 0)
+                    pos_y = positions.get(node['id'], {}).get('y', 0)
+                if debug:
+                    _logger.debug("Node %s placed at (%s, %s)", node['name'], pos_x, pos_y)
+
+                etree.SubElement(node_cell, "mxGeometry", attrib={
                     'x': str(pos_x),
                     'y': str(pos_y),
-                    'width': str(width),
-                    'height': str(height),
+                    'width': str(node['width'] or 120),
+                    'height': str(node['height'] or 60),
                     'as': "geometry"
-                }
-                etree.SubElement(node_cell, "mxGeometry", attrib=geom_attrib)
+                })
 
-            for edge in fresh_edges:
-                if edge.source_node_id.id in node_cell_map and edge.target_node_id.id in node_cell_map:
-                    source_cell_id = node_cell_map[edge.source_node_id.id]
-                    target_cell_id = node_cell_map[edge.target_node_id.id]
-                    
-                    edge_cell_id = str(cell_id_counter)
-                    cell_id_counter += 1
+            for edge in edges:
+                source_cell_id = node_cell_map.get(edge['source_node_id'])
+                target_cell_id = node_cell_map.get(edge['target_node_id'])
+                if not source_cell_id or not target_cell_id:
+                    continue
 
-                    edge_style = _get_edge_style(edge)
-                    
-                    edge_attrib = {
-                        'id': edge_cell_id,
-                        'style': edge_style,
-                        'parent': "1",
-                        'source': source_cell_id,
-                        'target': target_cell_id,
-                        'edge': "1"
-                    }
-                    if edge.condition_expression:
-                        edge_attrib['value'] = edge.condition_expression
-
-                    edge_cell = etree.SubElement(root_cell, "mxCell", attrib=edge_attrib)
-                    
-                    etree.SubElement(edge_cell, "mxGeometry", {'relative': "1", 'as': "geometry"})
+                edge_cell_id = str(cell_id_counter)
+                cell_id_counter += 1
+
+                edge_attrib = {
+                    'id': edge_cell_id,
+                    'style': edge_style(
+                        edge['edge_type'], edge['stroke_color'], edge['font_color'],
+                        edge['font_size'], edge['stroke_width'],
+                    ),
+                    'parent': "1",
+                    'source': source_cell_id,
+                    'target': target_cell_id,
+                    'edge': "1"
+                }
+                if edge['condition_expression']:
+                    edge_attrib['value'] = edge['condition_expression']
+
+                edge_cell = etree.SubElement(root_cell, "mxCell", attrib=edge_attrib)
+                etree.SubElement(edge_cell, "mxGeometry", {'relative': "1", 'as': "geometry"})
 
             xml_string = etree.tostring(root, pretty_print=True, encoding='unicode')
-            _logger.debug(f"Generated XML from graph model with styles: {xml_string}")
+            if debug:
+                _logger.debug("Generated XML from graph model with styles: %s", xml_string)
             return xml_string
         except Exception as e:
             _logger.error(f"Error generating diagram XML from graph model with styles: {e}", exc_info=True)
@@ -317,15 +264,20 @@ class AlmProcess(models.Model):
             process.ensure_one()
             _logger.info(f"Processing diagram for: {process.name}")
 
-            root = self._extract_diagram_root(xml_data)
-            if not root:
+            root = extract_root(xml_data)
+            if root is None:
                 return {'success': False, 'error': 'Could not extract diagram data'}
 
-            nodes_result = self._synchronize_nodes(process, root)
+            cells = index_cells(root)
+            # Ревизия диаграммы меняется один раз за синхронизацию, а не на каждую запись узла или связи
+            sync = self.with_context(alm_diagram_defer_revision=True)
+            nodes_result, nodes, cell_to_node = sync._synchronize_nodes(process, cells)
             
-            edges_result = self._sync_edges(process, root)
+            edges_result, edges = sync._sync_edges(process, cells, cell_to_node)
+            if any(nodes_result.values()) or any(edges_result.values()):
+                process._bump_diagram_revision()
 
-            warnings = self._validate_business_rules(process, root)
+            warnings = self._validate_business_rules(nodes, edges)
 
             _logger.info(f"=== FULL DIAGRAM SYNC COMPLETED ===")
             result = {
@@ -358,38 +310,6 @@ class AlmProcess(models.Model):
         
         
 
-    def _extract_diagram_root(self, xml_data):
-        try:
-            if xml_data.startswith('<mxfile'):
-                _logger.info("Detected mxfile format - extracting diagram data")
-                root = etree.fromstring(xml_data.encode('utf-8'))
-                diagram_elem = root.find('diagram')
-                if diagram_elem is not None and diagram_elem.text is not None:
-                    import base64
-                    import zlib
-                    import urllib.parse
-                    
-                    diagram_data_b64 = diagram_elem.text
-                    diagram_data_compressed = base64.b64decode(diagram_data_b64)
-                    
-                    try:
-                        diagram_data = zlib.decompress(diagram_data_compressed, -15)
-                    except zlib.error:
-                        diagram_data = diagram_data_compressed
-                    
-                    diagram_data_str = diagram_data.decode('utf-8')
-                    
-                    if diagram_data_str.startswith('%3C'):
-                        diagram_data_str = urllib.parse.unquote(diagram_data_str)
-                    
-                    return etree.fromstring(diagram_data_str.encode('utf-8'))
-            else:
-                return etree.fromstring(xml_data.encode('utf-8'))
-                
-        except Exception as e:
-            _logger.error(f"Error extracting diagram root: {e}")
-            return None
-
     def _update_existing_nodes_positions(self, process, root):
         updated_nodes = 0
         
@@ -510,281 +430,212 @@ class AlmProcess(models.Model):
         
         return 'function'
 
-    def _sync_edges(self, process, root):
+    def _sync_edges(self, process, cells, cell_to_node):
+        """
+        Синхронизирует связи с диаграммой по ключу (источник, приёмник).
+        cell_to_node - {id ячейки: id узла} из _synchronize_nodes, концы
+        связи определяются по ячейкам, а не по подписям.
+        Возвращает счётчики и итоговое состояние связей {ключ: значения}.
+        """
         result = {
             'edges_created': 0,
             'edges_updated': 0,
             'edges_deleted': 0
         }
-        
-        existing_edges = self.env['alm_data_flow.process.edge'].search([
-            ('process_id', '=', process.id)
-        ])
-        
-        process_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id)
-        ])
-        name_to_id = {node.name: node.id for node in process_nodes}
-        
-        diagram_edges = []
-        edge_cells = root.xpath("//mxCell[@edge='1']")
-        
-        for edge_cell in edge_cells:
-            edge_data = self._parse_edge_data(edge_cell, root, name_to_id)
+        Edge = self.env['alm_data_flow.process.edge']
+
+        existing_edges = defaultdict(list)
+        for edge in Edge.search_read([('process_id', '=', process.id)], EDGE_DIAGRAM_FIELDS, order='id', load=None):
+            existing_edges[(edge['source_node_id'], edge['target_node_id'])].append(edge)
+
+        diagram_edges = {}
+        for edge_cell in cells.values():
+            if not edge_cell.edge:
+                continue
+            edge_data = self._parse_edge_data(edge_cell, cell_to_node)
             if edge_data and edge_data.get('source_node_id') and edge_data.get('target_node_id'):
-                diagram_edges.append(edge_data)
-        
-        _logger.info(f"Diagram has {len(diagram_edges)} edges, DB has {len(existing_edges)} edges")
-        
-        processed_edge_keys = set()
-        
-        for edge_data in diagram_edges:
-            edge_key = f"{edge_data['source_node_id']}_{edge_data['target_node_id']}"
-            processed_edge_keys.add(edge_key)
-            
-            existing_edge = existing_edges.filtered(
-                lambda e: e.source_node_id.id == edge_data['source_node_id'] and 
-                        e.target_node_id.id == edge_data['target_node_id']
-            )
-            
-            if existing_edge:
-                updates = {}
-                if edge_data.get('condition_expression') != existing_edge.condition_expression:
-                    updates['condition_expression'] = edge_data.get('condition_expression', '')
-                
-                if edge_data.get('stroke_color') != existing_edge.stroke_color:
-                    updates['stroke_color'] = edge_data.get('stroke_color', '#000000')
-                
-                if edge_data.get('stroke_width') != existing_edge.stroke_width:
-                    updates['stroke_width'] = edge_data.get('stroke_width', 1)
-                
-                if edge_data.get('font_color') != existing_edge.font_color:
-                    updates['font_color'] = edge_data.get('font_color', '#000000')
-                
-                if edge_data.get('font_size') != existing_edge.font_size:
-                    updates['font_size'] = edge_data.get('font_size', 11)
-                
-                if updates:
-                    existing_edge.write(updates)
+                diagram_edges[(edge_data['source_node_id'], edge_data['target_node_id'])] = edge_data
+
+        _logger.info(f"Diagram has {len(diagram_edges)} edges, DB has {sum(len(edges) for edges in existing_edges.values())} edges")
+
+        to_delete = [
+            edge['id']
+            for edge_key, edges in existing_edges.items() if edge_key not in diagram_edges
+            for edge in edges
+        ]
+        if to_delete:
+            _logger.info(f"Deleting {len(to_delete)} edges")
+            Edge.browse(to_delete).unlink()
+            result['edges_deleted'] = len(to_delete)
+
+        grouped_updates = defaultdict(list)
+        creates = []
+        for edge_key, edge_data in diagram_edges.items():
+            vals = {
+                'condition_expression': edge_data.get('condition_expression', ''),
+                'stroke_color': edge_data.get('stroke_color', '#000000'),
+                'stroke_width': edge_data.get('stroke_width', 1),
+                'font_color': edge_data.get('font_color', '#000000'),
+                'font_size': edge_data.get('font_size', 11),
+            }
+            if edge_key not in existing_edges:
+                creates.append(dict(vals, process_id=process.id, source_node_id=edge_key[0], target_node_id=edge_key[1], edge_type='sequence'))
+                continue
+            for edge in existing_edges[edge_key]:
+                current = dict(edge, condition_expression=edge['condition_expression'] or '')
+                changes = {field: value for field, value in vals.items() if value != current[field]}
+                if changes:
+                    grouped_updates[tuple(sorted(changes.items()))].append(edge['id'])
                     result['edges_updated'] += 1
-                    _logger.info(f"Updated edge: {edge_data['source_name']} -> {edge_data['target_name']}")
-            else:
-                self.env['alm_data_flow.process.edge'].create({
-                    'process_id': process.id,
-                    'source_node_id': edge_data['source_node_id'],
-                    'target_node_id': edge_data['target_node_id'],
-                    'edge_type': 'sequence',
-                    'condition_expression': edge_data.get('condition_expression', ''),
-                    'stroke_color': edge_data.get('stroke_color', '#000000'),
-                    'stroke_width': edge_data.get('stroke_width', 1),
-                    'font_color': edge_data.get('font_color', '#000000'),
-                    'font_size': edge_data.get('font_size', 11)
-                })
-                result['edges_created'] += 1
-                _logger.info(f"Created edge: {edge_data['source_name']} -> {edge_data['target_name']}")
-        
-        for edge in existing_edges:
-            edge_key = f"{edge.source_node_id.id}_{edge.target_node_id.id}"
-            if edge_key not in processed_edge_keys:
-                _logger.info(f"Deleting edge: {edge.source_node_id.name} -> {edge.target_node_id.name}")
-                edge.unlink()
-                result['edges_deleted'] += 1
-        
-        return result
 
-    def _parse_edge_data(self, edge_cell, root, name_to_id):
+        for changes, edge_ids in grouped_updates.items():
+            Edge.browse(edge_ids).write(dict(changes))
+
+        if creates:
+            Edge.create(creates)
+            result['edges_created'] = len(creates)
+            _logger.info(f"Created {len(creates)} edges")
+
+        edges = {
+            edge_key: {'condition_expression': edge_data.get('condition_expression', '')}
+            for edge_key, edge_data in diagram_edges.items()
+        }
+        return result, edges
+
+    def _parse_edge_data(self, edge_cell, cell_to_node):
         try:
-            source_id = edge_cell.get('source')
-            target_id = edge_cell.get('target')
-            condition = self._clean_html_tags(edge_cell.get('value', ''))
-            style = edge_cell.get('style', '')
-            
-            style_dict = self._parse_style(style)
+            condition = edge_cell.value
+            style_dict = edge_cell.style_dict
             stroke_color = style_dict.get('strokeColor', '#000000')
             stroke_width = int(style_dict.get('strokeWidth', 1))
             font_color = style_dict.get('fontColor', '#000000')
             font_size = int(style_dict.get('fontSize', 11))
             
-            source_cell = root.xpath(f"//mxCell[@id='{source_id}']")
-            target_cell = root.xpath(f"//mxCell[@id='{target_id}']")
+            source_node_id = cell_to_node.get(edge_cell.source)
+            target_node_id = cell_to_node.get(edge_cell.target)
             
-            if source_cell and target_cell:
-                source_name = self._clean_html_tags(source_cell[0].get('value', ''))
-                target_name = self._clean_html_tags(target_cell[0].get('value', ''))
-                
-                source_node_id = name_to_id.get(source_name)
-                target_node_id = name_to_id.get(target_name)
-                
-                if source_node_id and target_node_id:
-                    return {
-                        'source_node_id': source_node_id,
-                        'target_node_id': target_node_id,
-                        'source_name': source_name,
-                        'target_name': target_name,
-                        'condition_expression': condition,
-                        'stroke_color': stroke_color,
-                        'stroke_width': stroke_width,
-                        'font_color': font_color,
-                        'font_size': font_size
-                    }
+            if source_node_id and target_node_id:
+                return {
+                    'source_node_id': source_node_id,
+                    'target_node_id': target_node_id,
+                    'condition_expression': condition,
+                    'stroke_color': stroke_color,
+                    'stroke_width': stroke_width,
+                    'font_color': font_color,
+                    'font_size': font_size
+                }
         
         except Exception as e:
             _logger.error(f"Error parsing edge data: {e}")
         
         return None
     
-    def _synchronize_nodes(self, process, root):
+    def _synchronize_nodes(self, process, cells):
+        """
+        Сравнивает узлы диаграммы с узлами процесса и применяет разницу:
+        один create на все новые узлы, write сгруппированы по одинаковым
+        значениям, один unlink. Возвращает счётчики, итоговое состояние
+        узлов {id: значения} и {id ячейки: id узла} для концов связей.
+        """
         result = {
             'nodes_created': 0,
             'nodes_updated': 0, 
             'nodes_deleted': 0
         }
-        
-        existing_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id)
-        ])
-        existing_node_dict = {node.id: node for node in existing_nodes}
-        existing_node_ids = set(existing_nodes.ids)
-        
+        Node = self.env['alm_data_flow.process.node']
+
+        nodes = {
+            node['id']: node
+            for node in Node.search_read([('process_id', '=', process.id)], NODE_DIAGRAM_FIELDS, order='id', load=None)
+        }
+        name_to_id = {}
+        for node in nodes.values():
+            name_to_id.setdefault(node['name'], node['id'])
+
         diagram_nodes = []
-        all_cells = root.xpath("//mxCell[@vertex='1']")
-        
-        for cell in all_cells:
+        for cell in cells.values():
+            if not cell.vertex:
+                continue
             node_data = self._parse_cell_data(cell)
             if node_data and node_data.get('name'):
                 diagram_nodes.append(node_data)
-        
-        _logger.info(f"Diagram has {len(diagram_nodes)} nodes, DB has {len(existing_nodes)} nodes")
-        
-        processed_node_ids = set()
-        
-        for node_data in diagram_nodes:
-            node_result = self._sync_single_node(process, node_data, existing_node_dict)
-            if node_result == 'created':
-                result['nodes_created'] += 1
-            elif node_result == 'updated':
-                result['nodes_updated'] += 1
-                
-            if node_data.get('odoo_id'):
-                processed_node_ids.add(node_data['odoo_id'])
-        
-        nodes_to_delete = existing_node_ids - processed_node_ids
-        if nodes_to_delete:
-            nodes_to_unlink = existing_nodes.filtered(lambda n: n.id in nodes_to_delete)
-            _logger.info(f"Deleting {len(nodes_to_unlink)} nodes: {[n.name for n in nodes_to_unlink]}")
-            nodes_to_unlink.unlink()
-            result['nodes_deleted'] = len(nodes_to_unlink)
-        
-        return result
 
-    def _sync_single_node(self, process, node_data, existing_node_dict):
-        try:
+        _logger.info(f"Diagram has {len(diagram_nodes)} nodes, DB has {len(nodes)} nodes")
+
+        kept_ids = set()
+        updates = {}
+        creates = {}
+        cell_to_node = {}
+        new_cells = {}
+        for node_data in diagram_nodes:
+            vals = self._get_node_sync_vals(node_data)
             odoo_id = node_data.get('odoo_id')
-            
-            if odoo_id and odoo_id in existing_node_dict:
-                existing_node = existing_node_dict[odoo_id]
-                updates = {}
-                
-                if node_data['name'] != existing_node.name:
-                    updates['name'] = node_data['name']
-                
-                if node_data.get('node_type') and node_data['node_type'] != existing_node.node_type:
-                    updates['node_type'] = node_data['node_type']
-                
-                if node_data.get('fill_color') != existing_node.fill_color:
-                    updates['fill_color'] = node_data.get('fill_color', '#ffffff')
-                
-                if node_data.get('stroke_color') != existing_node.stroke_color:
-                    updates['stroke_color'] = node_data.get('stroke_color', '#000000')
-                
-                if node_data.get('font_color') != existing_node.font_color:
-                    updates['font_color'] = node_data.get('font_color', '#000000')
-                
-                if node_data.get('font_size') != existing_node.font_size:
-                    updates['font_size'] = node_data.get('font_size', 12)
-                
-                if node_data.get('width') != existing_node.width:
-                    updates['width'] = node_data.get('width', 120)
-                
-                if node_data.get('height') != existing_node.height:
-                    updates['height'] = node_data.get('height', 60)
-                
-                updates.update({
-                    'position_x': node_data['position_x'],
-                    'position_y': node_data['position_y'],
-                    'stroke_width': node_data.get('stroke_width', 1)
-                })
-                
-                if updates:
-                    existing_node.write(updates)
-                    return 'updated'
-                else:
-                    return 'no_changes'
-            
+            if odoo_id not in nodes:
+                # Ячейка без odoo_id сопоставляется с узлом по имени
+                odoo_id = name_to_id.get(node_data['name'])
+            if odoo_id:
+                kept_ids.add(odoo_id)
+                cell_to_node[node_data['drawio_id']] = odoo_id
+                changes = {field: value for field, value in vals.items() if value != nodes[odoo_id][field]}
+                if changes:
+                    updates.setdefault(odoo_id, {}).update(changes)
             else:
-                existing_with_same_name = self.env['alm_data_flow.process.node'].search([
-                    ('process_id', '=', process.id),
-                    ('name', '=', node_data['name'])
-                ])
-                
-                if existing_with_same_name:
-                    updates = {
-                        'node_type': node_data.get('node_type', 'function'),
-                        'position_x': node_data['position_x'],
-                        'position_y': node_data['position_y'],
-                        'width': node_data.get('width', 120),
-                        'height': node_data.get('height', 60),
-                        'fill_color': node_data.get('fill_color', '#ffffff'),
-                        'stroke_color': node_data.get('stroke_color', '#000000'),
-                        'stroke_width': node_data.get('stroke_width', 1),
-                        'font_color': node_data.get('font_color', '#000000'),
-                        'font_size': node_data.get('font_size', 12)
-                    }
-                    existing_with_same_name.write(updates)
-                    return 'updated'
-                else:
-                    new_node = self.env['alm_data_flow.process.node'].create({
-                        'process_id': process.id,
-                        'name': node_data['name'],
-                        'node_type': node_data.get('node_type', 'function'),
-                        'position_x': node_data['position_x'],
-                        'position_y': node_data['position_y'],
-                        'width': node_data.get('width', 120),
-                        'height': node_data.get('height', 60),
-                        'fill_color': node_data.get('fill_color', '#ffffff'),
-                        'stroke_color': node_data.get('stroke_color', '#000000'),
-                        'stroke_width': node_data.get('stroke_width', 1),
-                        'font_color': node_data.get('font_color', '#000000'),
-                        'font_size': node_data.get('font_size', 12)
-                    })
-                    _logger.info(f"Created new node: {node_data['name']} (ID: {new_node.id})")
-                    return 'created'
-                    
-        except Exception as e:
-            _logger.error(f"Error syncing node {node_data.get('name')}: {e}")
-            return 'error'
+                # Одноимённые новые ячейки дают один узел, как и раньше
+                creates[node_data['name']] = vals
+                new_cells[node_data['drawio_id']] = node_data['name']
+
+        to_delete = [node_id for node_id in nodes if node_id not in kept_ids]
+        if to_delete:
+            _logger.info(f"Deleting {len(to_delete)} nodes: {[nodes[node_id]['name'] for node_id in to_delete]}")
+            Node.browse(to_delete).unlink()
+            result['nodes_deleted'] = len(to_delete)
+            for node_id in to_delete:
+                del nodes[node_id]
+
+        grouped_updates = defaultdict(list)
+        for node_id, changes in updates.items():
+            grouped_updates[tuple(sorted(changes.items()))].append(node_id)
+            nodes[node_id].update(changes)
+        for changes, node_ids in grouped_updates.items():
+            Node.browse(node_ids).write(dict(changes))
+        result['nodes_updated'] = len(updates)
+
+        if creates:
+            new_nodes = Node.create([dict(vals, process_id=process.id) for vals in creates.values()])
+            created_ids = {}
+            for node, (name, vals) in zip(new_nodes, creates.items()):
+                nodes[node.id] = dict(vals, id=node.id)
+                created_ids[name] = node.id
+            for cell_id, name in new_cells.items():
+                cell_to_node[cell_id] = created_ids[name]
+            result['nodes_created'] = len(new_nodes)
+            _logger.info(f"Created {len(new_nodes)} new nodes: {list(creates)}")
+
+        return result, nodes, cell_to_node
+
+    def _get_node_sync_vals(self, node_data):
+        return {
+            'name': node_data['name'],
+            'node_type': node_data.get('node_type') or 'function',
+            'position_x': node_data['position_x'],
+            'position_y': node_data['position_y'],
+            'width': node_data.get('width', 120),
+            'height': node_data.get('height', 60),
+            'fill_color': node_data.get('fill_color', '#ffffff'),
+            'stroke_color': node_data.get('stroke_color', '#000000'),
+            'stroke_width': node_data.get('stroke_width', 1),
+            'font_color': node_data.get('font_color', '#000000'),
+            'font_size': node_data.get('font_size', 12),
+        }
         
     def _parse_cell_data(self, cell):
         try:
-            drawio_id = cell.get('id')
-            value = cell.get('value', '')
-            style = cell.get('style', '')
-            odoo_id = cell.get('odoo_id')
-            
-            clean_value = self._clean_html_tags(value)
-            
-            if not clean_value or clean_value.strip() == '':
+            if not cell.value:
                 return None
                 
-            node_type = self._determine_node_type(style, clean_value)
+            node_type = self._determine_node_type(cell.style, cell.value)
             
-            geom = cell.find('mxGeometry')
-            pos_x = int(float(geom.get('x', 0))) if geom is not None else 0
-            pos_y = int(float(geom.get('y', 0))) if geom is not None else 0
-            width = int(float(geom.get('width', 120))) if geom is not None else 120
-            height = int(float(geom.get('height', 60))) if geom is not None else 60
-            
-            style_dict = self._parse_style(style)
+            style_dict = cell.style_dict
             fill_color, stroke_color, font_color = self._extract_colors_from_style(style_dict)
             
             font_size = int(style_dict.get('fontSize', 12))
@@ -792,48 +643,32 @@ class AlmProcess(models.Model):
             stroke_width = int(style_dict.get('strokeWidth', 1))
             
             return {
-                'drawio_id': drawio_id,
-                'odoo_id': int(odoo_id) if odoo_id and odoo_id.isdigit() else None,
-                'name': clean_value,
+                'drawio_id': cell.id,
+                'odoo_id': cell.odoo_id,
+                'name': cell.value,
                 'node_type': node_type,
-                'position_x': pos_x,
-                'position_y': pos_y,
-                'width': width,
-                'height': height,
+                'position_x': int(cell.x or 0),
+                'position_y': int(cell.y or 0),
+                'width': 120 if cell.width is None else int(cell.width),
+                'height': 60 if cell.height is None else int(cell.height),
                 'fill_color': fill_color,
                 'stroke_color': stroke_color,
                 'stroke_width': stroke_width,
                 'font_color': font_color,
                 'font_size': font_size,
-                'style': style,
-                'original_value': value
+                'style': cell.style,
+                'original_value': cell.label
             }
         except Exception as e:
             _logger.error(f"Error parsing cell data: {e}")
             return None
         
-    def _clean_html_tags(self, text):
-        if not text:
-            return ""
-        
-        original_text = text
-        
-        import re
-        clean_text = re.sub('<[^<]+?>', '', text)
-        clean_text = clean_text.replace('&nbsp;', ' ').replace('&amp;', '&')
-        clean_text = ' '.join(clean_text.split())
-        
-        if clean_text != original_text:
-            _logger.info(f"Cleaned HTML: '{original_text}' -> '{clean_text}'")
-        
-        return clean_text.strip()
-    
     def _determine_node_type(self, style, value):
         if not style:
             return 'function'
             
         style_lower = style.lower()
-        clean_value = self._clean_html_tags(value).lower() if value else ''
+        clean_value = clean_html_tags(value).lower() if value else ''
         
         if 'ellipse' in style_lower:
             if 'start' in clean_value:
@@ -863,97 +698,93 @@ class AlmProcess(models.Model):
         
         return 'function'
     
-    def _validate_business_rules(self, process, root):
+    def _validate_business_rules(self, nodes, edges):
+        """
+        Проверяет граф процесса в памяти (результат синхронизации) без
+        обращений к базе. nodes - {id: значения узла}, edges - {(источник,
+        приёмник): значения связи}.
+        """
         warnings = []
-        
-        start_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id),
-            ('node_type', '=', 'start')
-        ])
-        
-        if not start_nodes:
+
+        outgoing = defaultdict(list)
+        incoming = defaultdict(list)
+        for (source_id, target_id), edge in edges.items():
+            outgoing[source_id].append((target_id, edge))
+            incoming[target_id].append(source_id)
+
+        start_ids = [node_id for node_id, node in nodes.items() if node['node_type'] == 'start']
+        end_ids = [node_id for node_id, node in nodes.items() if node['node_type'] == 'end']
+
+        def names(node_ids):
+            return [nodes[node_id]['name'] for node_id in node_ids]
+
+        if not start_ids:
             warnings.append("⚠️ Not Start Nodes")
-        elif len(start_nodes) > 1:
+        elif len(start_ids) > 1:
             warnings.append("⚠️ Many Start Nodes")
-        
-        end_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id),
-            ('node_type', '=', 'end')
-        ])
-        
-        if not end_nodes:
-            warnings.append("⚠️ Not End Nodes")
-        
-        all_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id)
-        ])
-        
-        edges = self.env['alm_data_flow.process.edge'].search([
-            ('process_id', '=', process.id)
-        ])
-        
-        connected_nodes = set()
-        for edge in edges:
-            connected_nodes.add(edge.source_node_id.id)
-            connected_nodes.add(edge.target_node_id.id)
-        
-        isolated_nodes = [node for node in all_nodes if node.id not in connected_nodes]
-        if isolated_nodes:
-            warnings.append(f"⚠️ Find isolated Nodes: {[n.name for n in isolated_nodes]}")
-        
-        gateway_nodes = self.env['alm_data_flow.process.node'].search([
-            ('process_id', '=', process.id),
-            ('node_type', '=', 'gateway')
-        ])
-        
-        for gateway in gateway_nodes:
-            outgoing_edges = edges.filtered(lambda e: e.source_node_id.id == gateway.id)
-            if len(outgoing_edges) > 1:
-                edges_without_conditions = outgoing_edges.filtered(lambda e: not e.condition_expression)
-                if len(edges_without_conditions) > 1:
-                    warnings.append(f"⚠️ Gateway '{gateway.name}' has several unconditional connections")
-        
-        for edge in edges:
-            if edge.source_node_id == edge.target_node_id:
-                warnings.append(f"⚠️ Cycle found: node '{edge.source_node_id.name}' refers to itself")
 
-        nodes_without_outgoing = []
-        for node in all_nodes:
-            if node.node_type != 'end':
-                outgoing_edges = edges.filtered(lambda e: e.source_node_id.id == node.id)
-                if not outgoing_edges:
-                    nodes_without_outgoing.append(node.name)
+        if not end_ids:
+            warnings.append("⚠️ Not End Nodes")
 
+        isolated_nodes = [node_id for node_id in nodes if node_id not in outgoing and node_id not in incoming]
+        if isolated_nodes:
+            warnings.append(f"⚠️ Find isolated Nodes: {names(isolated_nodes)}")
+
+        for node_id, node in nodes.items():
+            if node['node_type'] != 'gateway':
+                continue
+            gateway_edges = outgoing.get(node_id, [])
+            if len(gateway_edges) < 2:
+                warnings.append(f"⚠️ Gateway '{node['name']}' has less than two outgoing connections")
+            elif sum(1 for _target_id, edge in gateway_edges if not edge['condition_expression']) > 1:
+                warnings.append(f"⚠️ Gateway '{node['name']}' has several unconditional connections")
+
+        for source_id, target_id in edges:
+            if source_id == target_id:
+                warnings.append(f"⚠️ Cycle found: node '{nodes[source_id]['name']}' refers to itself")
+
+        nodes_without_outgoing = [
+            node_id for node_id, node in nodes.items() if node['node_type'] != 'end' and node_id not in outgoing
+        ]
         if nodes_without_outgoing:
-            warnings.append(f"⚠️ Nodes without outgoing links: {nodes_without_outgoing}")
-
-        nodes_without_incoming = []
-        for node in all_nodes:
-            if node.node_type != 'start':
-                incoming_edges = edges.filtered(lambda e: e.target_node_id.id == node.id)
-                if not incoming_edges:
-                    nodes_without_incoming.append(node.name)
+            warnings.append(f"⚠️ Nodes without outgoing links: {names(nodes_without_outgoing)}")
 
+        nodes_without_incoming = [
+            node_id for node_id, node in nodes.items() if node['node_type'] != 'start' and node_id not in incoming
+        ]
         if nodes_without_incoming:
-            warnings.append(f"⚠️ Nodes without incoming links: {nodes_without_incoming}")
-        
+            warnings.append(f"⚠️ Nodes without incoming links: {names(nodes_without_incoming)}")
+
+        # Достижимость: обход вперёд от стартовых узлов и назад от конечных
+        if start_ids:
+            reachable = self._traverse_graph(start_ids, lambda node_id: (target_id for target_id, _edge in outgoing.get(node_id, [])))
+            unreachable_nodes = [node_id for node_id in nodes if node_id not in reachable]
+            if unreachable_nodes:
+                warnings.append(f"⚠️ Nodes unreachable from start: {names(unreachable_nodes)}")
+
+        if end_ids:
+            leads_to_end = self._traverse_graph(end_ids, lambda node_id: incoming.get(node_id, []))
+            # Узлы без исходящих связей уже перечислены выше
+            leads_to_end.update(nodes_without_outgoing)
+            dead_end_nodes = [node_id for node_id in nodes if node_id not in leads_to_end]
+            if dead_end_nodes:
+                warnings.append(f"⚠️ Nodes with no path to an end node: {names(dead_end_nodes)}")
+
         for warning in warnings:
             _logger.warning(warning)
         
         return warnings
-    
-    def _parse_style(self, style_string):
-        style_dict = {}
-        if not style_string:
-            return style_dict
-        
-        for part in style_string.split(';'):
-            if '=' in part:
-                key, value = part.split('=', 1)
-                style_dict[key] = value
-        
-        return style_dict
 
+    def _traverse_graph(self, start_ids, get_next):
+        visited = set(start_ids)
+        stack = list(start_ids)
+        while stack:
+            for next_id in get_next(stack.pop()):
+                if next_id not in visited:
+                    visited.add(next_id)
+                    stack.append(next_id)
+        return visited
+    
     def _extract_colors_from_style(self, style_dict):
         fill_color = '#ffffff'
         stroke_color = '#000000'
@@ -1,8 +1,12 @@
 from odoo import models, fields, api
+from .alm_data_flow_process import EDGE_DIAGRAM_FIELDS
 
 class AlmDataFlowProcessEdge(models.Model):
     _name = 'alm_data_flow.process.edge'
     _description = 'Process Edge for Data Flow Diagram'
+    _inherit = ['alm.diagram.item.mixin']
+    _diagram_owner_field = 'process_id'
+    _diagram_item_fields = EDGE_DIAGRAM_FIELDS
 
     process_id = fields.Many2one('alm.process', string='Process', required=True, ondelete='cascade')
 
@@ -1,8 +1,12 @@
 from odoo import models, fields, api
+from .alm_data_flow_process import NODE_DIAGRAM_FIELDS
 
 class AlmDataFlowProcessNode(models.Model):
     _name = 'alm_data_flow.process.node'
     _description = 'Process Node for Data Flow Diagram'
+    _inherit = ['alm.diagram.item.mixin']
+    _diagram_owner_field = 'process_id'
+    _diagram_item_fields = NODE_DIAGRAM_FIELDS
 
     process_id = fields.Many2one('alm.process', string='Process', required=True, ondelete='cascade')
     function_id = fields.Many2one(
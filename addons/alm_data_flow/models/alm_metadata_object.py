@@ -0,0 +1,12 @@
+from odoo import models
+
+
+class AlmMetadataObject(models.Model):
+    _inherit = 'alm.metadata.object'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'name' in vals:
+            # Имена объектов - заголовки таблиц на диаграммах сопоставления интеграций
+            self.env['alm.data.flow.integration']._bump_mapping_diagram_revision(self.ids)
+        return res
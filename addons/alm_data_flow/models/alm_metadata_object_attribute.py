@@ -0,0 +1,30 @@
+from odoo import api, models
+from .alm_data_flow_integration import ATTRIBUTE_DIAGRAM_FIELDS
+
+
+class AlmMetadataObjectAttribute(models.Model):
+    _inherit = 'alm.metadata.object.attribute'
+
+    # На диаграмме сопоставления нарисованы все реквизиты объекта в порядке _order
+    _mapping_diagram_fields = ATTRIBUTE_DIAGRAM_FIELDS + ['sequence']
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['alm.data.flow.integration']._bump_mapping_diagram_revision(records.object_id.ids)
+        return records
+
+    def write(self, vals):
+        if vals.keys().isdisjoint(self._mapping_diagram_fields):
+            return super().write(vals)
+        object_ids = set(self.object_id.ids)
+        res = super().write(vals)
+        object_ids.update(self.object_id.ids)
+        self.env['alm.data.flow.integration']._bump_mapping_diagram_revision(object_ids)
+        return res
+
+    def unlink(self):
+        object_ids = self.object_id.ids
+        res = super().unlink()
+        self.env['alm.data.flow.integration']._bump_mapping_diagram_revision(object_ids)
+        return res
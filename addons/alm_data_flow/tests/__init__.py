@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from . import test_diagram_revision
+from . import test_diagram_storage
+from . import test_process_sync
+from . import test_data_flow_sync
+from . import test_mapping_diagram
+from . import test_process_validation
+from . import test_process_diagram
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+from odoo.addons.alm_diagram.tools.mxgraph import node_style
+from .test_process_sync import diagram, edge
+
+PROCESS_STYLE = node_style('process', '#ffffff', '#000000', '#000000', 12, 1)
+START_STYLE = node_style('start', '#ffffff', '#000000', '#000000', 12, 1)
+
+
+def vertex(cell_id, name, style=PROCESS_STYLE, x=0, y=0, odoo_id=None):
+    cell = {
+        'id': cell_id, 'value': name, 'style': style, 'vertex': '1',
+        'geometry': {'x': x, 'y': y, 'width': 160, 'height': 80},
+    }
+    if odoo_id:
+        cell['odoo_id'] = odoo_id
+    return cell
+
+
+class TestDataFlowSync(TransactionCase):
+
+    def setUp(self):
+        super(TestDataFlowSync, self).setUp()
+        app = self.env['alm.configurable.unit'].create({
+            'name': 'Trade', 'technical_name': 'trade', 'unit_type': 'configuration',
+        })
+        self.data_flow = self.env['alm.data.flow'].create({'name': 'Orders', 'application_ids': [(6, 0, app.ids)]})
+        self.Node = self.env['alm_data_flow.data_flow.node']
+        self.Edge = self.env['alm_data_flow.data_flow.edge']
+        Process = self.env['alm.process']
+        self.sales, self.billing = (
+            self.Node.create({
+                'name': name, 'data_flow_id': self.data_flow.id, 'position_x': x, 'position_y': 50,
+                'process_id': Process.create({'name': name, 'application_id': app.id}).id,
+            })
+            for name, x in (('Sales', 50), ('Billing', 300))
+        )
+        self.cells = [
+            vertex('s', 'trade.Sales', x=50, y=50, odoo_id=self.sales.id),
+            vertex('b', 'trade.Billing', x=300, y=50, odoo_id=self.billing.id),
+        ]
+
+    def _sync(self, *cells):
+        result = self.env['alm.data.flow'].action_update_from_diagram_xml(self.data_flow.id, diagram(*cells))
+        self.assertTrue(result['success'], result.get('error'))
+        return result
+
+    def _edges(self):
+        return self.Edge.search([('data_flow_id', '=', self.data_flow.id)])
+
+    def test_01_style_change_in_place(self):
+        """Тест: изменение только стиля связи обновляет ту же запись"""
+        self._sync(*self.cells, edge('e', 's', 'b'))
+        existing = self._edges()
+        self.assertEqual(len(existing), 1)
+
+        result = self._sync(*self.cells, edge('e', 's', 'b', '#ff0000'))
+        self.assertTrue(result['message'].endswith('Edges: +0 ↑1 ↓0'), result['message'])
+        self.assertEqual(self._edges(), existing)
+        self.assertEqual(existing.stroke_color, '#ff0000')
+
+    def test_02_process_node_name_kept(self):
+        """Тест: имя узла процесса не перезаписывается подписью ячейки"""
+        cells = [vertex('s', 'Renamed on diagram', x=120, y=50, odoo_id=self.sales.id), self.cells[1]]
+        self._sync(*cells)
+        self.assertEqual(self.sales.name, 'Sales')
+        self.assertEqual(self.sales.position_x, 120)
+
+    def test_03_new_cells(self):
+        """Тест: новая ячейка не-процесса создаёт узел, новая ячейка процесса - нет"""
+        self._sync(*self.cells, vertex('n', 'Start', style=START_STYLE), vertex('p', 'Unknown process'))
+        nodes = self.Node.search([('data_flow_id', '=', self.data_flow.id)])
+        self.assertEqual(len(nodes), 3)
+        start = nodes - self.sales - self.billing
+        self.assertEqual((start.name, start.node_type), ('Start', 'start'))
+
+    def test_04_edge_to_new_cell(self):
+        """Тест: связь с ещё не сохранённой ячейкой находит созданный узел по ключу"""
+        self._sync(*self.cells, vertex('n', 'Start', style=START_STYLE), edge('e', 'n', 's'))
+        start = self.Node.search([('data_flow_id', '=', self.data_flow.id), ('name', '=', 'Start')])
+        self.assertEqual(len(start), 1)
+        edge_record = self._edges()
+        self.assertEqual((edge_record.source_node_id, edge_record.target_node_id), (start, self.sales))
+
+    def test_05_duplicate_database_edges(self):
+        """Тест: повторяющиеся связи в базе обновляются и удаляются вместе"""
+        duplicates = self.Edge.create([
+            {'data_flow_id': self.data_flow.id, 'source_node_id': self.sales.id, 'target_node_id': self.billing.id}
+            for _i in range(2)
+        ])
+        self._sync(*self.cells, edge('e', 's', 'b', '#ff0000'))
+        self.assertEqual(set(duplicates.mapped('stroke_color')), {'#ff0000'})
+
+        self._sync(*self.cells)
+        self.assertFalse(duplicates.exists())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class TestDiagramRevision(TransactionCase):
+
+    def setUp(self):
+        super(TestDiagramRevision, self).setUp()
+        self.app = self.env['alm.configurable.unit'].create({
+            'name': 'Trade', 'technical_name': 'trade', 'unit_type': 'configuration',
+        })
+        self.process = self.env['alm.process'].create({'name': 'Sales', 'application_id': self.app.id})
+        self.data_flow = self.env['alm.data.flow'].create({'name': 'Orders', 'application_ids': [(6, 0, self.app.ids)]})
+        self.flow_node = self.env['alm_data_flow.data_flow.node'].create({
+            'name': 'Sales', 'data_flow_id': self.data_flow.id, 'process_id': self.process.id,
+        })
+
+        version = self.env['alm.configurable.unit.version'].create({'name': '1.0.0', 'unit_id': self.app.id})
+        catalog = self.env.ref('alm_metadata.meta_type_catalog')
+        self.items = self.env['alm.metadata.object'].create({
+            'name': 'Items', 'technical_name': 'Items', 'type_id': catalog.id, 'version_id': version.id,
+        })
+        self.code = self.env['alm.metadata.object.attribute'].create({
+            'name': 'Code', 'technical_name': 'Code', 'object_id': self.items.id,
+        })
+        self.integration = self.env['alm.data.flow.integration'].create({
+            'name': 'Items export', 'data_flow_id': self.data_flow.id,
+        })
+        self.env['alm.data.flow.field.map'].create({
+            'integration_id': self.integration.id, 'source_field_id': self.code.id, 'technical_field': 'code',
+        })
+
+    def test_01_item_fields(self):
+        """Тест: ревизию владельца меняют только поля элемента, видимые на диаграмме"""
+        node = self.env['alm_data_flow.process.node'].create({'name': 'Start', 'process_id': self.process.id})
+        revision = self.process.diagram_revision
+        node.metadata_in = {'objects': []}
+        self.assertEqual(self.process.diagram_revision, revision)
+        node.position_x = 100
+        self.assertNotEqual(self.process.diagram_revision, revision)
+
+    def test_02_sync_bumps_once(self):
+        """Тест: синхронизация с диаграммой меняет ревизию, только если что-то изменилось"""
+        self.env['alm_data_flow.process.node'].create([
+            {'name': 'Start', 'node_type': 'start', 'process_id': self.process.id, 'position_x': 50, 'position_y': 50},
+            {'name': 'End', 'node_type': 'end', 'process_id': self.process.id, 'position_x': 250, 'position_y': 50},
+        ])
+        Process = self.env['alm.process']
+        xml = Process.action_generate_diagram_xml(self.process.id)
+        # Первая синхронизация приводит стили узлов к значениям из диаграммы
+        self.assertTrue(Process.action_update_from_diagram_xml(self.process.id, xml)['success'])
+        revision = self.process.diagram_revision
+        result = Process.action_update_from_diagram_xml(self.process.id, xml)
+        self.assertEqual(result['results']['nodes_updated'], 0)
+        self.assertEqual(self.process.diagram_revision, revision)
+
+        xml = xml.replace('x="250"', 'x="400"')
+        result = Process.action_update_from_diagram_xml(self.process.id, xml)
+        self.assertEqual(result['results']['nodes_updated'], 1)
+        self.assertNotEqual(self.process.diagram_revision, revision)
+
+    def test_03_metadata_changes(self):
+        """Тест: имена и реквизиты объектов на диаграмме сопоставления меняют ревизию интеграции"""
+        revision = self.integration.diagram_revision
+        self.items.name = 'Products'
+        self.assertNotEqual(self.integration.diagram_revision, revision)
+
+        revision = self.integration.diagram_revision
+        self.code.name = 'Article'
+        self.assertNotEqual(self.integration.diagram_revision, revision)
+
+        revision = self.integration.diagram_revision
+        self.env['alm.metadata.object.attribute'].create({
+            'name': 'Barcode', 'technical_name': 'Barcode', 'object_id': self.items.id,
+        })
+        self.assertNotEqual(self.integration.diagram_revision, revision)
+
+        revision = self.integration.diagram_revision
+        self.code.technical_name = 'Article'
+        self.assertEqual(self.integration.diagram_revision, revision)
+
+    def test_04_application_technical_name(self):
+        """Тест: техническое имя приложения в подписи узла меняет ревизию потока данных"""
+        revision = self.data_flow.diagram_revision
+        self.app.technical_name = 'retail'
+        self.assertNotEqual(self.data_flow.diagram_revision, revision)
+        xml = self.env['alm.data.flow'].action_generate_diagram_xml(self.data_flow.id)
+        self.assertIn('retail.Sales', xml)
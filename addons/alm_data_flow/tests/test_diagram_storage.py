@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+from odoo.tools.sql import column_exists
+
+DIAGRAM_XML = '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>'
+
+
+class TestDiagramStorage(TransactionCase):
+
+    def setUp(self):
+        super(TestDiagramStorage, self).setUp()
+        app = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        self.process = self.env['alm.process'].create({'name': 'Sales', 'application_id': app.id})
+
+    def test_01_compressed_roundtrip(self):
+        """Тест: XML диаграммы хранится сжатым и читается обратно без изменений"""
+        self.process.diagram_data = DIAGRAM_XML
+        self.process.invalidate_recordset()
+        self.assertTrue(self.process.diagram_payload)
+        self.assertEqual(self.process.diagram_data, DIAGRAM_XML)
+
+        self.process.diagram_data = False
+        self.process.invalidate_recordset()
+        self.assertFalse(self.process.diagram_payload)
+        self.assertFalse(self.process.diagram_data)
+
+    def test_02_bin_size(self):
+        """Тест: под bin_size=True XML диаграммы читается целиком, а не размер вложения"""
+        self.process.diagram_data = DIAGRAM_XML
+        self.process.invalidate_recordset()
+        process = self.process.with_context(bin_size=True)
+        self.assertEqual(process.diagram_data, DIAGRAM_XML)
+        self.assertEqual(process.read(['diagram_data'])[0]['diagram_data'], DIAGRAM_XML)
+
+    def test_03_widget_methods(self):
+        """Тест: форма не читает XML диаграммы, виджет получает и сохраняет его отдельно"""
+        for model, field_name in (('alm.process', 'diagram_data'), ('alm.data.flow', 'diagram'),
+                                  ('alm.data.flow.integration', 'diagram_data')):
+            arch = self.env[model].get_view(view_type='form')['arch']
+            self.assertNotIn('name="%s"' % field_name, arch)
+
+        self.assertFalse(self.process.read_diagram_data())
+        self.assertTrue(self.process.write_diagram_data(DIAGRAM_XML))
+        self.process.invalidate_recordset()
+        self.assertEqual(self.process.read_diagram_data(), DIAGRAM_XML)
+
+    def test_04_migrate_text_column(self):
+        """Тест: XML из прежней текстовой колонки переносится в сжатые вложения"""
+        self.env.flush_all()
+        self.env.cr.execute("ALTER TABLE alm_process ADD COLUMN diagram_data text")
+        self.env.cr.execute("UPDATE alm_process SET diagram_data = %s WHERE id = %s", (DIAGRAM_XML, self.process.id))
+        self.env['alm.process']._migrate_diagram_column()
+        self.assertFalse(column_exists(self.env.cr, 'alm_process', 'diagram_data'))
+        self.process.invalidate_recordset()
+        self.assertEqual(self.process.diagram_data, DIAGRAM_XML)
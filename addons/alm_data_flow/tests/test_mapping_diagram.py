@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from lxml import etree
+
+from odoo.tests.common import TransactionCase
+from odoo.addons.alm_diagram.tools.mxgraph import parse_style
+from odoo.addons.alm_data_flow.models.alm_data_flow_integration import (
+    ATTRIBUTE_STYLE, CHILD_ATTRIBUTE_STYLE, ENTITY_STYLE, TECHNICAL_ENTITY_STYLE,
+)
+
+
+class TestMappingDiagram(TransactionCase):
+
+    def setUp(self):
+        super(TestMappingDiagram, self).setUp()
+        app = self.env['alm.configurable.unit'].create({
+            'name': 'Trade', 'technical_name': 'trade', 'unit_type': 'configuration',
+        })
+        data_flow = self.env['alm.data.flow'].create({'name': 'Orders', 'application_ids': [(6, 0, app.ids)]})
+        version = self.env['alm.configurable.unit.version'].create({'name': '1.0.0', 'unit_id': app.id})
+        catalog = self.env.ref('alm_metadata.meta_type_catalog')
+        self.Attribute = self.env['alm.metadata.object.attribute']
+        self.FieldMap = self.env['alm.data.flow.field.map']
+        self.items, self.orders = self.env['alm.metadata.object'].create([
+            {'name': name, 'technical_name': name, 'type_id': catalog.id, 'version_id': version.id}
+            for name in ('Items', 'Orders')
+        ])
+        self.code, self.barcodes = self.Attribute.create([
+            {'name': 'Code', 'technical_name': 'Code', 'object_id': self.items.id, 'sequence': 1},
+            {'name': 'Barcodes', 'technical_name': 'Barcodes', 'object_id': self.items.id, 'sequence': 2},
+        ])
+        self.barcode, self.barcode_type = self.Attribute.create([
+            {'name': name, 'technical_name': name, 'object_id': self.items.id, 'parent_id': self.barcodes.id, 'sequence': sequence}
+            for name, sequence in (('Barcode', 2), ('Type', 1))
+        ])
+        # Порядок реквизитов задаёт sequence, а не имя
+        self.item, self.quantity = self.Attribute.create([
+            {'name': 'Item', 'technical_name': 'Item', 'object_id': self.orders.id, 'sequence': 2},
+            {'name': 'Quantity', 'technical_name': 'Quantity', 'object_id': self.orders.id, 'sequence': 1},
+        ])
+        self.integration = self.env['alm.data.flow.integration'].create({
+            'name': 'Items export', 'data_flow_id': data_flow.id,
+        })
+        self.direct = self.FieldMap.create({
+            'integration_id': self.integration.id, 'source_field_id': self.code.id, 'target_field_id': self.item.id,
+        })
+        self.FieldMap.create({
+            'integration_id': self.integration.id, 'source_field_id': self.barcode.id, 'technical_field': 'barcode',
+        })
+
+    def _cells(self, xml):
+        return [cell for cell in etree.fromstring(xml).iter('mxCell') if cell.get('parent')]
+
+    def _edge_colors(self, xml):
+        return {
+            cell.get('path_key'): parse_style(cell.get('style'))['strokeColor']
+            for cell in etree.fromstring(xml).iter('mxCell') if cell.get('edge') == '1'
+        }
+
+    def test_01_regenerated_xml_identical(self):
+        """Тест: при неизменных данных диаграмма генерируется байт в байт одинаково"""
+        xml = self.integration.action_generate_mapping_diagram_xml()
+        self.assertEqual(self.integration.action_generate_mapping_diagram_xml(), xml)
+        # Повторная генерация в обход кэша даёт тот же XML
+        self.assertEqual(self.integration._generate_mapping_diagram_xml(None), xml)
+
+    def test_02_path_colors_persisted(self):
+        """Тест: цвета путей сохраняются в записи и не перезаписываются без изменений"""
+        xml = self.integration.action_generate_mapping_diagram_xml()
+        colors = self.integration.diagram_path_colors
+        self.assertEqual(set(colors), {'direct_%s' % self.direct.id, 'barcode'})
+        self.assertEqual(self._edge_colors(xml), colors)
+
+        writes = []
+        original_write = type(self.integration).write
+
+        def write(records, vals):
+            writes.append(vals)
+            return original_write(records, vals)
+
+        with patch.object(type(self.integration), 'write', write):
+            self.integration._generate_mapping_diagram_xml(None)
+        self.assertEqual(writes, [])
+
+    def test_03_new_mapping_keeps_colors(self):
+        """Тест: новое сопоставление не меняет цвета уже нарисованных путей"""
+        self.integration.action_generate_mapping_diagram_xml()
+        colors = dict(self.integration.diagram_path_colors)
+
+        added = self.FieldMap.create({
+            'integration_id': self.integration.id, 'source_field_id': self.code.id, 'target_field_id': self.quantity.id,
+        })
+        edge_colors = self._edge_colors(self.integration.action_generate_mapping_diagram_xml())
+        new_key = 'direct_%s' % added.id
+        self.assertEqual({key: edge_colors[key] for key in colors}, colors)
+        self.assertNotIn(edge_colors[new_key], colors.values())
+        self.assertEqual(self.integration.diagram_path_colors, edge_colors)
+
+    def test_04_generated_cells(self):
+        """Тест: таблицы объектов, строки реквизитов в порядке sequence и связи между ними"""
+        cells = self._cells(self.integration._generate_mapping_diagram_xml(None))
+        entities = [cell for cell in cells if cell.get('parent') == '1' and cell.get('vertex') == '1']
+        self.assertEqual([cell.get('value') for cell in entities], ['Items', 'Orders', 'Technical Fields'])
+        self.assertEqual([cell.get('style') for cell in entities], [ENTITY_STYLE, ENTITY_STYLE, TECHNICAL_ENTITY_STYLE])
+
+        rows = {
+            entity.get('value'): [(cell.get('value'), cell.get('style')) for cell in cells if cell.get('parent') == entity.get('id')]
+            for entity in entities
+        }
+        self.assertEqual(rows, {
+            'Items': [
+                ('Code', ATTRIBUTE_STYLE),
+                ('Barcodes', ATTRIBUTE_STYLE),
+                ('Type', CHILD_ATTRIBUTE_STYLE),
+                ('Barcode', CHILD_ATTRIBUTE_STYLE),
+            ],
+            'Orders': [('Quantity', ATTRIBUTE_STYLE), ('Item', ATTRIBUTE_STYLE)],
+            'Technical Fields': [('barcode', ATTRIBUTE_STYLE)],
+        })
+        # Высота таблицы - заголовок и по строке на реквизит
+        for entity in entities:
+            self.assertEqual(int(entity.find('mxGeometry').get('height')), 26 * (len(rows[entity.get('value')]) + 1))
+
+        cell_ids = {
+            (entity.get('value'), cell.get('value')): cell.get('id')
+            for entity in entities for cell in cells if cell.get('parent') == entity.get('id')
+        }
+        edges = {cell.get('path_key'): (cell.get('source'), cell.get('target')) for cell in cells if cell.get('edge') == '1'}
+        self.assertEqual(edges, {
+            'direct_%s' % self.direct.id: (cell_ids['Items', 'Code'], cell_ids['Orders', 'Item']),
+            'barcode': (cell_ids['Items', 'Barcode'], cell_ids['Technical Fields', 'barcode']),
+        })
+
+    def test_05_attribute_queries(self):
+        """Тест: число запросов генератора не зависит от числа реквизитов"""
+        # Первая генерация сохраняет цвета путей, дальше записи нет
+        self.integration._generate_mapping_diagram_xml(None)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        self.integration._generate_mapping_diagram_xml(None)
+        queries = self.env.cr.sql_log_count - queries
+
+        for parent in self.code | self.barcodes | self.item:
+            self.Attribute.create([
+                {'name': 'Child %s' % i, 'technical_name': 'Child%s_%s' % (parent.id, i), 'object_id': parent.object_id.id, 'parent_id': parent.id}
+                for i in range(5)
+            ])
+        self.env.flush_all()
+        self.env.invalidate_all()
+        with self.assertQueryCount(queries):
+            self.integration._generate_mapping_diagram_xml(None)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from lxml import etree
+
+from odoo.tests.common import TransactionCase
+from odoo.addons.alm_diagram.tools.mxgraph import edge_style, node_style
+
+
+class TestProcessDiagram(TransactionCase):
+
+    def setUp(self):
+        super(TestProcessDiagram, self).setUp()
+        app = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        self.process = self.env['alm.process'].create({'name': 'Sales', 'application_id': app.id})
+        self.Node = self.env['alm_data_flow.process.node']
+        self.Edge = self.env['alm_data_flow.process.edge']
+        self.start, self.approve, self.end = self.Node.create([
+            {'name': 'Start', 'node_type': 'start', 'process_id': self.process.id, 'position_x': 50, 'position_y': 50},
+            {
+                'name': 'Approve', 'node_type': 'function', 'process_id': self.process.id,
+                'position_x': 200, 'position_y': 50, 'width': 140, 'fill_color': '#ff0000',
+            },
+            {'name': 'End', 'node_type': 'end', 'process_id': self.process.id, 'position_x': 400, 'position_y': 50},
+        ])
+        self.Edge.create([
+            {'process_id': self.process.id, 'source_node_id': self.start.id, 'target_node_id': self.approve.id},
+            {
+                'process_id': self.process.id, 'source_node_id': self.approve.id, 'target_node_id': self.end.id,
+                'edge_type': 'message', 'condition_expression': 'approved', 'stroke_color': '#123456',
+            },
+        ])
+
+    def _generate(self):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        self.process.name
+        # Узлы и связи читаются одним search_read на модель, сколько бы их ни было
+        with self.assertQueryCount(2):
+            return etree.fromstring(self.process._generate_diagram_xml())
+
+    def test_01_cells(self):
+        """Тест: узлы и связи процесса попадают в диаграмму со стилями и odoo_id"""
+        root = self._generate()
+        vertices = root.xpath("//mxCell[@vertex='1']")
+        self.assertEqual(
+            [(cell.get('value'), cell.get('odoo_id'), cell.get('style')) for cell in vertices],
+            [
+                (node.name, str(node.id), node_style(
+                    node.node_type, node.fill_color, node.stroke_color, node.font_color, node.font_size, node.stroke_width,
+                ))
+                for node in self.start | self.approve | self.end
+            ],
+        )
+        self.assertIn('fillColor=#ff0000', vertices[1].get('style'))
+        self.assertEqual(dict(vertices[1].find('mxGeometry').attrib), {
+            'x': '200', 'y': '50', 'width': '140', 'height': '60', 'as': 'geometry',
+        })
+
+        cell_by_node = {int(cell.get('odoo_id')): cell.get('id') for cell in vertices}
+        edges = root.xpath("//mxCell[@edge='1']")
+        self.assertEqual(
+            [(cell.get('source'), cell.get('target'), cell.get('value'), cell.get('style')) for cell in edges],
+            [
+                (cell_by_node[self.start.id], cell_by_node[self.approve.id], None,
+                 edge_style('sequence', '#000000', '#000000', 11, 1)),
+                (cell_by_node[self.approve.id], cell_by_node[self.end.id], 'approved',
+                 edge_style('message', '#123456', '#000000', 11, 1)),
+            ],
+        )
+
+    def test_02_queries_do_not_grow(self):
+        """Тест: число запросов не растёт с числом узлов и связей"""
+        nodes = self.Node.create([
+            {'name': 'Step %s' % i, 'process_id': self.process.id, 'position_x': 200, 'position_y': 150 + 100 * i}
+            for i in range(10)
+        ])
+        self.Edge.create([
+            {'process_id': self.process.id, 'source_node_id': self.approve.id, 'target_node_id': node.id}
+            for node in nodes
+        ])
+        root = self._generate()
+        self.assertEqual(len(root.xpath("//mxCell[@vertex='1']")), 13)
+        self.assertEqual(len(root.xpath("//mxCell[@edge='1']")), 12)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from lxml import etree
+
+from odoo.tests.common import TransactionCase
+from odoo.addons.alm_diagram.tools.mxgraph import node_style
+
+FUNCTION_STYLE = node_style('function', '#ffffff', '#000000', '#000000', 12, 1)
+
+
+def edge_style(stroke_color='#000000'):
+    return 'endArrow=classic;html=1;strokeColor=%s;fontColor=#000000;fontSize=11;strokeWidth=1' % stroke_color
+
+
+def diagram(*cells):
+    """XML диаграммы из описаний ячеек: словари атрибутов mxCell (+ geometry)"""
+    root = etree.Element('mxGraphModel')
+    root_cell = etree.SubElement(root, 'root')
+    etree.SubElement(root_cell, 'mxCell', id='0')
+    etree.SubElement(root_cell, 'mxCell', id='1', parent='0')
+    for cell in cells:
+        cell = dict(cell)
+        geometry = cell.pop('geometry', None)
+        element = etree.SubElement(root_cell, 'mxCell', {key: str(value) for key, value in cell.items()}, parent='1')
+        if geometry:
+            etree.SubElement(element, 'mxGeometry', {key: str(value) for key, value in geometry.items()}, **{'as': 'geometry'})
+        else:
+            etree.SubElement(element, 'mxGeometry', relative='1', **{'as': 'geometry'})
+    return etree.tostring(root, encoding='unicode')
+
+
+def vertex(cell_id, name, x=0, y=0, odoo_id=None):
+    cell = {
+        'id': cell_id, 'value': name, 'style': FUNCTION_STYLE, 'vertex': '1',
+        'geometry': {'x': x, 'y': y, 'width': 120, 'height': 60},
+    }
+    if odoo_id:
+        cell['odoo_id'] = odoo_id
+    return cell
+
+
+def edge(cell_id, source, target, stroke_color='#000000'):
+    return {'id': cell_id, 'style': edge_style(stroke_color), 'edge': '1', 'source': source, 'target': target}
+
+
+class TestProcessSync(TransactionCase):
+
+    def setUp(self):
+        super(TestProcessSync, self).setUp()
+        app = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        self.process = self.env['alm.process'].create({'name': 'Sales', 'application_id': app.id})
+        self.Node = self.env['alm_data_flow.process.node']
+        self.Edge = self.env['alm_data_flow.process.edge']
+
+    def _node(self, name, x=0, y=0):
+        return self.Node.create({
+            'name': name, 'process_id': self.process.id, 'position_x': x, 'position_y': y,
+            'width': 120, 'height': 60,
+        })
+
+    def _sync(self, *cells):
+        result = self.env['alm.process'].action_update_from_diagram_xml(self.process.id, diagram(*cells))
+        self.assertTrue(result['success'], result.get('error'))
+        return result['results']
+
+    def _nodes(self):
+        return self.Node.search([('process_id', '=', self.process.id)])
+
+    def _edges(self):
+        return self.Edge.search([('process_id', '=', self.process.id)])
+
+    def test_01_edges_follow_cells_not_labels(self):
+        """Тест: концы связи определяются по ячейкам, а не по одинаковым подписям"""
+        start = self._node('Start')
+        first = self._node('Task', x=200)
+        second = self._node('Task', x=400)
+        results = self._sync(
+            vertex('s', 'Start', odoo_id=start.id),
+            vertex('a', 'Task', x=200, odoo_id=first.id),
+            vertex('b', 'Task', x=400, odoo_id=second.id),
+            edge('e1', 's', 'a'),
+            edge('e2', 'a', 'b'),
+        )
+        self.assertEqual(results['edges_created'], 2)
+        pairs = {(edge.source_node_id, edge.target_node_id) for edge in self._edges()}
+        self.assertEqual(pairs, {(start, first), (first, second)})
+
+    def test_02_new_cell_creates_node(self):
+        """Тест: новая ячейка создаёт узел"""
+        results = self._sync(vertex('n', 'Approve', x=100, y=40))
+        self.assertEqual(results['nodes_created'], 1)
+        node = self._nodes()
+        self.assertEqual(node.name, 'Approve')
+        self.assertEqual((node.position_x, node.position_y), (100, 40))
+
+    def test_03_removed_cell_unlinks_node(self):
+        """Тест: узел, ячейки которого нет на диаграмме, удаляется"""
+        kept = self._node('Kept')
+        removed = self._node('Removed', x=200)
+        results = self._sync(vertex('k', 'Kept', odoo_id=kept.id))
+        self.assertEqual(results['nodes_deleted'], 1)
+        self.assertFalse(removed.exists())
+        self.assertEqual(self._nodes(), kept)
+
+    def test_04_cell_matched_by_name(self):
+        """Тест: ячейка без odoo_id с именем существующего узла обновляет этот узел"""
+        node = self._node('Check')
+        results = self._sync(vertex('c', 'Check', x=300, y=120))
+        self.assertEqual(results['nodes_created'], 0)
+        self.assertEqual(results['nodes_deleted'], 0)
+        self.assertEqual(results['nodes_updated'], 1)
+        self.assertEqual(self._nodes(), node)
+        self.assertEqual((node.position_x, node.position_y), (300, 120))
+
+    def test_05_same_named_new_cells(self):
+        """Тест: одноимённые новые ячейки дают один узел"""
+        results = self._sync(vertex('r1', 'Review'), vertex('r2', 'Review', x=200))
+        self.assertEqual(results['nodes_created'], 1)
+        self.assertEqual(len(self._nodes()), 1)
+
+    def test_06_duplicate_diagram_edges(self):
+        """Тест: повторяющиеся связи диаграммы дают одну связь"""
+        source = self._node('Source')
+        target = self._node('Target', x=200)
+        results = self._sync(
+            vertex('s', 'Source', odoo_id=source.id),
+            vertex('t', 'Target', x=200, odoo_id=target.id),
+            edge('e1', 's', 't'),
+            edge('e2', 's', 't'),
+        )
+        self.assertEqual(results['edges_created'], 1)
+        self.assertEqual(len(self._edges()), 1)
+
+    def test_07_style_change_single_write(self):
+        """Тест: изменение только стиля связей - один сгруппированный write"""
+        first, second, third = self._node('First'), self._node('Second', x=200), self._node('Third', x=400)
+        edges = self.Edge.create([
+            {'process_id': self.process.id, 'source_node_id': first.id, 'target_node_id': second.id},
+            {'process_id': self.process.id, 'source_node_id': second.id, 'target_node_id': third.id},
+        ])
+        cells = [
+            vertex('a', 'First', odoo_id=first.id),
+            vertex('b', 'Second', x=200, odoo_id=second.id),
+            vertex('c', 'Third', x=400, odoo_id=third.id),
+        ]
+        results = self._sync(*cells, edge('e1', 'a', 'b'), edge('e2', 'b', 'c'))
+        self.assertEqual(results['edges_updated'], 0)
+
+        writes = []
+        original_write = type(self.Edge).write
+
+        def write(records, vals):
+            writes.append((set(records.ids), vals))
+            return original_write(records, vals)
+
+        with patch.object(type(self.Edge), 'write', write):
+            results = self._sync(*cells, edge('e1', 'a', 'b', '#ff0000'), edge('e2', 'b', 'c', '#ff0000'))
+        self.assertEqual(results['edges_updated'], 2)
+        self.assertEqual(results['edges_created'], 0)
+        self.assertEqual(results['edges_deleted'], 0)
+        self.assertEqual(writes, [(set(edges.ids), {'stroke_color': '#ff0000'})])
+        self.assertEqual(self._edges(), edges)
+        self.assertEqual(set(edges.mapped('stroke_color')), {'#ff0000'})
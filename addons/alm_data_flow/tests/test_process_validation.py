@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+NODES = {
+    1: {'node_type': 'start', 'name': 'Start'},
+    2: {'node_type': 'gateway', 'name': 'Check'},
+    3: {'node_type': 'function', 'name': 'Approve'},
+    4: {'node_type': 'function', 'name': 'Loop'},
+    5: {'node_type': 'end', 'name': 'End'},
+    6: {'node_type': 'function', 'name': 'Back'},
+    7: {'node_type': 'function', 'name': 'Stuck'},
+    8: {'node_type': 'function', 'name': 'Orphan'},
+}
+EDGES = {
+    pair: {'condition_expression': ''}
+    for pair in ((1, 2), (2, 3), (3, 5), (3, 4), (4, 6), (6, 4), (3, 7), (8, 5))
+}
+
+
+class TestProcessValidation(TransactionCase):
+
+    def _validate(self, nodes, edges):
+        with self.assertQueryCount(0), self.assertLogs('odoo.addons.alm_data_flow.models.alm_data_flow_process', 'WARNING'):
+            return self.env['alm.process']._validate_business_rules(nodes, edges)
+
+    def test_01_warnings(self):
+        """Тест: проверка графа процесса в памяти находит все нарушения"""
+        self.assertEqual(self._validate(NODES, EDGES), [
+            "⚠️ Gateway 'Check' has less than two outgoing connections",
+            "⚠️ Nodes without outgoing links: ['Stuck']",
+            "⚠️ Nodes without incoming links: ['Orphan']",
+            "⚠️ Nodes unreachable from start: ['Orphan']",
+            "⚠️ Nodes with no path to an end node: ['Loop', 'Back']",
+        ])
+
+    def test_02_valid_graph(self):
+        """Тест: правильный процесс проверяется без предупреждений и запросов"""
+        nodes = {
+            1: {'node_type': 'start', 'name': 'Start'},
+            2: {'node_type': 'gateway', 'name': 'Check'},
+            3: {'node_type': 'function', 'name': 'Approve'},
+            4: {'node_type': 'end', 'name': 'End'},
+        }
+        edges = {
+            (1, 2): {'condition_expression': ''},
+            (2, 3): {'condition_expression': 'approved'},
+            (2, 4): {'condition_expression': ''},
+            (3, 4): {'condition_expression': ''},
+        }
+        with self.assertQueryCount(0):
+            self.assertEqual(self.env['alm.process']._validate_business_rules(nodes, edges), [])
+
+    def test_03_start_end_and_gateway_conditions(self):
+        """Тест: отсутствие начала и конца, шлюз без условий и петля на себя"""
+        nodes = {
+            1: {'node_type': 'gateway', 'name': 'Check'},
+            2: {'node_type': 'function', 'name': 'Left'},
+            3: {'node_type': 'function', 'name': 'Right'},
+        }
+        edges = {(1, 2): {'condition_expression': ''}, (1, 3): {'condition_expression': ''}, (2, 2): {'condition_expression': ''}}
+        warnings = self._validate(nodes, edges)
+        self.assertIn("⚠️ Not Start Nodes", warnings)
+        self.assertIn("⚠️ Not End Nodes", warnings)
+        self.assertIn("⚠️ Gateway 'Check' has several unconditional connections", warnings)
+        self.assertIn("⚠️ Cycle found: node 'Left' refers to itself", warnings)
@@ -26,6 +26,7 @@
     ],
     'assets': {
         'web.assets_backend': [
+            'alm_diagram/static/src/js/diagram_data.js',
             'alm_diagram/static/src/js/process_diagram_widget.js',
             'alm_diagram/static/src/xml/process_diagram_widget.xml',
             'alm_diagram/static/src/scss/process_diagram_widget.scss',
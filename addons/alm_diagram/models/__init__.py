@@ -0,0 +1 @@
+from . import diagram_mixin
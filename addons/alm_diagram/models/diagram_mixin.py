@@ -0,0 +1,250 @@
+from odoo import models, fields, api
+from odoo.tools import SQL, split_every
+from odoo.tools.lru import LRU
+from odoo.tools.sql import column_exists
+import hashlib
+import logging
+from ..tools.layout import LAYOUT_ENGINES, incremental_layout, layered_layout, spring_layout
+from ..tools.mxgraph import compress, decompress, path_color
+
+_logger = logging.getLogger(__name__)
+
+# Последовательность не откатывается вместе с транзакцией, поэтому номер
+# ревизии никогда не обозначает два разных состояния графа
+REVISION_SEQUENCE = 'alm_diagram_revision_seq'
+
+# Число диаграмм, переносимых в сжатые вложения за один create
+MIGRATION_BATCH_SIZE = 500
+
+# (dbname, model, id, revision, движок раскладки, входные данные) -> XML диаграммы
+_diagram_cache = LRU(256)
+
+
+def _cache_input(value):
+    """Большие строки (текущий XML диаграммы) попадают в ключ в виде хэша."""
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if isinstance(value, bytes):
+        return hashlib.sha1(value).hexdigest()
+    return value
+
+
+class DiagramMixin(models.AbstractModel):
+    _name = 'alm.diagram.mixin'
+    _description = 'ALM Diagram Revision Mixin'
+
+    # Собственные поля записи, от которых зависит XML диаграммы
+    _diagram_revision_fields = ()
+
+    # Текстовое поле модели с XML диаграммы для виджета draw.io. Объявляется
+    # в модели как compute='_compute_diagram_data', inverse='_inverse_diagram_data',
+    # а хранится сжатым в diagram_payload
+    _diagram_data_field = None
+
+    diagram_revision = fields.Integer(
+        string='Diagram Revision',
+        readonly=True,
+        copy=False,
+        help="Changes whenever the nodes, edges or mappings drawn on the diagram change."
+    )
+    diagram_path_colors = fields.Json(
+        string='Diagram Path Colors',
+        readonly=True,
+        copy=False,
+        help="Colors assigned to the paths drawn on the diagram, kept so that regenerated diagrams do not change."
+    )
+    diagram_payload = fields.Binary(
+        string='Compressed Diagram',
+        attachment=True,
+        help="Diagram XML compressed with raw deflate. Read only when the diagram itself is requested."
+    )
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(REVISION_SEQUENCE)))
+        if self._diagram_data_field and column_exists(self.env.cr, self._table, self._diagram_data_field):
+            self._migrate_diagram_column()
+
+    def _migrate_diagram_column(self):
+        """
+        Раньше XML диаграммы хранился в текстовой колонке. Её содержимое
+        переносится в сжатые вложения пачками, одним create вложений на
+        пачку (те же значения, что пишет ORM для поля с attachment=True),
+        а колонка удаляется.
+        """
+        column = SQL.identifier(self._diagram_data_field)
+        table = SQL.identifier(self._table)
+        cr = self.env.cr
+        Attachment = self.env['ir.attachment'].sudo()
+        cr.execute(SQL("SELECT id FROM %s WHERE %s IS NOT NULL AND %s != '' ORDER BY id", table, column, column))
+        ids = [row[0] for row in cr.fetchall()]
+        for batch in split_every(MIGRATION_BATCH_SIZE, ids):
+            cr.execute(SQL("SELECT id, %s FROM %s WHERE id IN %s", column, table, tuple(batch)))
+            Attachment.create([
+                {
+                    'name': 'diagram_payload',
+                    'res_model': self._name,
+                    'res_field': 'diagram_payload',
+                    'res_id': record_id,
+                    'type': 'binary',
+                    'datas': compress(xml),
+                }
+                for record_id, xml in cr.fetchall()
+            ])
+        cr.execute(SQL("ALTER TABLE %s DROP COLUMN %s", table, column))
+        _logger.info("Moved %s diagrams of %s into compressed storage", len(ids), self._name)
+
+    @api.depends('diagram_payload')
+    def _compute_diagram_data(self):
+        for record in self:
+            # Веб-клиент читает с bin_size=True, и тогда вместо содержимого приходит его размер
+            payload = record.with_context(bin_size=False).diagram_payload
+            record[self._diagram_data_field] = decompress(payload) if payload else False
+
+    def _inverse_diagram_data(self):
+        for record in self:
+            xml = record[self._diagram_data_field]
+            record.diagram_payload = compress(xml) if xml else False
+
+    def read_diagram_data(self):
+        """
+        XML диаграммы для виджета draw.io. Формы не читают поле с XML,
+        чтобы не распаковывать диаграмму при каждом открытии записи:
+        виджет запрашивает её этим методом, когда показывает редактор.
+        """
+        self.ensure_one()
+        return self[self._diagram_data_field] or False
+
+    def write_diagram_data(self, xml):
+        """Сохраняет XML диаграммы из виджета draw.io"""
+        self.ensure_one()
+        self.write({self._diagram_data_field: xml or False})
+        return True
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._diagram_revision_fields and not vals.keys().isdisjoint(self._diagram_revision_fields):
+            self._bump_diagram_revision()
+        return res
+
+    def _bump_diagram_revision(self):
+        ids = tuple(record_id for record_id in self.ids if isinstance(record_id, int))
+        if not ids:
+            return
+        self.env.cr.execute(SQL(
+            "UPDATE %s SET diagram_revision = nextval(%s) WHERE id IN %s",
+            SQL.identifier(self._table), REVISION_SEQUENCE, ids,
+        ))
+        self.invalidate_recordset(['diagram_revision'])
+
+    def _get_cached_diagram_xml(self, generate, *inputs):
+        """
+        Возвращает XML диаграммы из кэша или строит его вызовом generate().
+        inputs - дополнительные входные данные генератора (например, текущий
+        XML с позициями), они входят в ключ кэша.
+        """
+        self.ensure_one()
+        key = (
+            self.env.cr.dbname, self._name, self.id, self.diagram_revision,
+            self._get_layout_engine(), tuple(_cache_input(value) for value in inputs),
+        )
+        xml = _diagram_cache.get(key)
+        if xml is None:
+            xml = generate()
+            _diagram_cache[key] = xml
+        else:
+            _logger.debug("Diagram XML cache hit for %s(%s) at revision %s", self._name, self.id, self.diagram_revision)
+        return xml
+
+    def _get_diagram_path_colors(self, path_keys, preset=None):
+        """
+        Цвета путей диаграммы: заданные явно (preset, например из текущего
+        XML), затем сохранённые в записи, остальным - path_color() в порядке
+        сортировки ключей. Набор сохраняется, если изменился, поэтому при
+        неизменных данных диаграмма генерируется байт в байт одинаково.
+        """
+        self.ensure_one()
+        known = {**(self.diagram_path_colors or {}), **(preset or {})}
+        path_keys = sorted(set(path_keys))
+        colors = {key: known[key] for key in path_keys if key in known}
+        taken = set(colors.values())
+        for key in path_keys:
+            if key not in colors:
+                colors[key] = path_color(key, taken)
+                taken.add(colors[key])
+        colors = dict(sorted(colors.items()))
+        if colors != (self.diagram_path_colors or {}):
+            self.sudo().diagram_path_colors = colors
+        return colors
+
+    def _get_layout_engine(self):
+        engine = self.env['ir.config_parameter'].sudo().get_param('alm_diagram.layout_engine', 'layered')
+        return engine if engine in LAYOUT_ENGINES else 'layered'
+
+    def _compute_diagram_layout(self, node_ids, edges, sizes=None, fixed_positions=None):
+        """
+        Раскладка узлов без сохранённых позиций. Если часть узлов уже
+        размещена (fixed_positions), их позиции не меняются, а новые узлы
+        ставятся рядом со связанными соседями. Иначе граф раскладывается
+        целиком движком из параметра alm_diagram.layout_engine: 'layered'
+        (по умолчанию) или 'spring' (networkx).
+        """
+        if fixed_positions:
+            return incremental_layout(fixed_positions, node_ids, edges, sizes)
+        if self._get_layout_engine() == 'spring':
+            try:
+                return spring_layout(node_ids, edges)
+            except ImportError:
+                _logger.warning("networkx library not found. Falling back to layered layout.")
+        return layered_layout(node_ids, edges, sizes)
+
+class DiagramItemMixin(models.AbstractModel):
+    _name = 'alm.diagram.item.mixin'
+    _description = 'ALM Diagram Item Mixin'
+
+    # Many2one на запись с диаграммой (alm.diagram.mixin)
+    _diagram_owner_field = None
+
+    # Поля элемента, которые видны на диаграмме. Запись остальных полей
+    # не меняет ревизию владельца; None - диаграмму меняет любое поле
+    _diagram_item_fields = None
+
+    def _get_diagram_owners(self):
+        return self.mapped(self._diagram_owner_field)
+
+    def _defer_diagram_revision(self):
+        """
+        Синхронизация с диаграммой пишет элементы с контекстом
+        alm_diagram_defer_revision и сама меняет ревизию владельца один раз
+        в конце, вместо UPDATE владельца на каждый create/write/unlink.
+        """
+        return self.env.context.get('alm_diagram_defer_revision')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if not records._defer_diagram_revision():
+            records._get_diagram_owners()._bump_diagram_revision()
+        return records
+
+    def write(self, vals):
+        if self._defer_diagram_revision() or (
+            self._diagram_item_fields is not None
+            and self._diagram_owner_field not in vals
+            and vals.keys().isdisjoint(self._diagram_item_fields)
+        ):
+            return super().write(vals)
+        owners = self._get_diagram_owners()
+        res = super().write(vals)
+        if self._diagram_owner_field in vals:
+            owners |= self._get_diagram_owners()
+        owners._bump_diagram_revision()
+        return res
+
+    def unlink(self):
+        if self._defer_diagram_revision():
+            return super().unlink()
+        owners = self._get_diagram_owners()
+        res = super().unlink()
+        owners.exists()._bump_diagram_revision()
+        return res
@@ -1,10 +1,12 @@
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
-import { onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
-import { CharField } from "@web/views/fields/char/char_field";
+import { Component, onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { EMPTY_DIAGRAM_XML, loadDiagramXml, saveDiagramXml } from "@alm_diagram/js/diagram_data";
 
-export class DataFlowDiagramWidget extends CharField {
+export class DataFlowDiagramWidget extends Component {
     static template = "alm_diagram.DataFlowDiagramWidget";
+    static props = { ...standardFieldProps };
 
     setup() {
         super.setup();
@@ -20,6 +22,7 @@ export class DataFlowDiagramWidget extends CharField {
             editorUrl: null,
         });
 
+        this.diagramXml = false;
         this.onMessage = this._onMessage.bind(this);
 
         onWillStart(async () => {
@@ -43,6 +46,14 @@ export class DataFlowDiagramWidget extends CharField {
                     type: "danger",
                 });
             }
+            try {
+                this.diagramXml = await loadDiagramXml(this.orm, this.props.record);
+            } catch (error) {
+                console.error("Error loading diagram:", error);
+                this.notification.add("Failed to load diagram.", {
+                    type: "danger",
+                });
+            }
             console.log("DataFlowDiagramWidget: onWillStart finished");
         });
 
@@ -88,7 +99,7 @@ export class DataFlowDiagramWidget extends CharField {
         this.iframe.onload = () => {
             console.log('Draw.io iframe loaded.');
             this.state.editorInitialized = true;
-            this._loadDiagramIntoEditor(this.props.value);
+            this._loadDiagramIntoEditor(this.diagramXml);
         };
         console.log("DataFlowDiagramWidget: _renderIframe finished");
     }
@@ -110,7 +121,7 @@ export class DataFlowDiagramWidget extends CharField {
             switch (msg.event) {
                 case 'init':
                     this.state.editorInitialized = true;
-                    this._loadDiagramIntoEditor(this.props.value);
+                    this._loadDiagramIntoEditor(this.diagramXml);
                     break;
                 case 'configure':
                     this._postMessage({
@@ -120,9 +131,9 @@ export class DataFlowDiagramWidget extends CharField {
                     break;
                 case 'save':
                 case 'autosave':
-                    this.props.record.update({ [this.props.name]: msg.xml });
+                    this.diagramXml = msg.xml;
                     if (msg.event === 'save') {
-                        this.notification.add("Diagram saved successfully.", { type: "success" });
+                        this._saveDiagramXml(msg.xml);
                     }
                     break;
                 case 'exit':
@@ -133,8 +144,18 @@ export class DataFlowDiagramWidget extends CharField {
         }
     }
 
+    async _saveDiagramXml(xml) {
+        try {
+            await saveDiagramXml(this.orm, this.props.record, xml);
+            this.notification.add("Diagram saved successfully.", { type: "success" });
+        } catch (error) {
+            console.error("Error saving diagram:", error);
+            this.notification.add("Failed to save diagram.", { type: "danger" });
+        }
+    }
+
     _loadDiagramIntoEditor(value) {
-        const diagramXml = value || '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>';
+        const diagramXml = value || EMPTY_DIAGRAM_XML;
         console.log("Loading diagram into editor with XML:", diagramXml);
         if (this.state.editorInitialized) {
             this._postMessage({ action: 'load', xml: diagramXml });
@@ -142,7 +163,7 @@ export class DataFlowDiagramWidget extends CharField {
     }
 
     _onLoadDiagram() {
-        this._loadDiagramIntoEditor(this.props.value);
+        this._loadDiagramIntoEditor(this.diagramXml);
         this.notification.add("Loading diagram into editor...", { type: "info" });
     }
 
@@ -161,7 +182,7 @@ export class DataFlowDiagramWidget extends CharField {
                 [],
                 { data_flow_id: this.props.record.resId }
             );
-            this.props.record.update({ [this.props.name]: xml });
+            this.diagramXml = xml;
             this._loadDiagramIntoEditor(xml);
             this.notification.add("Diagram generated successfully.", {
                 type: "success",
@@ -220,8 +241,8 @@ export class DataFlowDiagramWidget extends CharField {
                 return;
             }
             
-            this.props.record.update({ [this.props.name]: xml });
-            await this.props.record.save();
+            this.diagramXml = xml;
+            await saveDiagramXml(this.orm, this.props.record, xml);
             
             await this.orm.call(
                 'alm.data.flow',
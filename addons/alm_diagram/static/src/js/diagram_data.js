@@ -0,0 +1,20 @@
+/**
+ * XML диаграммы не входит в данные формы: виджеты на поле diagram_revision
+ * читают и сохраняют его отдельными вызовами, только когда показывают
+ * редактор, поэтому открытие записи не распаковывает диаграмму.
+ */
+
+export const EMPTY_DIAGRAM_XML = '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>';
+
+export async function loadDiagramXml(orm, record) {
+    if (!record.resId) {
+        return false;
+    }
+    return orm.call(record.resModel, "read_diagram_data", [[record.resId]]);
+}
+
+export async function saveDiagramXml(orm, record, xml) {
+    // Несохранённые изменения формы (и новая запись) сохраняются вместе с диаграммой
+    await record.save();
+    return orm.call(record.resModel, "write_diagram_data", [[record.resId], xml]);
+}
@@ -1,10 +1,12 @@
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
-import { onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
-import { CharField } from "@web/views/fields/char/char_field";
+import { Component, onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { EMPTY_DIAGRAM_XML, loadDiagramXml, saveDiagramXml } from "@alm_diagram/js/diagram_data";
 
-export class FieldMappingDiagramWidget extends CharField {
+export class FieldMappingDiagramWidget extends Component {
     static template = "alm_diagram.FieldMappingDiagramWidget";
+    static props = { ...standardFieldProps };
 
     setup() {
         super.setup();
@@ -18,6 +20,7 @@ export class FieldMappingDiagramWidget extends CharField {
             editorUrl: null,
         });
 
+        this.diagramXml = false;
         this.onMessage = this._onMessage.bind(this);
 
         onWillStart(async () => {
@@ -31,6 +34,11 @@ export class FieldMappingDiagramWidget extends CharField {
                 this.state.editorUrl = 'about:blank';
                 this.notification.add("Failed to fetch Draw.io editor URL.", { type: "danger" });
             }
+            try {
+                this.diagramXml = await loadDiagramXml(this.orm, this.props.record);
+            } catch (error) {
+                this.notification.add("Failed to load diagram.", { type: "danger" });
+            }
         });
 
         onMounted(() => {
@@ -85,7 +93,7 @@ export class FieldMappingDiagramWidget extends CharField {
             case 'init':
                 this.state.editorInitialized = true;
                 setTimeout(() => {
-                    this._loadDiagramIntoEditor(this.props.value);
+                    this._loadDiagramIntoEditor(this.diagramXml);
                 }, 500);
                 break;
             case 'export':
@@ -95,7 +103,7 @@ export class FieldMappingDiagramWidget extends CharField {
     }
 
     _loadDiagramIntoEditor(value) {
-        const diagramXml = this.props.record.data[this.props.name] || value || '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>';
+        const diagramXml = value || EMPTY_DIAGRAM_XML;
         
         if (this.state.editorInitialized) {
             setTimeout(() => {
@@ -120,8 +128,8 @@ export class FieldMappingDiagramWidget extends CharField {
     async _onSaveDiagram() {
         try {
             const xml = await this._getXmlFromEditor();
-            await this.props.record.update({ [this.props.name]: xml });
-            await this.props.record.save();
+            this.diagramXml = xml;
+            await saveDiagramXml(this.orm, this.props.record, xml);
             this.notification.add("Diagram layout and colors saved.", { type: "success" });
         } catch (error) {
             this.notification.add(`Failed to save diagram: ${error.message}`, { type: "danger" });
@@ -139,7 +147,7 @@ export class FieldMappingDiagramWidget extends CharField {
                 [this.props.record.resId],
                 { current_diagram_xml: currentXml }
             );
-            await this.props.record.update({ [this.props.name]: newXml });
+            this.diagramXml = newXml;
             this._loadDiagramIntoEditor(newXml);
             this.notification.add("Diagram generated successfully.", { type: "success" });
         } catch (error) {
@@ -150,5 +158,5 @@ export class FieldMappingDiagramWidget extends CharField {
 
 registry.category("fields").add("field_mapping_diagram_widget", {
     component: FieldMappingDiagramWidget,
-    supportedTypes: ["text"],
+    supportedTypes: ["integer"],
 });
\ No newline at end of file
@@ -1,10 +1,12 @@
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
-import { onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
-import { CharField } from "@web/views/fields/char/char_field";
+import { Component, onMounted, onWillUnmount, onWillStart, useRef, useState } from "@odoo/owl";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { EMPTY_DIAGRAM_XML, loadDiagramXml, saveDiagramXml } from "@alm_diagram/js/diagram_data";
 
-export class ProcessDiagramWidget extends CharField {
+export class ProcessDiagramWidget extends Component {
     static template = "alm_diagram.ProcessDiagramWidget";
+    static props = { ...standardFieldProps };
 
     setup() {
         super.setup();
@@ -20,6 +22,7 @@ export class ProcessDiagramWidget extends CharField {
             editorUrl: null,
         });
 
+        this.diagramXml = false;
         this.onMessage = this._onMessage.bind(this);
 
         onWillStart(async () => {
@@ -43,6 +46,14 @@ export class ProcessDiagramWidget extends CharField {
                     type: "danger",
                 });
             }
+            try {
+                this.diagramXml = await loadDiagramXml(this.orm, this.props.record);
+            } catch (error) {
+                console.error("Error loading diagram:", error);
+                this.notification.add("Failed to load diagram.", {
+                    type: "danger",
+                });
+            }
             console.log("ProcessDiagramWidget: onWillStart finished");
         });
 
@@ -88,7 +99,7 @@ export class ProcessDiagramWidget extends CharField {
         this.iframe.onload = () => {
             console.log('Draw.io iframe loaded.');
             this.state.editorInitialized = true;
-            this._loadDiagramIntoEditor(this.props.value);
+            this._loadDiagramIntoEditor(this.diagramXml);
         };
         console.log("ProcessDiagramWidget: _renderIframe finished");
     }
@@ -110,7 +121,7 @@ export class ProcessDiagramWidget extends CharField {
             switch (msg.event) {
                 case 'init':
                     this.state.editorInitialized = true;
-                    this._loadDiagramIntoEditor(this.props.value);
+                    this._loadDiagramIntoEditor(this.diagramXml);
                     break;
                 case 'configure':
                     this._postMessage({
@@ -120,9 +131,9 @@ export class ProcessDiagramWidget extends CharField {
                     break;
                 case 'save':
                 case 'autosave':
-                    this.props.record.update({ [this.props.name]: msg.xml });
+                    this.diagramXml = msg.xml;
                     if (msg.event === 'save') {
-                        this.notification.add("Diagram saved successfully.", { type: "success" });
+                        this._saveDiagramXml(msg.xml);
                     }
                     break;
                 case 'exit':
@@ -133,8 +144,18 @@ export class ProcessDiagramWidget extends CharField {
         }
     }
 
+    async _saveDiagramXml(xml) {
+        try {
+            await saveDiagramXml(this.orm, this.props.record, xml);
+            this.notification.add("Diagram saved successfully.", { type: "success" });
+        } catch (error) {
+            console.error("Error saving diagram:", error);
+            this.notification.add("Failed to save diagram.", { type: "danger" });
+        }
+    }
+
     _loadDiagramIntoEditor(value) {
-        const diagramXml = value || '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/></root></mxGraphModel>';
+        const diagramXml = value || EMPTY_DIAGRAM_XML;
         console.log("Loading diagram into editor with XML:", diagramXml);
         if (this.state.editorInitialized) {
             this._postMessage({ action: 'load', xml: diagramXml });
@@ -142,7 +163,7 @@ export class ProcessDiagramWidget extends CharField {
     }
 
     _onLoadDiagram() {
-        this._loadDiagramIntoEditor(this.props.value);
+        this._loadDiagramIntoEditor(this.diagramXml);
         this.notification.add("Loading diagram into editor...", { type: "info" });
     }
 
@@ -161,7 +182,7 @@ export class ProcessDiagramWidget extends CharField {
                 [],
                 { process_id: this.props.record.resId }
             );
-            this.props.record.update({ [this.props.name]: xml });
+            this.diagramXml = xml;
             this._loadDiagramIntoEditor(xml);
             this.notification.add("Diagram generated successfully.", {
                 type: "success",
@@ -238,15 +259,12 @@ export class ProcessDiagramWidget extends CharField {
         
         console.log("4. XML is valid, updating record...");
         
-        console.log("5. Updating local record...");
-        this.props.record.update({ [this.props.name]: xml });
-        console.log("6. Local record updated");
-        
-        console.log("7. Saving record to database...");
-        await this.props.record.save();
-        console.log("8. Record saved to database");
+        console.log("5. Saving record and diagram to database...");
+        this.diagramXml = xml;
+        await saveDiagramXml(this.orm, this.props.record, xml);
+        console.log("6. Record and diagram saved to database");
         
-        console.log("9. Calling backend action_update_from_diagram_xml...");
+        console.log("7. Calling backend action_update_from_diagram_xml...");
         await this.orm.call(
             'alm.process',
             'action_update_from_diagram_xml',
@@ -256,9 +274,9 @@ export class ProcessDiagramWidget extends CharField {
                 xml_data: xml,
             }
         );
-        console.log("10. Backend method completed");
+        console.log("8. Backend method completed");
         
-        console.log("11. Refreshing view...");
+        console.log("9. Refreshing view...");
         await this._refreshView();
         
         this.notification.add("Process updated successfully from diagram.", {
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_layout
+from . import test_mxgraph
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import BaseCase
+from odoo.addons.alm_diagram.tools.layout import (
+    DEFAULT_NODE_SIZE, LAYER_GAP, NODE_GAP, ORIGIN_X, ORIGIN_Y, incremental_layout, layered_layout,
+)
+
+
+class TestLayout(BaseCase):
+
+    def assertNoOverlap(self, positions, sizes=None):
+        sizes = sizes or {}
+        rects = []
+        for node_id, pos in positions.items():
+            width, height = sizes.get(node_id, DEFAULT_NODE_SIZE)
+            rects.append((node_id, pos['x'], pos['y'], pos['x'] + width, pos['y'] + height))
+        for i, (first_id, left, top, right, bottom) in enumerate(rects):
+            for second_id, other_left, other_top, other_right, other_bottom in rects[i + 1:]:
+                overlap = left < other_right and other_left < right and top < other_bottom and other_top < bottom
+                self.assertFalse(overlap, "Nodes %s and %s overlap" % (first_id, second_id))
+
+    def test_01_chain(self):
+        """Тест: цепочка раскладывается сверху вниз, слой за слоем"""
+        positions = layered_layout([1, 2, 3], [(1, 2), (2, 3)])
+        self.assertEqual(positions[1], {'x': ORIGIN_X, 'y': ORIGIN_Y})
+        height = DEFAULT_NODE_SIZE[1]
+        self.assertEqual(positions[2]['y'], ORIGIN_Y + height + LAYER_GAP)
+        self.assertEqual(positions[3]['y'], ORIGIN_Y + 2 * (height + LAYER_GAP))
+
+    def test_02_cycles_and_self_loops(self):
+        """Тест: циклы и петли не ломают раскладку"""
+        edges = [(1, 2), (2, 3), (3, 1), (2, 2), (3, 4), (4, 3)]
+        positions = layered_layout([1, 2, 3, 4], edges)
+        self.assertEqual(set(positions), {1, 2, 3, 4})
+        # Цикл разорван: узлы по разным слоям, а не в одном
+        self.assertEqual(len({pos['y'] for pos in positions.values()}), 4)
+        self.assertNoOverlap(positions)
+
+        self.assertEqual(layered_layout([1], [(1, 1)]), {1: {'x': ORIGIN_X, 'y': ORIGIN_Y}})
+
+    def test_03_no_overlap_in_layer(self):
+        """Тест: узлы одного слоя разных размеров не перекрываются"""
+        children = list(range(2, 12))
+        sizes = {node_id: (100 + 20 * node_id, 60) for node_id in children}
+        positions = layered_layout([1] + children, [(1, child) for child in children], sizes)
+        self.assertEqual(len({positions[child]['y'] for child in children}), 1)
+        row = sorted(children, key=lambda child: positions[child]['x'])
+        for left, right in zip(row, row[1:]):
+            self.assertGreaterEqual(positions[right]['x'], positions[left]['x'] + sizes[left][0] + NODE_GAP)
+        self.assertNoOverlap(positions, sizes)
+
+    def test_04_unknown_edges(self):
+        """Тест: связи с узлами вне списка и повторные связи игнорируются"""
+        positions = layered_layout([1, 2], [(1, 2), (1, 2), (2, 99), (99, 1)])
+        self.assertEqual(set(positions), {1, 2})
+        self.assertLess(positions[1]['y'], positions[2]['y'])
+        self.assertEqual(layered_layout([], [(1, 2)]), {})
+
+    def test_05_deterministic(self):
+        """Тест: одинаковые входные данные дают одинаковую раскладку"""
+        node_ids = list(range(1, 30))
+        edges = [(node_id, node_id * 2) for node_id in node_ids] + [(node_id, node_id + 3) for node_id in node_ids]
+        edges.append((29, 1))
+        first = layered_layout(node_ids, edges)
+        self.assertEqual(layered_layout(list(node_ids), list(edges)), first)
+        self.assertNoOverlap(first)
+
+        fixed = {1: {'x': 50, 'y': 50}, 2: {'x': 300, 'y': 50}}
+        first = incremental_layout(fixed, node_ids, edges)
+        self.assertEqual(incremental_layout(dict(fixed), list(node_ids), list(edges)), first)
+
+    def test_06_incremental_keeps_fixed(self):
+        """Тест: новые узлы ставятся рядом с соседями, размещённые не двигаются"""
+        fixed = {1: {'x': 50, 'y': 50}, 2: {'x': 300, 'y': 50}}
+        positions = incremental_layout(fixed, [1, 2, 3, 4], [(1, 3), (2, 4), (3, 3)])
+        self.assertEqual(set(positions), {3, 4})
+        self.assertEqual(positions[3]['y'], 50 + DEFAULT_NODE_SIZE[1] + LAYER_GAP)
+        self.assertNoOverlap({**fixed, **positions})
+        self.assertEqual(incremental_layout(fixed, [1, 2], [(1, 2)]), {})
+
+    def test_07_incremental_above_successor(self):
+        """Тест: предшественник узла с y = 0 ставится над ним, а не поверх"""
+        fixed = {1: {'x': 0, 'y': 0}}
+        positions = incremental_layout(fixed, [1, 2], [(2, 1)])
+        self.assertEqual(positions[2], {'x': 0, 'y': -DEFAULT_NODE_SIZE[1] - LAYER_GAP})
+        self.assertNoOverlap({**fixed, **positions})
+
+    def test_08_incremental_occupied(self):
+        """Тест: занятое место пропускается, новые узлы не перекрывают соседей"""
+        fixed = {1: {'x': 50, 'y': 50}, 2: {'x': 50, 'y': 210}}
+        positions = incremental_layout(fixed, [1, 2, 3, 4], [(1, 3), (1, 4)])
+        self.assertEqual(positions[3]['y'], positions[4]['y'])
+        self.assertNoOverlap({**fixed, **positions})
+
+    def test_09_incremental_disconnected(self):
+        """Тест: несвязанные новые узлы раскладываются справа от диаграммы"""
+        fixed = {1: {'x': 50, 'y': 50}}
+        positions = incremental_layout(fixed, [1, 2, 3], [(2, 3)])
+        right_edge = 50 + DEFAULT_NODE_SIZE[0]
+        self.assertGreaterEqual(min(positions[2]['x'], positions[3]['x']), right_edge + NODE_GAP)
+        self.assertLess(positions[2]['y'], positions[3]['y'])
+        self.assertNoOverlap({**fixed, **positions})
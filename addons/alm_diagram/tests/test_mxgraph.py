@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from odoo.tests.common import BaseCase
+from odoo.addons.alm_diagram.tools.mxgraph import (
+    DECODE_CHUNK_SIZE, PATH_COLORS, compress, decompress, deflate, extract_compressed_root, extract_root, index_cells, inflate,
+    iter_decompressed, parse_style, path_color,
+)
+
+MODEL_XML = (
+    '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+    '<mxCell id="2" value="&lt;b&gt;Заказ&lt;/b&gt; клиента" style="shape=rectangle;fillColor=#ffffff" vertex="1" parent="1" odoo_id="42">'
+    '<mxGeometry x="10.5" y="20" width="120" height="60" as="geometry"/></mxCell>'
+    '<mxCell id="3" value="Оплата" vertex="1" parent="1" odoo_id="new"><mxGeometry width="80" height="40" as="geometry"/></mxCell>'
+    '<mxCell id="4" edge="1" parent="1" source="2" target="3"><mxGeometry relative="1" as="geometry"/></mxCell>'
+    '</root></mxGraphModel>'
+)
+
+
+class TestPathColor(BaseCase):
+
+    def test_01_deterministic(self):
+        """Тест: цвет пути зависит только от его ключа"""
+        color = path_color('direct_42')
+        self.assertIn(color, PATH_COLORS)
+        self.assertEqual(path_color('direct_42'), color)
+        self.assertLessEqual({path_color('path_%s' % i) for i in range(100)}, set(PATH_COLORS))
+
+    def test_02_taken_colors_skipped(self):
+        """Тест: занятые цвета пропускаются по порядку палитры"""
+        color = path_color('direct_42')
+        start = PATH_COLORS.index(color)
+        following = PATH_COLORS[(start + 1) % len(PATH_COLORS)]
+        self.assertEqual(path_color('direct_42', taken={color}), following)
+        self.assertNotIn(path_color('direct_42', taken=set(PATH_COLORS[:10])), PATH_COLORS[:10])
+
+    def test_03_palette_exhausted(self):
+        """Тест: когда палитра занята целиком, цвет берётся из хэша ключа"""
+        color = path_color('direct_42', taken=set(PATH_COLORS))
+        self.assertNotIn(color, PATH_COLORS)
+        self.assertRegex(color, r'^#[0-9a-f]{6}$')
+        self.assertEqual(path_color('direct_42', taken=set(PATH_COLORS)), color)
+
+
+class TestEncoding(BaseCase):
+
+    def test_01_inflate_deflate(self):
+        """Тест: формат mxfile draw.io распаковывается обратно без потерь, включая кириллицу"""
+        self.assertEqual(inflate(deflate(MODEL_XML)), MODEL_XML)
+
+    def test_02_compress_decompress(self):
+        """Тест: сжатый XML для хранения распаковывается целиком и по частям"""
+        data = compress(MODEL_XML)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(decompress(data), MODEL_XML)
+        self.assertEqual(decompress(data.decode('ascii')), MODEL_XML)
+        self.assertEqual(b''.join(iter_decompressed(data)).decode('utf-8'), MODEL_XML)
+
+    def test_03_large_diagram_chunks(self):
+        """Тест: потоковая распаковка большой диаграммы выдаёт несколько порций"""
+        cells = ''.join(
+            '<mxCell id="%s" value="%s"/>' % (i, hashlib.sha1(str(i).encode()).hexdigest()) for i in range(10000)
+        )
+        xml = '<mxGraphModel><root>%s</root></mxGraphModel>' % cells
+        data = compress(xml)
+        self.assertGreater(len(data), DECODE_CHUNK_SIZE)
+        chunks = list(iter_decompressed(data))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode('utf-8'), xml)
+
+
+class TestExtractRoot(BaseCase):
+
+    def assertModel(self, root):
+        self.assertIsNotNone(root)
+        self.assertEqual(root.tag, 'mxGraphModel')
+        self.assertEqual(root.find('root/mxCell[@id="3"]').get('value'), 'Оплата')
+
+    def test_01_formats(self):
+        """Тест: mxGraphModel извлекается из сжатого и несжатого mxfile и как есть"""
+        self.assertModel(extract_root(MODEL_XML))
+        self.assertModel(extract_root('<mxfile><diagram id="d">%s</diagram></mxfile>' % deflate(MODEL_XML)))
+        self.assertModel(extract_root('<mxfile><diagram id="d">%s</diagram></mxfile>' % MODEL_XML))
+        self.assertModel(extract_compressed_root(compress(MODEL_XML)))
+
+    def test_02_garbage(self):
+        """Тест: неразбираемые данные дают None"""
+        self.assertIsNone(extract_root(''))
+        self.assertIsNone(extract_root('<mxfile/>'))
+        self.assertIsNone(extract_compressed_root(None))
+        with self.assertLogs('odoo.addons.alm_diagram.tools.mxgraph', 'WARNING'):
+            self.assertIsNone(extract_root('not a diagram'))
+            self.assertIsNone(extract_root('<mxfile><diagram>!!!</diagram></mxfile>'))
+            self.assertIsNone(extract_compressed_root(b'not a diagram'))
+
+
+class TestCells(BaseCase):
+
+    def test_01_parse_style(self):
+        """Тест: значение стиля может содержать '=', пары без '=' пропускаются"""
+        style = parse_style('html=1;image=data:image/png,a=b;rounded')
+        self.assertEqual(dict(style), {'html': '1', 'image': 'data:image/png,a=b'})
+        self.assertEqual(dict(parse_style('')), {})
+
+    def test_02_index_cells(self):
+        """Тест: ячейки разбираются с подписью без HTML, odoo_id и геометрией"""
+        cells = index_cells(extract_root(MODEL_XML))
+        self.assertEqual(list(cells), ['0', '1', '2', '3', '4'])
+
+        order = cells['2']
+        self.assertEqual(order.label, '<b>Заказ</b> клиента')
+        self.assertEqual(order.value, 'Заказ клиента')
+        self.assertEqual(order.odoo_id, 42)
+        self.assertEqual((order.x, order.y, order.width, order.height), (10.5, 20.0, 120.0, 60.0))
+        self.assertEqual(order.style_dict['fillColor'], '#ffffff')
+        self.assertTrue(order.vertex)
+
+        payment = cells['3']
+        self.assertIsNone(payment.odoo_id)
+        self.assertEqual((payment.x, payment.y, payment.width, payment.height), (0.0, 0.0, 80.0, 40.0))
+
+        link = cells['4']
+        self.assertTrue(link.edge)
+        self.assertEqual((link.source, link.target), ('2', '3'))
+        self.assertIsNone(cells['0'].x)
@@ -0,0 +1,2 @@
+from . import layout
+from . import mxgraph
@@ -0,0 +1,311 @@
+"""
+Automatic placement of diagram nodes.
+
+The functions here work on plain ids and (source, target) pairs and do
+not touch the ORM. They return {node_id: {'x': int, 'y': int}} with the
+top-left corner of every node.
+"""
+from collections import deque
+
+LAYOUT_ENGINES = ('layered', 'spring')
+
+DEFAULT_NODE_SIZE = (160, 80)
+LAYER_GAP = 80
+NODE_GAP = 40
+ORIGIN_X, ORIGIN_Y = 50, 50
+
+# Число проходов вниз-вверх при упорядочивании слоёв по барицентрам
+ORDERING_SWEEPS = 4
+
+
+def layered_layout(node_ids, edges, sizes=None):
+    """
+    Послойная раскладка (Sugiyama) для ориентированного графа сверху вниз:
+    разрыв циклов, назначение рангов, упорядочивание слоёв по барицентрам
+    и расстановка координат. Результат детерминирован и зависит только от
+    порядка node_ids и edges; время работы линейно по числу узлов и связей
+    (с точностью до сортировки слоёв).
+    """
+    node_ids = list(dict.fromkeys(node_ids))
+    if not node_ids:
+        return {}
+    sizes = sizes or {}
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    count = len(node_ids)
+
+    successors = [[] for _ in range(count)]
+    seen = set()
+    for source_id, target_id in edges:
+        source, target = index.get(source_id), index.get(target_id)
+        if source is None or target is None or source == target or (source, target) in seen:
+            continue
+        seen.add((source, target))
+        successors[source].append(target)
+
+    dag_edges = _break_cycles(successors)
+    rank = _assign_ranks(count, dag_edges)
+    layers, upper, lower = _build_layers(count, rank, dag_edges)
+    _order_layers(layers, upper, lower)
+    return _assign_coordinates(node_ids, sizes, layers, upper)
+
+
+def _break_cycles(successors):
+    """Обход в глубину; обратные связи разворачиваются, остальные сохраняются."""
+    state = [0] * len(successors)  # 0 - не посещён, 1 - в стеке, 2 - обработан
+    dag_edges = []
+    for root in range(len(successors)):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state[child] == 1:
+                    dag_edges.append((child, node))
+                    continue
+                dag_edges.append((node, child))
+                if state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return dag_edges
+
+
+def _assign_ranks(count, dag_edges):
+    """Ранг узла - длина самого длинного пути до него от истоков (Kahn)."""
+    successors = [[] for _ in range(count)]
+    in_degree = [0] * count
+    for source, target in dag_edges:
+        successors[source].append(target)
+        in_degree[target] += 1
+
+    rank = [0] * count
+    queue = deque(node for node in range(count) if not in_degree[node])
+    while queue:
+        node = queue.popleft()
+        for child in successors[node]:
+            rank[child] = max(rank[child], rank[node] + 1)
+            in_degree[child] -= 1
+            if not in_degree[child]:
+                queue.append(child)
+    return rank
+
+
+def _build_layers(count, rank, dag_edges):
+    """
+    Раскладывает узлы по слоям. Длинные связи не разбиваются виртуальными
+    узлами: соседи учитываются напрямую, поэтому объём работы не зависит от
+    длины связей.
+    """
+    upper = [[] for _ in range(count)]
+    lower = [[] for _ in range(count)]
+    for source, target in sorted(set(dag_edges)):
+        lower[source].append(target)
+        upper[target].append(source)
+
+    layers = [[] for _ in range(max(rank) + 1)]
+    for node, node_rank in enumerate(rank):
+        layers[node_rank].append(node)
+    return layers, upper, lower
+
+
+def _order_layers(layers, upper, lower):
+    """
+    Уменьшение пересечений: слои сортируются по барицентрам соседей.
+    Позиция в слое нормируется по его длине, чтобы соседи из слоёв разного
+    размера были сопоставимы.
+    """
+    position = [0.0] * len(upper)
+
+    def renumber(layer):
+        size = len(layer)
+        for i, node in enumerate(layer):
+            position[node] = (i + 0.5) / size
+
+    def reorder(layer, neighbours):
+        def barycenter(node):
+            linked = neighbours[node]
+            if not linked:
+                return position[node], position[node]
+            return sum(position[other] for other in linked) / len(linked), position[node]
+        layer.sort(key=barycenter)
+        renumber(layer)
+
+    for layer in layers:
+        renumber(layer)
+    for _sweep in range(ORDERING_SWEEPS):
+        for layer in layers[1:]:
+            reorder(layer, upper)
+        for layer in reversed(layers[:-1]):
+            reorder(layer, lower)
+
+
+def _assign_coordinates(node_ids, sizes, layers, upper):
+    """
+    Узел ставится под центром своих соседей из верхних слоёв, насколько это
+    позволяют уже расставленные узлы того же слоя.
+    """
+    center = [0.0] * len(node_ids)
+    positions = {}
+
+    y = ORIGIN_Y
+    for layer in layers:
+        right_edge = None
+        layer_height = 0
+        for node in layer:
+            width, height = sizes.get(node_ids[node], DEFAULT_NODE_SIZE)
+            linked = upper[node]
+            x = sum(center[other] for other in linked) / len(linked) - width / 2 if linked else 0
+            if right_edge is not None:
+                x = max(x, right_edge + NODE_GAP)
+            center[node] = x + width / 2
+            right_edge = x + width
+            layer_height = max(layer_height, height)
+            positions[node_ids[node]] = {'x': x, 'y': y}
+        y += layer_height + LAYER_GAP
+
+    shift = ORIGIN_X - min(pos['x'] for pos in positions.values())
+    return {
+        node_id: {'x': int(pos['x'] + shift), 'y': int(pos['y'])}
+        for node_id, pos in positions.items()
+    }
+
+
+# Размер ячейки пространственного индекса при поиске свободного места
+GRID_CELL = 200
+
+
+def incremental_layout(fixed_positions, node_ids, edges, sizes=None):
+    """
+    Размещает только новые узлы node_ids, не трогая fixed_positions.
+    Новый узел ставится под своими уже размещёнными предшественниками (или
+    над последователями) и сдвигается вправо до свободного места, поэтому
+    работа на узел пропорциональна его степени. Группы новых узлов, не
+    связанные с размещёнными, раскладываются послойно справа от диаграммы.
+    Возвращает позиции только новых узлов.
+    """
+    sizes = sizes or {}
+    new_ids = [node_id for node_id in dict.fromkeys(node_ids) if node_id not in fixed_positions]
+    if not new_ids:
+        return {}
+    new_set = set(new_ids)
+
+    predecessors = {node_id: [] for node_id in new_ids}
+    successors = {node_id: [] for node_id in new_ids}
+    for source_id, target_id in edges:
+        if source_id == target_id:
+            continue
+        if target_id in new_set:
+            predecessors[target_id].append(source_id)
+        if source_id in new_set:
+            successors[source_id].append(target_id)
+
+    placed = dict(fixed_positions)
+    grid = _OccupancyGrid()
+    for node_id, pos in fixed_positions.items():
+        grid.add(pos['x'], pos['y'], *sizes.get(node_id, DEFAULT_NODE_SIZE))
+
+    result = {}
+    queue = deque(
+        node_id for node_id in new_ids
+        if any(other in fixed_positions for other in predecessors[node_id] + successors[node_id])
+    )
+    queued = set(queue)
+    while queue:
+        node_id = queue.popleft()
+        width, height = sizes.get(node_id, DEFAULT_NODE_SIZE)
+        placed_predecessors = [other for other in predecessors[node_id] if other in placed]
+        placed_successors = [other for other in successors[node_id] if other in placed]
+        if placed_predecessors:
+            x = sum(placed[other]['x'] for other in placed_predecessors) / len(placed_predecessors)
+            y = max(placed[other]['y'] + sizes.get(other, DEFAULT_NODE_SIZE)[1] for other in placed_predecessors) + LAYER_GAP
+        else:
+            x = sum(placed[other]['x'] for other in placed_successors) / len(placed_successors)
+            y = min(placed[other]['y'] for other in placed_successors) - height - LAYER_GAP
+        x, y = grid.find_free(int(x), int(y), width, height)
+        placed[node_id] = result[node_id] = {'x': x, 'y': y}
+        grid.add(x, y, width, height)
+
+        for other in predecessors[node_id] + successors[node_id]:
+            if other in new_set and other not in queued:
+                queued.add(other)
+                queue.append(other)
+
+    # Новые узлы без связи с размещёнными: отдельная раскладка справа
+    rest = [node_id for node_id in new_ids if node_id not in placed]
+    if rest:
+        rest_set = set(rest)
+        rest_edges = [(node_id, other) for node_id in rest for other in successors[node_id] if other in rest_set]
+        rest_layout = layered_layout(rest, rest_edges, sizes)
+        offset_x = grid.right_edge + NODE_GAP - ORIGIN_X if placed else 0
+        for node_id, pos in rest_layout.items():
+            result[node_id] = {'x': pos['x'] + offset_x, 'y': pos['y']}
+    return result
+
+
+class _OccupancyGrid:
+    """Пространственный индекс прямоугольников узлов по ячейкам GRID_CELL."""
+
+    def __init__(self):
+        self.cells = {}
+        self.right_edge = ORIGIN_X
+
+    def _keys(self, x, y, width, height):
+        x, y = int(x), int(y)
+        for cell_x in range(x // GRID_CELL, (x + int(width)) // GRID_CELL + 1):
+            for cell_y in range(y // GRID_CELL, (y + int(height)) // GRID_CELL + 1):
+                yield cell_x, cell_y
+
+    def add(self, x, y, width, height):
+        rect = (x, y, x + width, y + height)
+        for key in self._keys(x, y, width, height):
+            self.cells.setdefault(key, []).append(rect)
+        self.right_edge = max(self.right_edge, x + width)
+
+    def is_free(self, x, y, width, height):
+        right, bottom = x + width + NODE_GAP, y + height + NODE_GAP
+        left, top = x - NODE_GAP, y - NODE_GAP
+        for key in self._keys(left, top, right - left, bottom - top):
+            for rect_left, rect_top, rect_right, rect_bottom in self.cells.get(key, ()):
+                if left < rect_right and rect_left < right and top < rect_bottom and rect_top < bottom:
+                    return False
+        return True
+
+    def find_free(self, x, y, width, height):
+        """
+        Ближайшее свободное место правее (x, y) на той же высоте. Координаты
+        не ограничиваются нулём: узел над последователем с y = 0 остаётся
+        над ним, а не накладывается на него.
+        """
+        while not self.is_free(x, y, width, height):
+            x += width + NODE_GAP
+        return x, y
+
+
+def spring_layout(node_ids, edges):
+    """Силовая раскладка networkx, масштабированная в область 800x600. Требует networkx."""
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(node_ids)
+    graph.add_edges_from(edges)
+    if not graph.nodes:
+        return {}
+
+    pos = nx.spring_layout(graph, seed=42, iterations=100)
+    x_coords = [p[0] for p in pos.values()]
+    y_coords = [p[1] for p in pos.values()]
+    min_x, max_x = min(x_coords, default=0), max(x_coords, default=1)
+    min_y, max_y = min(y_coords, default=0), max(y_coords, default=1)
+
+    SCALE_X, SCALE_Y = 800, 600
+    positions = {}
+    for node_id, (x, y) in pos.items():
+        norm_x = (x - min_x) / (max_x - min_x) if max_x > min_x else 0.5
+        norm_y = (y - min_y) / (max_y - min_y) if max_y > min_y else 0.5
+        positions[node_id] = {'x': int(norm_x * SCALE_X), 'y': int(norm_y * SCALE_Y)}
+    return positions
@@ -0,0 +1,290 @@
+"""
+Encoding and decoding of draw.io (mxGraph) diagrams.
+
+One implementation shared by every ALM diagram (processes, data flows,
+field mappings, test hierarchies): unpacking of the compressed mxfile
+format, style strings, cell labels and the node/edge styles generated
+for Odoo records. Nothing here touches the ORM.
+"""
+import base64
+import binascii
+import functools
+import hashlib
+import logging
+import re
+import urllib.parse
+import zlib
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from lxml import etree
+
+_logger = logging.getLogger(__name__)
+
+HTML_TAG_RE = re.compile(r'<[^<]+?>')
+
+# Символы, которые encodeURIComponent в draw.io не кодирует
+URI_SAFE_CHARS = "!*'()"
+
+EMPTY_STYLE = MappingProxyType({})
+
+# Порция base64 при потоковой распаковке; кратна 4, чтобы не резать группы base64
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# node_type -> (фигура, цвет заливки и обводки по умолчанию)
+NODE_TYPE_STYLES = {
+    'gateway': (("shape=rhombus", "perimeter=rhombusPerimeter"), '#fff59d', '#f9a825'),
+    'start': (("shape=ellipse", "perimeter=ellipsePerimeter"), '#c5e1a5', '#388e3c'),
+    'end': (("shape=ellipse", "perimeter=ellipsePerimeter"), '#ef9a9a', '#c62828'),
+    'event': (("shape=circle", "perimeter=ellipsePerimeter"), '#e1bee7', '#7b1fa2'),
+    'loop': (("shape=hexagon", "perimeter=hexagonPerimeter"), '#ffcc80', '#ef6c00'),
+    'function': (("shape=rectangle", "perimeter=rectanglePerimeter", "rounded=0"), '#bbdefb', '#1976d2'),
+}
+DEFAULT_EDGE_COLOR = '#2e7d32'
+
+# Палитра цветов путей (связей) на диаграммах сопоставлений и иерархий тестов
+PATH_COLORS = (
+    '#e6194B', '#3cb44b', '#ffe119', '#4363d8', '#f58231',
+    '#911eb4', '#46f0f0', '#f032e6', '#bcf60c', '#fabebe',
+    '#008080', '#e6beff', '#9A6324', '#fffac8', '#800000',
+    '#aaffc3', '#808000', '#ffd8b1', '#000075', '#808080',
+)
+
+
+def clean_html_tags(text):
+    """Текст подписи ячейки без HTML-разметки и лишних пробелов."""
+    if not text:
+        return ''
+    return ' '.join(HTML_TAG_RE.sub('', text).replace('&nbsp;', ' ').replace('&amp;', '&').split())
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_style(style):
+    """
+    Разбирает строку стиля "key=value;..." в неизменяемый словарь.
+    Результат кэшируется: на диаграмме обычно всего несколько разных стилей.
+    """
+    if not style:
+        return EMPTY_STYLE
+    return MappingProxyType({
+        key: value
+        for key, sep, value in (part.partition('=') for part in style.split(';'))
+        if sep
+    })
+
+
+@functools.lru_cache(maxsize=1024)
+def node_style(node_type, fill_color, stroke_color, font_color, font_size, stroke_width):
+    shape_parts, default_fill, default_stroke = NODE_TYPE_STYLES.get(node_type, NODE_TYPE_STYLES['function'])
+    fill_color = fill_color if fill_color and fill_color != '#ffffff' else default_fill
+    stroke_color = stroke_color if stroke_color and stroke_color != '#000000' else default_stroke
+    return ";".join([
+        "whiteSpace=wrap",
+        "html=1",
+        *shape_parts,
+        f"fillColor={fill_color}",
+        f"strokeColor={stroke_color}",
+        f"fontColor={font_color or '#000000'}",
+        f"fontSize={font_size or 12}",
+        f"strokeWidth={stroke_width or 1}",
+    ])
+
+
+@functools.lru_cache(maxsize=256)
+def edge_style(edge_type, stroke_color, font_color, font_size, stroke_width):
+    stroke_color = stroke_color if stroke_color and stroke_color != '#000000' else DEFAULT_EDGE_COLOR
+    style_parts = [
+        "endArrow=classic",
+        "html=1",
+        "rounded=0",
+        f"strokeColor={stroke_color}",
+        f"fontColor={font_color or '#000000'}",
+        f"fontSize={font_size or 11}",
+        f"strokeWidth={stroke_width or 1}",
+    ]
+    if edge_type == 'message':
+        style_parts.append("dashed=1")
+    elif edge_type == 'data':
+        style_parts.extend(["dashed=1", "dashPattern=3 3"])
+    return ";".join(style_parts)
+
+
+def path_color(path_key, taken=()):
+    """
+    Цвет пути по хэшу его ключа, одинаковый при каждой генерации. Занятые
+    цвета палитры пропускаются; когда палитра исчерпана, цвет берётся
+    прямо из хэша.
+    """
+    digest = int.from_bytes(hashlib.sha1(path_key.encode('utf-8')).digest()[:8], 'big')
+    start = digest % len(PATH_COLORS)
+    for step in range(len(PATH_COLORS)):
+        color = PATH_COLORS[(start + step) % len(PATH_COLORS)]
+        if color not in taken:
+            return color
+    return f"#{digest & 0xFFFFFF:06x}"
+
+
+def inflate(data):
+    """Содержимое тега <diagram> в mxfile: base64, raw deflate, URL-кодирование."""
+    raw = base64.b64decode(data)
+    try:
+        raw = zlib.decompress(raw, -zlib.MAX_WBITS)
+    except zlib.error:
+        pass
+    text = raw.decode('utf-8')
+    if text.startswith('%3C'):
+        text = urllib.parse.unquote(text)
+    return text
+
+
+def deflate(xml):
+    """Обратное к inflate(): так draw.io сжимает диаграмму внутри mxfile."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    quoted = urllib.parse.quote(xml, safe=URI_SAFE_CHARS).encode('ascii')
+    return base64.b64encode(compressor.compress(quoted) + compressor.flush()).decode('ascii')
+
+
+def compress(xml):
+    """
+    XML диаграммы в виде для хранения: raw deflate в base64, как внутри
+    mxfile, но без URL-кодирования (оно раздувает кириллицу втрое).
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return base64.b64encode(compressor.compress(xml.encode('utf-8')) + compressor.flush())
+
+
+def iter_decompressed(data):
+    """Потоковая распаковка compress(): байты UTF-8 порциями, без копии всего XML в памяти."""
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        chunk = decompressor.decompress(base64.b64decode(data[start:start + DECODE_CHUNK_SIZE]))
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def decompress(data):
+    """Обратное к compress()."""
+    return b''.join(iter_decompressed(data)).decode('utf-8')
+
+
+def extract_root(xml_data):
+    """
+    Возвращает элемент mxGraphModel из XML диаграммы: как есть или из
+    mxfile (сжатого или несжатого). None, если разобрать не удалось.
+    """
+    if not xml_data:
+        return None
+    try:
+        root = etree.fromstring(xml_data.strip().encode('utf-8'))
+    except etree.XMLSyntaxError as e:
+        _logger.warning("Could not parse diagram XML: %s", e)
+        return None
+    return _unwrap_mxfile(root)
+
+
+def extract_compressed_root(data):
+    """
+    То же, что extract_root(), для сохранённых данных compress(): XML
+    разбирается по мере распаковки и не собирается в одну строку.
+    """
+    if not data:
+        return None
+    parser = etree.XMLParser()
+    try:
+        for chunk in iter_decompressed(data):
+            parser.feed(chunk)
+        root = parser.close()
+    except (binascii.Error, ValueError, zlib.error, etree.XMLSyntaxError) as e:
+        _logger.warning("Could not parse stored diagram: %s", e)
+        return None
+    return _unwrap_mxfile(root)
+
+
+def _unwrap_mxfile(root):
+    if root.tag != 'mxfile':
+        return root
+
+    diagram = root.find('diagram')
+    if diagram is None:
+        return None
+    model = diagram.find('mxGraphModel')
+    if model is not None:
+        return model
+    if not diagram.text or not diagram.text.strip():
+        return None
+    try:
+        return etree.fromstring(inflate(diagram.text.strip()).encode('utf-8'))
+    except (binascii.Error, ValueError, etree.XMLSyntaxError):
+        # Несжатый XML прямо в теге <diagram>
+        try:
+            return etree.fromstring(diagram.text.strip().encode('utf-8'))
+        except etree.XMLSyntaxError:
+            _logger.warning("Could not parse diagram content, even as plain XML.")
+            return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class DiagramCell:
+    """Разобранная ячейка mxCell: подпись без HTML, стиль, геометрия, связь с записью Odoo."""
+    id: str
+    parent: str | None
+    label: str
+    value: str
+    style: str
+    vertex: bool
+    edge: bool
+    source: str | None
+    target: str | None
+    odoo_id: int | None
+    x: float | None
+    y: float | None
+    width: float | None
+    height: float | None
+
+    @property
+    def style_dict(self):
+        return parse_style(self.style)
+
+
+def index_cells(root):
+    """Все ячейки диаграммы по id в порядке документа."""
+    cells = {}
+    for element in root.iter('mxCell'):
+        geometry = element.find('mxGeometry')
+        if geometry is None:
+            x = y = width = height = None
+        else:
+            x, y = _to_float(geometry.get('x', 0)), _to_float(geometry.get('y', 0))
+            width, height = _to_float(geometry.get('width')), _to_float(geometry.get('height'))
+        odoo_id = element.get('odoo_id')
+        label = element.get('value', '')
+        cell = DiagramCell(
+            id=element.get('id'),
+            parent=element.get('parent'),
+            label=label,
+            value=clean_html_tags(label),
+            style=element.get('style', ''),
+            vertex=element.get('vertex') == '1',
+            edge=element.get('edge') == '1',
+            source=element.get('source'),
+            target=element.get('target'),
+            odoo_id=int(odoo_id) if odoo_id and odoo_id.isdigit() else None,
+            x=x,
+            y=y,
+            width=width,
+            height=height,
+        )
+        cells[cell.id] = cell
+    return cells
@@ -18,13 +18,21 @@
     'data': [
         'security/ir.model.access.csv',
         'data/metadata_object_type_data.xml',
+        'data/ir_cron_data.xml',
+        'data/config_data.xml',
         'views/metadata_object_type_views.xml',
         'views/metadata_object_views.xml',
         'views/metadata_object_attribute_views.xml',
         'views/metadata_configurable_unit_version_views.xml',
         'views/metadata_loader_views.xml',
+        'views/metadata_import_job_views.xml',
         'views/menu_views.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'alm_metadata/static/src/js/metadata_import_progress_field.js',
+        ],
+    },
     'installable': True,
     'application': True,
     'auto_install': False,
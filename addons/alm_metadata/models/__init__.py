@@ -1,5 +1,8 @@
+from . import metadata_search_mixin
 from . import metadata_object_type
 from . import metadata_object
 from . import metadata_configurable_unit_version
 from . import metadata_object_attribute
+from . import metadata_change
 from . import metadata_loader
+from . import metadata_import_job
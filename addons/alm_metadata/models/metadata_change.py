@@ -0,0 +1,53 @@
+from odoo import models, fields
+
+class MetadataChange(models.Model):
+    _name = 'alm.metadata.change'
+    _description = 'ALM Metadata Change'
+    _order = 'change_type, technical_name'
+
+    version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string='Version',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    previous_version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string='Previous Version',
+        ondelete='set null'
+    )
+
+    change_type = fields.Selection(
+        [
+            ('added', 'Added'),
+            ('changed', 'Changed'),
+            ('removed', 'Removed'),
+        ],
+        string='Change',
+        required=True
+    )
+
+    object_id = fields.Many2one(
+        'alm.metadata.object',
+        string='Metadata Object',
+        ondelete='set null',
+        help="Object in this version. Empty for removed objects."
+    )
+
+    previous_object_id = fields.Many2one(
+        'alm.metadata.object',
+        string='Previous Object',
+        ondelete='set null',
+        help="Object in the previous version. Empty for added objects."
+    )
+
+    technical_name = fields.Char(string='Technical Name')
+    technical_guid = fields.Char(string='Technical GUID')
+
+    type_id = fields.Many2one(
+        'alm.metadata.object.type',
+        string='Type',
+        ondelete='set null'
+    )
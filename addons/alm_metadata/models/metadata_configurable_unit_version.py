@@ -8,3 +8,9 @@ class ConfigurableUnitVersionMetadata(models.Model):
         'version_id', 
         string='Metadata Objects'
     )
+
+    metadata_change_ids = fields.One2many(
+        'alm.metadata.change',
+        'version_id',
+        string='Metadata Changes'
+    )
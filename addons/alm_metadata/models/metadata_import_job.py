@@ -0,0 +1,178 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError
+import logging
+from .metadata_loader import IMPORT_MODES
+
+_logger = logging.getLogger(__name__)
+
+# Поля, которые меняет только само задание; пользователи не задают их при создании
+JOB_STATE_FIELDS = (
+    'state', 'progress_done', 'progress_total', 'resume_index', 'result_data',
+    'result_message', 'error_message', 'date_started', 'date_finished',
+)
+
+class MetadataImportJob(models.Model):
+    _name = 'alm.metadata.import.job'
+    _description = 'ALM Metadata Import Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', compute='_compute_name', store=True)
+
+    state = fields.Selection(
+        [
+            ('queued', 'Queued'),
+            ('running', 'Running'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+            ('cancelled', 'Cancelled'),
+        ],
+        string='State',
+        required=True,
+        default='queued',
+        readonly=True,
+        index=True
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Requested By',
+        default=lambda self: self.env.user,
+        readonly=True
+    )
+
+    unit_id = fields.Many2one(
+        'alm.configurable.unit',
+        string='Configurable Unit',
+        required=True,
+        readonly=True
+    )
+    version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string='Version',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    previous_version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string='Previous Version',
+        readonly=True
+    )
+    import_mode = fields.Selection(IMPORT_MODES, string='Import Mode', required=True, readonly=True)
+    data_file = fields.Binary(string='Data File', attachment=True, readonly=True)
+    file_name = fields.Char(string='File Name', readonly=True)
+    dump_path = fields.Char(string='Dump Directory', groups='base.group_system', readonly=True)
+
+    progress_done = fields.Integer(string='Processed Files', readonly=True)
+    progress_total = fields.Integer(string='Total Files', readonly=True)
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+
+    resume_index = fields.Integer(
+        string='Committed Files',
+        readonly=True,
+        help="Number of dump files whose objects are already committed. A restarted job continues from here."
+    )
+    result_data = fields.Json(string='Counters', readonly=True)
+    result_message = fields.Text(string='Result', readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+
+    date_started = fields.Datetime(string='Started', readonly=True)
+    date_finished = fields.Datetime(string='Finished', readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Пользователи только создают и читают задания (см. ir.model.access.csv),
+        # состояние и контрольные точки пишет само задание
+        if not self.env.is_superuser() and not self.env.user.has_group('base.group_system'):
+            for vals in vals_list:
+                for field_name in JOB_STATE_FIELDS:
+                    vals.pop(field_name, None)
+        return super().create(vals_list)
+
+    @api.depends('version_id', 'import_mode')
+    def _compute_name(self):
+        modes = dict(IMPORT_MODES)
+        for job in self:
+            job.name = f"{job.version_id.display_name} ({modes.get(job.import_mode, '')})"
+
+    @api.depends('progress_done', 'progress_total')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.progress_done / job.progress_total if job.progress_total else 0.0
+
+    def action_retry(self):
+        """Повторный запуск продолжает работу с последней контрольной точки"""
+        self._check_can_manage()
+        self.sudo().filtered(lambda job: job.state in ('failed', 'cancelled')).write({
+            'state': 'queued',
+            'error_message': False,
+        })
+        self._trigger_runner()
+
+    def action_cancel(self):
+        self._check_can_manage()
+        self.sudo().filtered(lambda job: job.state == 'queued').write({'state': 'cancelled'})
+
+    def _check_can_manage(self):
+        """Перезапустить или отменить задание может только его автор или администратор"""
+        if self.env.is_superuser() or self.env.user.has_group('base.group_system'):
+            return
+        if any(job.user_id != self.env.user for job in self):
+            raise AccessError(_("Only the user who requested an import job can retry or cancel it."))
+
+    def _trigger_runner(self):
+        self.env.ref('alm_metadata.ir_cron_metadata_import_job').sudo()._trigger()
+
+    @api.model
+    def _cron_run_jobs(self):
+        """
+        Выполняет задания по очереди. Планировщик не запускает одно задание
+        cron параллельно, поэтому задание в состоянии 'running' на момент
+        запуска осталось от прерванного выполнения и продолжается с последней
+        зафиксированной контрольной точки.
+        """
+        jobs = self.search([('state', 'in', ('running', 'queued'))], order='id')
+        for job in jobs:
+            # Задание могли отменить, пока выполнялись предыдущие
+            job.invalidate_recordset(['state'])
+            if job.state in ('running', 'queued'):
+                job._run()
+
+    def _run(self):
+        self.ensure_one()
+        self.write({
+            'state': 'running',
+            'date_started': self.date_started or fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+
+        try:
+            loader = self.env['metadata.loader.wizard'].create({
+                'unit_id': self.unit_id.id,
+                'version_id': self.version_id.id,
+                'previous_version_id': self.previous_version_id.id,
+                'import_mode': self.import_mode,
+                'job_id': self.id,
+            })
+            message = loader._run_import()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Metadata import job %s failed", self.id)
+            self.write({
+                'state': 'failed',
+                'error_message': str(e),
+                'date_finished': fields.Datetime.now(),
+            })
+            self.env.cr.commit()
+            return
+
+        # Прогресс обновлялся в отдельной транзакции
+        self.invalidate_recordset(['progress_done', 'progress_total'])
+        self.write({
+            'state': 'done',
+            'result_message': message,
+            'progress_done': self.progress_total,
+            'date_finished': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+        _logger.info("Metadata import job %s finished: %s", self.id, message)
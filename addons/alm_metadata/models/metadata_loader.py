@@ -1,11 +1,48 @@
 from odoo import models, fields, api, _
 import logging
-import base64
-import xml.etree.ElementTree as ET
+import binascii
+import collections
+import contextlib
+import itertools
+import multiprocessing
+import os
+import runpy
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+import odoo.addons
 from odoo.exceptions import UserError
+from odoo.tools import SQL
+from ..tools import metadata_parser
+from ..tools.metadata_parser import MD_NAMESPACE, TYPE_MAPPING
 
 _logger = logging.getLogger(__name__)
 
+# Размер пакета при массовом создании объектов
+BATCH_SIZE = 1000
+
+# Base64 декодируется кусками, кратными 4 символам
+DECODE_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Количество файлов выгрузки, передаваемых процессу разбора за раз
+PARSE_CHUNK_SIZE = 200
+
+# Для небольших выгрузок запуск пула процессов дороже самого разбора
+PARALLEL_MIN_FILES = 2 * PARSE_CHUNK_SIZE
+
+# Число процессов разбора, если не задан параметр alm_metadata.import_workers
+DEFAULT_PARSE_WORKERS = 2
+
+PARSE_WORKER_INIT = os.path.join(os.path.dirname(metadata_parser.__file__), 'parse_worker_init.py')
+
+IMPORT_MODES = [
+    ('configuration', 'Objects (Configuration.xml)'),
+    ('full', 'Objects and Attributes (Dump)'),
+    ('derive', 'Changes from Previous Version (Dump)'),
+]
+
 class MetadataLoader(models.TransientModel):
     _name = 'metadata.loader.wizard'
     _description = 'Metadata Loader Wizard'
@@ -21,103 +58,201 @@ class MetadataLoader(models.TransientModel):
         required=True,
         domain="[('unit_id', '=', unit_id)]"
     )
-    data_file = fields.Binary(string='Data File', required=True)
+    import_mode = fields.Selection(
+        IMPORT_MODES,
+        string='Import Mode',
+        required=True,
+        default='configuration',
+        help="Objects: load the object list from Configuration.xml.\n"
+             "Objects and Attributes: load objects, attributes and tabular sections "
+             "from a ZIP archive of a configuration dump (DumpConfigToFiles).\n"
+             "Changes from Previous Version: copy unchanged objects from the previous version "
+             "and load only added and changed objects from the dump."
+    )
+    previous_version_id = fields.Many2one(
+        'alm.configurable.unit.version',
+        string='Previous Version',
+        domain="[('unit_id', '=', unit_id), ('id', '!=', version_id)]"
+    )
+    data_file = fields.Binary(string='Data File')
     file_name = fields.Char(string='File Name')
+    dump_path = fields.Char(
+        string='Dump Directory',
+        groups='base.group_system',
+        help="Directory on the server with a configuration dump. Used instead of an uploaded ZIP file."
+    )
+    job_id = fields.Many2one(
+        'alm.metadata.import.job',
+        string='Import Job',
+        readonly=True,
+        ondelete='cascade'
+    )
     
     @api.onchange('unit_id')
     def _onchange_unit_id(self):
         if self.unit_id and self.version_id.unit_id != self.unit_id:
             self.version_id = False
+        if self.unit_id and self.previous_version_id.unit_id != self.unit_id:
+            self.previous_version_id = False
 
     def action_load_metadata(self):
-        if not self.data_file:
+        """
+        Ставит загрузку в очередь. Сама загрузка выполняется заданием
+        alm.metadata.import.job в планировщике, а не в HTTP-запросе.
+        """
+        dump_path = self.sudo().dump_path if self.import_mode in ('full', 'derive') else False
+        if not self.data_file and not dump_path:
             raise UserError(_("Please select a file to upload."))
-        
-        try:
-            file_content = base64.b64decode(self.data_file).decode('utf-8')
-            
-            metadata_objects = self._parse_xml_metadata(file_content)
+        if self.import_mode == 'derive' and not self.previous_version_id:
+            raise UserError(_("Please select the previous version."))
+
+        job = self.env['alm.metadata.import.job'].create({
+            'unit_id': self.unit_id.id,
+            'version_id': self.version_id.id,
+            'previous_version_id': self.previous_version_id.id,
+            'import_mode': self.import_mode,
+            'data_file': self.data_file,
+            'file_name': self.file_name,
+        })
+        if dump_path:
+            job.sudo().dump_path = dump_path
+        job._trigger_runner()
+
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'alm.metadata.import.job',
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def _run_import(self):
+        """Выполняет загрузку и возвращает итоговое сообщение. Вызывается заданием."""
+        if self.import_mode == 'full':
+            result = self._load_full_dump()
+            return _('Successfully processed %s objects. Created: %s, Skipped: %s, Attributes created: %s') % (
+                result['total'], result['created'], result['skipped'], result['attributes_created']
+            )
+        if self.import_mode == 'derive':
+            result = self._load_derived_dump()
+            return _('Successfully processed %s objects. Unchanged: %s, Added: %s, Changed: %s, Removed: %s') % (
+                result['total'], result['unchanged'], result['added'], result['changed'], result['removed']
+            )
+        with self._open_data_file() as stream:
+            metadata_objects = self._parse_xml_metadata(stream)
             
             result = self._process_metadata_data(metadata_objects)
-            
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': _('Metadata Load Complete'),
-                    'message': _('Successfully processed %s objects. Created: %s, Skipped: %s') % (
-                        result['total'], result['created'], result['skipped']
-                    ),
-                    'sticky': False,
-                }
-            }
-            
-        except Exception as e:
-            _logger.error("Error loading metadata: %s", str(e))
-            raise UserError(_("Error loading metadata: %s") % str(e))
+        return _('Successfully processed %s objects. Created: %s, Skipped: %s') % (
+            result['total'], result['created'], result['skipped']
+        )
 
-    def _parse_xml_metadata(self, xml_content):
-        objects = []
-        
+    def _get_resume_state(self, result):
+        """
+        Номер первого необработанного файла и счетчики из последней
+        зафиксированной контрольной точки задания
+        """
+        if not self.job_id.resume_index:
+            return 0, result
+        result.update(self.job_id.result_data or {})
+        return self.job_id.resume_index, result
+
+    def _checkpoint(self, result):
+        """
+        Фиксирует записанный пакет. После сбоя задание продолжит работу
+        с файла result['total'].
+        """
+        if not self.job_id:
+            return
+        self.job_id.write({
+            'resume_index': result['total'],
+            'result_data': dict(result),
+        })
+        self.env.cr.commit()
+
+    def _get_data_file_path(self):
+        """
+        Путь к загруженному файлу задания в файловом хранилище. Поле хранится
+        во вложении, и файл можно читать напрямую, не загружая в память.
+        None, если вложение хранится в базе или файл загружен в мастер.
+        """
+        if not self.job_id:
+            return None
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self.job_id._name),
+            ('res_field', '=', 'data_file'),
+            ('res_id', '=', self.job_id.id),
+        ], limit=1)
+        if not attachment.store_fname:
+            return None
+        return attachment._full_path(attachment.store_fname)
+
+    def _open_data_file(self, stream=None):
+        """
+        Копирует загруженный файл во временный файл по частям. Файл из
+        файлового хранилища копируется блоками, остальные источники
+        декодируются из base64 кусками; память не растет с размером файла.
+        """
+        if stream is None:
+            stream = tempfile.SpooledTemporaryFile(max_size=DECODE_CHUNK_SIZE)
+        path = self._get_data_file_path()
+        if path:
+            with open(path, 'rb') as source:
+                shutil.copyfileobj(source, stream, DECODE_CHUNK_SIZE)
+        else:
+            data = (self.job_id or self).with_context(bin_size=False).data_file or b''
+            if isinstance(data, str):
+                data = data.encode('ascii')
+            for offset in range(0, len(data), DECODE_CHUNK_SIZE):
+                stream.write(binascii.a2b_base64(data[offset:offset + DECODE_CHUNK_SIZE]))
+        stream.seek(0)
+        return stream
+
+    def _parse_xml_metadata(self, stream):
+        """
+        Потоково разбирает Configuration.xml и возвращает генератор описаний объектов.
+        Обработанные элементы сразу удаляются из дерева, поэтому память
+        не зависит от размера файла.
+        """
+        configuration_tag = '{%s}Configuration' % MD_NAMESPACE
+        child_objects_tag = '{%s}ChildObjects' % MD_NAMESPACE
+
+        found_configuration = False
+        found_child_objects = False
+        path = []
         try:
-            namespaces = {
-                'md': 'http://v8.1c.ru/8.3/MDClasses',
-                'v8': 'http://v8.1c.ru/8.1/data/core',
-                'xr': 'http://v8.1c.ru/8.3/xcf/readable'
-            }
-            
-            root = ET.fromstring(xml_content)
-            
-            configuration = root.find('.//md:Configuration', namespaces)
-            if configuration is None:
-                raise UserError(_("Invalid XML format: Configuration element not found"))
-            
-            child_objects = configuration.find('.//md:ChildObjects', namespaces)
-            if child_objects is None:
-                raise UserError(_("No ChildObjects found in XML"))
-            
-            for child in child_objects:
-                tag_name = child.tag.split('}')[-1]
-                object_name = child.text
-                
-                if object_name:
-                    type_mapping = {
-                        'Catalog': 'Catalog',
-                        'Document': 'Document', 
-                        'Report': 'Report',
-                        'DataProcessor': 'DataProcessor',
-                        'ExchangePlan': 'ExchangePlan',
-                        'ChartOfCharacteristicTypes': 'ChartOfCharacteristicTypes',
-                        'ChartOfAccounts': 'ChartOfAccounts',
-                        'ChartOfCalculationTypes': 'ChartOfCalculationTypes',
-                        'InformationRegister': 'InformationRegister',
-                        'AccumulationRegister': 'AccumulationRegister',
-                        'AccountingRegister': 'AccountingRegister',
-                        'CalculationRegister': 'CalculationRegister',
-                        'BusinessProcess': 'BusinessProcess',
-                        'Task': 'Task',
-                        'CommonModule': 'CommonModule',
-                        'Role': 'Role',
-                        'Subsystem': 'Subsystem',
-                        'Constant': 'Constant',
-                        'Enum': 'Enumeration',
-                        'XDTOPackage': 'XDTO_Package'
-                    }
-                    
-                    technical_type = type_mapping.get(tag_name)
-                    if technical_type:
-                        objects.append({
+            for event, elem in etree.iterparse(stream, events=('start', 'end'), remove_comments=True):
+                if event == 'start':
+                    path.append(elem.tag)
+                    if elem.tag == configuration_tag:
+                        found_configuration = True
+                    elif elem.tag == child_objects_tag and len(path) > 1 and path[-2] == configuration_tag:
+                        found_child_objects = True
+                    continue
+
+                path.pop()
+                if len(path) > 1 and path[-1] == child_objects_tag and path[-2] == configuration_tag:
+                    tag_name = etree.QName(elem).localname
+                    object_name = elem.text
+                    technical_type = TYPE_MAPPING.get(tag_name)
+                    if object_name and technical_type:
+                        yield {
                             'technical_name': object_name,
                             'name': object_name,
                             'type_technical_name': technical_type,
                             'type_name': self._get_type_display_name(technical_type)
-                        })
-            
-            return objects
-            
-        except ET.ParseError as e:
+                        }
+                # Освобождаем уже обработанные элементы
+                elem.clear(keep_tail=True)
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        except etree.XMLSyntaxError as e:
             raise UserError(_("XML parsing error: %s") % str(e))
 
+        if not found_configuration:
+            raise UserError(_("Invalid XML format: Configuration element not found"))
+        if not found_child_objects:
+            raise UserError(_("No ChildObjects found in XML"))
+
     def _get_type_display_name(self, technical_type):
         type_names = {
             'Catalog': 'Справочник',
@@ -150,48 +285,528 @@ class MetadataLoader(models.TransientModel):
             'skipped': 0
         }
         
-        for item in metadata_objects:
+        # После сбоя объекты до контрольной точки уже учтены в ее счетчиках
+        start, result = self._get_resume_state(result)
+
+        MetadataObject = self._get_bulk_object_model()
+        existing_names = self._get_existing_technical_names()
+        type_ids = dict(self.env['alm.metadata.object.type']._get_type_id_map())
+        vals_list = []
+        
+        for item in itertools.islice(metadata_objects, start, None):
             result['total'] += 1
             
-            type_obj = self._get_or_create_type(
+            type_id = self._get_or_create_type(
                 item['type_technical_name'],
-                item['type_name']
+                item['type_name'],
+                type_ids,
             )
-            if not type_obj:
+            if not type_id:
                 result['skipped'] += 1
                 continue
                 
-            existing_obj = self.env['alm.metadata.object'].search([
-                ('technical_name', '=', item['technical_name']),
-                ('version_id', '=', self.version_id.id)
-            ], limit=1)
-            
-            if existing_obj:
+            if item['technical_name'] in existing_names:
                 result['skipped'] += 1
                 continue
+            existing_names.add(item['technical_name'])
             
-            self.env['alm.metadata.object'].create({
+            vals_list.append({
                 'name': item['name'],
                 'technical_name': item['technical_name'],
-                'type_id': type_obj.id,
+                'type_id': type_id,
                 'version_id': self.version_id.id,
             })
-            result['created'] += 1
+            if len(vals_list) >= BATCH_SIZE:
+                MetadataObject.create(vals_list)
+                result['created'] += len(vals_list)
+                vals_list = []
+                # Повторный запуск пропустит уже созданные объекты по техническому имени
+                self._checkpoint(result)
+        
+        if vals_list:
+            MetadataObject.create(vals_list)
+            result['created'] += len(vals_list)
             
         return result
 
-    def _get_or_create_type(self, technical_name, display_name):
+    def _get_bulk_object_model(self):
+        """Модель объектов без трекинга и сообщений чаттера при массовом создании"""
+        return self.env['alm.metadata.object'].with_context(
+            tracking_disable=True,
+            mail_create_nolog=True,
+            mail_create_nosubscribe=True,
+            mail_notrack=True,
+        )
+
+    def _get_existing_technical_names(self):
+        """Технические имена объектов версии, загруженные одним запросом"""
+        MetadataObject = self.env['alm.metadata.object']
+        MetadataObject.flush_model(['technical_name', 'version_id'])
+        self.env.cr.execute(SQL(
+            "SELECT technical_name FROM %s WHERE version_id = %s AND technical_name IS NOT NULL",
+            SQL.identifier(MetadataObject._table), self.version_id.id,
+        ))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @contextlib.contextmanager
+    def _open_dump_source(self):
+        """Источник выгрузки: каталог на сервере или загруженный ZIP-архив"""
+        dump_path = (self.job_id or self).sudo().dump_path
+        if dump_path:
+            if not os.path.isdir(dump_path):
+                raise UserError(_("Dump directory %s does not exist.") % dump_path)
+            yield dump_path
+            return
+        # Процессы разбора открывают архив по имени: файл из хранилища
+        # используется как есть, иначе архив сохраняется во временный файл
+        path = self._get_data_file_path()
+        if path:
+            if not zipfile.is_zipfile(path):
+                raise UserError(_("The uploaded file is not a ZIP archive of a configuration dump."))
+            with zipfile.ZipFile(path) as archive:
+                yield archive
+            return
+        with self._open_data_file(tempfile.NamedTemporaryFile(suffix='.zip')) as stream:
+            if not zipfile.is_zipfile(stream):
+                raise UserError(_("The uploaded file is not a ZIP archive of a configuration dump."))
+            stream.flush()
+            with zipfile.ZipFile(stream.name) as archive:
+                yield archive
+
+    def _load_full_dump(self):
+        result = {
+            'total': 0,
+            'created': 0,
+            'skipped': 0,
+            'attributes_created': 0,
+        }
+        start, result = self._get_resume_state(result)
+        with self._open_dump_source() as source:
+            parsed_objects = (data for _hash, data in self._iter_dump_files(source, start=start))
+            return self._process_dump_objects(parsed_objects, result)
+
+    def _iter_dump_files(self, source, known_hashes=frozenset(), start=0):
+        """
+        Разбирает файлы выгрузки, начиная с файла start, и возвращает генератор
+        (хэш, данные объекта) в порядке файлов. Разбор идет в пуле процессов,
+        а запись в базу остается в текущем процессе, который читает результаты
+        по мере готовности. Число одновременно разбираемых пакетов ограничено,
+        чтобы разобранные данные не накапливались в памяти быстрее, чем пишутся.
+        """
+        paths = metadata_parser.list_dump_files(source)
+        total = len(paths)
+        done = min(start, total)
+        paths = paths[done:]
+        location = source.filename if isinstance(source, zipfile.ZipFile) else source
+        chunks = [paths[i:i + PARSE_CHUNK_SIZE] for i in range(0, len(paths), PARSE_CHUNK_SIZE)]
+        workers = self._get_parse_workers()
+        self._update_progress(done, total)
+
+        if workers <= 1 or len(paths) < PARALLEL_MIN_FILES:
+            for chunk in chunks:
+                yield from metadata_parser.parse_dump_files(location, chunk, known_hashes)
+                done += len(chunk)
+                self._update_progress(done, total)
+            return
+
+        # spawn, а не fork: копия процесса Odoo с его потоками, блокировками и
+        # соединениями с базой может зависнуть или испортить курсор родителя.
+        # Процессы получают только пути к файлам и возвращают простые данные
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=runpy.run_path,
+            initargs=(PARSE_WORKER_INIT, {'ADDONS_PATHS': list(odoo.addons.__path__)}),
+        ) as executor:
+            chunks = iter(chunks)
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(metadata_parser.parse_dump_files, location, chunk, known_hashes))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                results = pending.popleft().result()
+                next_chunk = next(chunks, None)
+                if next_chunk:
+                    pending.append(executor.submit(metadata_parser.parse_dump_files, location, next_chunk, known_hashes))
+                yield from results
+                done += len(results)
+                self._update_progress(done, total)
+
+    def _get_parse_workers(self):
+        """Число процессов разбора: параметр alm_metadata.import_workers, не больше числа CPU"""
+        workers = int(self.env['ir.config_parameter'].sudo().get_param('alm_metadata.import_workers', DEFAULT_PARSE_WORKERS))
+        return max(1, min(workers, os.cpu_count() or 1))
+
+    def _update_progress(self, done, total):
+        """Прогресс задания пишется в отдельной транзакции, чтобы он был виден до окончания загрузки"""
+        if not self.job_id:
+            return
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                "UPDATE %s SET progress_done = %s, progress_total = %s WHERE id = %s",
+                SQL.identifier(self.job_id._table), done, total, self.job_id.id,
+            ))
+
+    def _load_derived_dump(self):
+        """
+        Загрузка новой версии на основе предыдущей. Файл объекта в выгрузке
+        содержит объект со всеми реквизитами, поэтому при совпадении хэша файла
+        объект не разбирается, а копируется из предыдущей версии SQL-запросом
+        INSERT ... SELECT вместе со всем поддеревом реквизитов. Разбираются и
+        записываются только добавленные и измененные объекты.
+        """
+        previous_version = self.previous_version_id
+        if not previous_version:
+            raise UserError(_("Please select the previous version."))
+        if previous_version == self.version_id:
+            raise UserError(_("The previous version must differ from the loaded version."))
+        result = {
+            'total': 0,
+            'created': 0,
+            'skipped': 0,
+            'attributes_created': 0,
+            'unchanged': 0,
+            'added': 0,
+            'changed': 0,
+            'removed': 0,
+        }
+        start, result = self._get_resume_state(result)
+        if not start and self.env['alm.metadata.object'].search_count([('version_id', '=', self.version_id.id)], limit=1):
+            raise UserError(_("Version %s already contains metadata objects.") % self.version_id.display_name)
+
+        previous_objects = self._get_previous_objects()
+        previous_by_hash = {
+            values['content_hash']: guid
+            for guid, values in previous_objects.items() if values['content_hash']
+        }
+        state = {
+            'objects': self._get_existing_objects(),
+            'attributes': self._get_existing_attributes(),
+            'type_ids': dict(self.env['alm.metadata.object.type']._get_type_id_map()),
+        }
+        unchanged_ids = []
+        batch = []
+        with self._open_dump_source() as source:
+            for hash_value, data in self._iter_dump_files(source, frozenset(previous_by_hash), start=start):
+                result['total'] += 1
+                guid = previous_by_hash.get(hash_value)
+                if guid:
+                    unchanged_ids.append(previous_objects[guid]['id'])
+                elif data:
+                    batch.append(data)
+                else:
+                    result['skipped'] += 1
+                if len(unchanged_ids) >= BATCH_SIZE or len(batch) >= BATCH_SIZE:
+                    self._write_derived_batch(unchanged_ids, batch, state, previous_objects, result)
+                    self._checkpoint(result)
+                    unchanged_ids = []
+                    batch = []
+
+        self._write_derived_batch(unchanged_ids, batch, state, previous_objects, result)
+
+        removed = [
+            dict(values, version_id=self.version_id.id, previous_version_id=previous_version.id)
+            for values in self._get_removed_objects()
+        ]
+        self.env['alm.metadata.change'].create(removed)
+        result['removed'] += len(removed)
+        return result
+
+    def _write_derived_batch(self, unchanged_ids, batch, state, previous_objects, result):
+        """Копирует неизмененные объекты, записывает разобранные и отчет об изменениях"""
+        if unchanged_ids:
+            self._copy_objects(unchanged_ids)
+            result['unchanged'] += len(unchanged_ids)
+        if not batch:
+            return
+        self._write_dump_batch(batch, state, result)
+        changes = self._get_dump_changes(batch, state, previous_objects)
+        for vals in changes:
+            vals.update(version_id=self.version_id.id, previous_version_id=self.previous_version_id.id)
+            result[vals['change_type']] += 1
+        self.env['alm.metadata.change'].create(changes)
+
+    def _get_dump_changes(self, batch, state, previous_objects):
+        changes = []
+        for data in batch:
+            previous = previous_objects.get(data['technical_guid'])
+            changes.append({
+                'change_type': 'changed' if previous else 'added',
+                'object_id': state['objects'][data['technical_name']][0],
+                'previous_object_id': previous['id'] if previous else False,
+                'technical_name': data['technical_name'],
+                'technical_guid': data['technical_guid'],
+                'type_id': state['type_ids'].get(TYPE_MAPPING[data['type_tag']], False),
+            })
+        return changes
+
+    def _get_previous_objects(self):
+        """technical_guid -> данные объектов предыдущей версии одним запросом"""
+        MetadataObject = self.env['alm.metadata.object']
+        MetadataObject.flush_model(['technical_guid', 'technical_name', 'content_hash', 'type_id', 'version_id'])
+        self.env.cr.execute(SQL(
+            """SELECT technical_guid, id, technical_name, content_hash, type_id
+                 FROM %s
+                WHERE version_id = %s AND technical_guid IS NOT NULL""",
+            SQL.identifier(MetadataObject._table), self.previous_version_id.id,
+        ))
+        return {
+            guid: {'id': object_id, 'technical_name': technical_name, 'content_hash': hash_value, 'type_id': type_id}
+            for guid, object_id, technical_name, hash_value, type_id in self.env.cr.fetchall()
+        }
+
+    def _get_removed_objects(self):
+        """Объекты предыдущей версии, которых нет в загруженной версии, одним запросом"""
+        MetadataObject = self.env['alm.metadata.object']
+        MetadataObject.flush_model(['technical_guid', 'technical_name', 'type_id', 'version_id'])
+        self.env.cr.execute(SQL(
+            """SELECT p.id, p.technical_name, p.technical_guid, p.type_id
+                 FROM %(table)s p
+                WHERE p.version_id = %(previous_version_id)s
+                  AND p.technical_guid IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM %(table)s n
+                       WHERE n.version_id = %(version_id)s AND n.technical_guid = p.technical_guid
+                  )""",
+            table=SQL.identifier(MetadataObject._table),
+            previous_version_id=self.previous_version_id.id,
+            version_id=self.version_id.id,
+        ))
+        return [
+            {
+                'change_type': 'removed',
+                'previous_object_id': object_id,
+                'technical_name': technical_name,
+                'technical_guid': guid,
+                'type_id': type_id,
+            }
+            for object_id, technical_name, guid, type_id in self.env.cr.fetchall()
+        ]
+
+    def _copy_objects(self, object_ids):
+        """Копирует объекты предыдущей версии вместе с деревом реквизитов в загружаемую версию"""
+        MetadataObject = self.env['alm.metadata.object']
+        Attribute = self.env['alm.metadata.object.attribute']
+        MetadataObject.flush_model()
+        Attribute.flush_model()
+
+        new_object_ids = self._copy_rows(MetadataObject, object_ids, {
+            'version_id': [self.version_id.id] * len(object_ids),
+            'unit_id': [self.version_id.unit_id.id] * len(object_ids),
+        })
+        object_map = dict(zip(object_ids, new_object_ids))
+
+        self.env.cr.execute(SQL(
+            "SELECT id, object_id FROM %s WHERE object_id = ANY(%s) AND parent_id IS NULL ORDER BY id",
+            SQL.identifier(Attribute._table), object_ids,
+        ))
+        level = [(attr_id, object_map[object_id], None) for attr_id, object_id in self.env.cr.fetchall()]
+        while level:
+            old_ids = [attr_id for attr_id, _object_id, _parent_id in level]
+            new_ids = self._copy_rows(Attribute, old_ids, {
+                'object_id': [object_id for _attr_id, object_id, _parent_id in level],
+                'parent_id': [parent_id for _attr_id, _object_id, parent_id in level],
+            })
+            attribute_map = dict(zip(old_ids, new_ids))
+            self.env.cr.execute(SQL(
+                """UPDATE %(table)s a
+                      SET parent_path = coalesce((SELECT p.parent_path FROM %(table)s p WHERE p.id = a.parent_id), '')
+                                        || a.id || '/'
+                    WHERE a.id = ANY(%(ids)s)""",
+                table=SQL.identifier(Attribute._table), ids=new_ids,
+            ))
+            self.env.cr.execute(SQL(
+                "SELECT id, object_id, parent_id FROM %s WHERE parent_id = ANY(%s) ORDER BY id",
+                SQL.identifier(Attribute._table), old_ids,
+            ))
+            level = [
+                (attr_id, object_map[object_id], attribute_map[parent_id])
+                for attr_id, object_id, parent_id in self.env.cr.fetchall()
+            ]
+
+        MetadataObject.invalidate_model()
+        Attribute.invalidate_model()
+        return object_map
+
+    def _copy_rows(self, model, ids, overrides):
+        """
+        Копирует строки таблицы модели одним INSERT ... SELECT.
+        overrides - столбец -> список новых значений (целые числа) в порядке ids.
+        Возвращает id новых строк в порядке ids. parent_path не копируется:
+        он содержит id строк и заполняется вызывающим кодом.
+        """
+        override_names = list(overrides)
+        columns = [
+            name for name, field in model._fields.items()
+            if field.store and field.column_type and name not in ('id', 'parent_path')
+        ]
+        values = []
+        for name in columns:
+            if name in overrides:
+                values.append(SQL("m.%s", SQL.identifier(name)))
+            elif name in ('create_uid', 'write_uid'):
+                values.append(SQL("%s", self.env.uid))
+            elif name in ('create_date', 'write_date'):
+                values.append(SQL("(now() at time zone 'UTC')"))
+            else:
+                values.append(SQL("t.%s", SQL.identifier(name)))
+
+        self.env.cr.execute(SQL(
+            """INSERT INTO %(table)s (%(columns)s)
+               SELECT %(values)s
+                 FROM unnest(%(arrays)s) WITH ORDINALITY AS m(old_id, %(override_names)s, seq)
+                 JOIN %(table)s t ON t.id = m.old_id
+                ORDER BY m.seq
+            RETURNING id""",
+            table=SQL.identifier(model._table),
+            columns=SQL(", ").join(SQL.identifier(name) for name in columns),
+            values=SQL(", ").join(values),
+            arrays=SQL(", ").join(
+                SQL("%s::int[]", array) for array in [list(ids)] + [overrides[name] for name in override_names]
+            ),
+            override_names=SQL(", ").join(SQL.identifier(name) for name in override_names),
+        ))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _process_dump_objects(self, parsed_objects, result):
+        state = {
+            'objects': self._get_existing_objects(),
+            'attributes': self._get_existing_attributes(),
+            'type_ids': dict(self.env['alm.metadata.object.type']._get_type_id_map()),
+        }
+        batch = []
+        for data in parsed_objects:
+            result['total'] += 1
+            if not data:
+                result['skipped'] += 1
+                continue
+            batch.append(data)
+            if len(batch) >= BATCH_SIZE:
+                self._write_dump_batch(batch, state, result)
+                self._checkpoint(result)
+                batch = []
+        if batch:
+            self._write_dump_batch(batch, state, result)
+        return result
+
+    def _write_dump_batch(self, batch, state, result):
+        """
+        Записывает пакет разобранных объектов: сначала недостающие объекты,
+        затем реквизиты верхнего уровня и реквизиты табличных частей.
+        Каждый уровень создается одним create(vals_list), display_name
+        вычисляется здесь же, без рекурсивного пересчета по строкам.
+        """
+        objects = state['objects']
+        type_ids = state['type_ids']
+
+        new_items = []
+        for data in batch:
+            if data['technical_name'] in objects:
+                result['skipped'] += 1
+                continue
+            type_technical_name = TYPE_MAPPING[data['type_tag']]
+            type_id = self._get_or_create_type(
+                type_technical_name,
+                self._get_type_display_name(type_technical_name),
+                type_ids,
+            )
+            new_items.append((data, {
+                'name': data['technical_name'],
+                'technical_name': data['technical_name'],
+                'technical_guid': data['technical_guid'],
+                'description': data['description'],
+                'content_hash': data['content_hash'],
+                'type_id': type_id,
+                'version_id': self.version_id.id,
+            }))
+        if new_items:
+            records = self._get_bulk_object_model().create([vals for _data, vals in new_items])
+            for (data, vals), record in zip(new_items, records):
+                objects[data['technical_name']] = (record.id, vals['name'])
+            result['created'] += len(records)
+
+        level = []
+        for data in batch:
+            object_id, object_name = objects[data['technical_name']]
+            level.extend((object_id, False, object_name, attr) for attr in data['attributes'])
+        while level:
+            level = self._create_attribute_level(level, state, result)
+
+    def _create_attribute_level(self, level, state, result):
+        """Создает один уровень иерархии реквизитов и возвращает следующий"""
+        existing = state['attributes']
+        type_ids = state['type_ids']
+        to_create = []
+        next_level = []
+        for object_id, parent_id, parent_display_name, attr in level:
+            key = (object_id, parent_id, attr['technical_name'])
+            if key in existing:
+                attr_id, display_name = existing[key]
+                next_level.extend((object_id, attr_id, display_name, child) for child in attr['children'])
+                continue
+            to_create.append((key, attr, {
+                'name': attr['technical_name'],
+                'technical_name': attr['technical_name'],
+                'description': attr['description'],
+                'sequence': attr['sequence'],
+                'type_id': type_ids.get(attr['type_technical_name'], False),
+                'object_id': object_id,
+                'parent_id': parent_id,
+                'display_name': f"{parent_display_name} / {attr['technical_name']}",
+            }))
+        if to_create:
+            records = self.env['alm.metadata.object.attribute'].create([vals for _key, _attr, vals in to_create])
+            for (key, attr, vals), record in zip(to_create, records):
+                existing[key] = (record.id, vals['display_name'])
+                next_level.extend((key[0], record.id, vals['display_name'], child) for child in attr['children'])
+            result['attributes_created'] += len(records)
+        return next_level
+
+    def _get_existing_objects(self):
+        """technical_name -> (id, name) объектов версии одним запросом"""
+        MetadataObject = self.env['alm.metadata.object']
+        MetadataObject.flush_model(['name', 'technical_name', 'version_id'])
+        self.env.cr.execute(SQL(
+            "SELECT technical_name, id, name FROM %s WHERE version_id = %s AND technical_name IS NOT NULL",
+            SQL.identifier(MetadataObject._table), self.version_id.id,
+        ))
+        return {technical_name: (object_id, name) for technical_name, object_id, name in self.env.cr.fetchall()}
+
+    def _get_existing_attributes(self):
+        """(object_id, parent_id, technical_name) -> (id, display_name) реквизитов версии одним запросом"""
+        Attribute = self.env['alm.metadata.object.attribute']
+        Attribute.flush_model(['technical_name', 'object_id', 'parent_id', 'display_name'])
+        self.env.cr.execute(SQL("""
+            SELECT a.object_id, a.parent_id, a.technical_name, a.id, a.display_name
+              FROM %s a
+              JOIN %s o ON o.id = a.object_id
+             WHERE o.version_id = %s AND a.technical_name IS NOT NULL
+        """,
+            SQL.identifier(Attribute._table),
+            SQL.identifier(self.env['alm.metadata.object']._table),
+            self.version_id.id,
+        ))
+        return {
+            (object_id, parent_id or False, technical_name): (attr_id, display_name)
+            for object_id, parent_id, technical_name, attr_id, display_name in self.env.cr.fetchall()
+        }
+
+    def _get_or_create_type(self, technical_name, display_name, type_ids):
+        """
+        Возвращает id типа по техническому имени. type_ids - кэш текущей загрузки,
+        заполненный из кэша реестра, поэтому таблица типов читается один раз.
+        """
         if not technical_name:
             return False
             
-        type_obj = self.env['alm.metadata.object.type'].search([
-            ('technical_name', '=', technical_name)
-        ], limit=1)
-        
-        if type_obj:
-            return type_obj
+        type_id = type_ids.get(technical_name)
+        if type_id:
+            return type_id
             
-        return self.env['alm.metadata.object.type'].create({
+        type_id = self.env['alm.metadata.object.type'].create({
             'name': display_name,
             'technical_name': technical_name
-        })
+        }).id
+        type_ids[technical_name] = type_id
+        return type_id
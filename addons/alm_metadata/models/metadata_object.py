@@ -1,14 +1,22 @@
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 
 class MetadataObject(models.Model):
     _name = 'alm.metadata.object'
     _description = 'ALM Metadata Object'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'alm.metadata.search.mixin']
 
-    name = fields.Char(string='Display Name', required=True, index=True, help="Name to be displayed in Odoo interface.")
+    name = fields.Char(string='Display Name', required=True, index='trigram', help="Name to be displayed in Odoo interface.")
     
-    technical_name = fields.Char(string='Technical Name', index=True, help="The technical name of the object in the source application.")
+    technical_name = fields.Char(string='Technical Name', index='trigram', help="The technical name of the object in the source application.")
     technical_guid = fields.Char(string='Technical GUID', index=True, help="The GUID of the object in the source application.")
+    content_hash = fields.Char(
+        string='Content Hash',
+        index=True,
+        readonly=True,
+        copy=False,
+        help="Hash of the object description in the configuration dump, including its attributes."
+    )
 
     description = fields.Text(string='Description')
     comment = fields.Text(string='Comment')
@@ -45,3 +53,18 @@ class MetadataObject(models.Model):
     _sql_constraints = [
         ('technical_guid_version_uniq', 'unique (technical_guid, version_id)', 'The GUID must be unique within a version!')
     ]
+
+    def write(self, vals):
+        if 'name' not in vals:
+            return super().write(vals)
+        old_names = {rec.id: rec.name for rec in self}
+        res = super().write(vals)
+        Attribute = self.env['alm.metadata.object.attribute']
+        for rec in self:
+            if old_names[rec.id] != rec.name:
+                Attribute._replace_display_name_prefix(
+                    old_names[rec.id],
+                    rec.name,
+                    SQL("object_id = %s", rec.id),
+                )
+        return res
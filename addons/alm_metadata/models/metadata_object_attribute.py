@@ -1,9 +1,13 @@
 from odoo import models, fields, api
+from odoo.tools import SQL, create_index
 
 class MetadataObjectAttribute(models.Model):
     _name = 'alm.metadata.object.attribute'
     _description = 'ALM Metadata Object Attribute'
+    _inherit = ['alm.metadata.search.mixin']
     _order = 'sequence,name'
+    _parent_store = True
+    _similarity_search_fields = ['name', 'technical_name', 'display_name']
 
     def _get_default_object_id(self):
         return self.env.context.get('default_object_id')
@@ -11,13 +15,15 @@ class MetadataObjectAttribute(models.Model):
     name = fields.Char(
         string='Attribute Name', 
         required=True, 
+        index='trigram',
         help="Name to be displayed in Odoo interface."
     )
     
-    display_name = fields.Char(string='Display Name', compute='_compute_display_name', store=True, recursive=True)
+    display_name = fields.Char(string='Display Name', compute='_compute_display_name', store=True, index='trigram')
 
     technical_name = fields.Char(
         string='Technical Name', 
+        index='trigram',
         help="The technical name of the attribute in the source application."
     )
 
@@ -26,6 +32,7 @@ class MetadataObjectAttribute(models.Model):
         string='Metadata Object', 
         required=True, 
         ondelete='cascade',
+        index=True,
         default=_get_default_object_id,
     )
 
@@ -42,6 +49,9 @@ class MetadataObjectAttribute(models.Model):
         string='Child Attributes'
     )
 
+    # Индекс с text_pattern_ops создается в init(): child_of ищет по префиксу пути
+    parent_path = fields.Char()
+
     sequence = fields.Integer(string='Sequence', default=10)
 
     type_id = fields.Many2one(
@@ -56,7 +66,17 @@ class MetadataObjectAttribute(models.Model):
         ('technical_name_object_uniq', 'unique (technical_name, object_id, parent_id)', 'The technical name must be unique within a metadata object or parent attribute!')
     ]
 
-    @api.depends('name', 'parent_id.display_name')
+    def init(self):
+        create_index(
+            self.env.cr,
+            'alm_metadata_object_attribute_parent_path_idx',
+            self._table,
+            ['parent_path text_pattern_ops'],
+        )
+
+    # display_name потомков не зависит от родителя в ORM: при переименовании
+    # или переносе он обновляется одним UPDATE по префиксу parent_path
+    @api.depends('name', 'object_id', 'parent_id')
     def _compute_display_name(self):
         for rec in self:
             if rec.parent_id:
@@ -65,3 +85,33 @@ class MetadataObjectAttribute(models.Model):
                 rec.display_name = f"{rec.object_id.name} / {rec.name}"
             else:
                 rec.display_name = rec.name
+
+    def write(self, vals):
+        if not {'name', 'object_id', 'parent_id'} & set(vals):
+            return super().write(vals)
+        old_display_names = {rec.id: rec.display_name for rec in self if rec.child_ids}
+        res = super().write(vals)
+        self.flush_recordset(['display_name', 'parent_path'])
+        # Сначала самые глубокие: их потомки еще начинаются со старого имени
+        for rec in self.browse(list(old_display_names)).sorted(lambda r: len(r.parent_path or ''), reverse=True):
+            old_display_name = old_display_names[rec.id]
+            if old_display_name and old_display_name != rec.display_name:
+                self._replace_display_name_prefix(
+                    old_display_name,
+                    rec.display_name,
+                    SQL("parent_path LIKE %s AND id != %s", f"{rec.parent_path}%", rec.id),
+                )
+        return res
+
+    @api.model
+    def _replace_display_name_prefix(self, old_prefix, new_prefix, where):
+        """Заменяет начало display_name у отобранных строк одним запросом"""
+        self.flush_model(['display_name'])
+        self.env.cr.execute(SQL(
+            """UPDATE %s
+                  SET display_name = %s || substr(display_name, %s)
+                WHERE %s AND left(display_name, %s) = %s""",
+            SQL.identifier(self._table), new_prefix, len(old_prefix) + 1,
+            where, len(old_prefix), old_prefix,
+        ))
+        self.invalidate_model(['display_name'])
@@ -1,4 +1,5 @@
-from odoo import models, fields
+from odoo import api, models, fields, tools
+from odoo.tools import SQL
 
 class MetadataObjectType(models.Model):
     _name = 'alm.metadata.object.type'
@@ -12,3 +13,28 @@ class MetadataObjectType(models.Model):
     _sql_constraints = [
         ('technical_name_uniq', 'unique (technical_name)', 'The technical name must be unique!')
     ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'technical_name' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.model
+    @tools.ormcache()
+    def _get_type_id_map(self):
+        """Map technical_name -> id of all types, cached on the registry."""
+        self.flush_model(['technical_name'])
+        self.env.cr.execute(SQL("SELECT technical_name, id FROM %s", SQL.identifier(self._table)))
+        return tools.frozendict(self.env.cr.fetchall())
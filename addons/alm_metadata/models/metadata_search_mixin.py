@@ -0,0 +1,42 @@
+from odoo import models, api
+from odoo.tools import SQL
+
+class MetadataSearchMixin(models.AbstractModel):
+    """Substring search over metadata names, ranked by trigram similarity.
+
+    Models list their searchable char columns in ``_similarity_search_fields``
+    and declare them with ``index='trigram'`` so that the ILIKE filter is
+    answered by the pg_trgm GIN indexes instead of a sequential scan.
+    """
+    _name = 'alm.metadata.search.mixin'
+    _description = 'ALM Metadata Similarity Search'
+
+    _similarity_search_fields = ['name', 'technical_name']
+
+    @api.model
+    def search_ranked(self, text, domain=None, limit=20):
+        """Records matching text in any search field, most similar first."""
+        text = (text or '').strip()
+        if not text:
+            return self.search(domain or [], limit=limit)
+
+        fnames = self._similarity_search_fields
+        search_domain = ['|'] * (len(fnames) - 1) + [(fname, 'ilike', text) for fname in fnames]
+        query = self._search(list(domain or []) + search_domain, limit=limit)
+        if self.env.registry.has_trigram:
+            query.order = SQL(
+                "GREATEST(%s) DESC, %s",
+                SQL(", ").join(
+                    SQL("similarity(%s, %s)", SQL.identifier(self._table, fname), text)
+                    for fname in fnames
+                ),
+                SQL.identifier(self._table, 'id'),
+            )
+        return self.browse(query)
+
+    @api.model
+    def name_search(self, name='', domain=None, operator='ilike', limit=100):
+        if not name or operator != 'ilike':
+            return super().name_search(name, domain, operator, limit)
+        records = self.search_ranked(name, domain, limit)
+        return [(record.id, record.display_name) for record in records.sudo()]
@@ -0,0 +1,34 @@
+import { registry } from "@web/core/registry";
+import { onWillUnmount } from "@odoo/owl";
+import { ProgressBarField, progressBarField } from "@web/views/fields/progress_bar/progress_bar_field";
+
+const POLL_INTERVAL = 3000;
+const ACTIVE_STATES = ["queued", "running"];
+
+/**
+ * Progress bar of a metadata import job. While the job is queued or running
+ * the record is reloaded periodically, so the form follows the background
+ * import without blocking a request.
+ */
+export class MetadataImportProgressField extends ProgressBarField {
+    setup() {
+        super.setup();
+        this.pollTimer = setInterval(() => this._poll(), POLL_INTERVAL);
+        onWillUnmount(() => clearInterval(this.pollTimer));
+    }
+
+    async _poll() {
+        const record = this.props.record;
+        if (!ACTIVE_STATES.includes(record.data.state)) {
+            return;
+        }
+        await record.model.load();
+    }
+}
+
+export const metadataImportProgressField = {
+    ...progressBarField,
+    component: MetadataImportProgressField,
+};
+
+registry.category("fields").add("metadata_import_progress", metadataImportProgressField);
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_metadata_parser
+from . import test_metadata_loader
+from . import test_metadata_import_job
+from . import test_metadata_attribute
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class TestMetadataAttribute(TransactionCase):
+
+    def setUp(self):
+        super(TestMetadataAttribute, self).setUp()
+        self.Object = self.env['alm.metadata.object']
+        self.Attribute = self.env['alm.metadata.object.attribute']
+
+        unit = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        version = self.env['alm.configurable.unit.version'].create({'name': '1.0.0', 'unit_id': unit.id})
+        catalog = self.env.ref('alm_metadata.meta_type_catalog')
+        self.items, self.units = self.Object.create([
+            {'name': 'Items', 'technical_name': 'Items', 'type_id': catalog.id, 'version_id': version.id},
+            {'name': 'Units', 'technical_name': 'Units', 'type_id': catalog.id, 'version_id': version.id},
+        ])
+        self.barcodes = self.Attribute.create({'name': 'Barcodes', 'technical_name': 'Barcodes', 'object_id': self.items.id})
+        self.barcode = self.Attribute.create({
+            'name': 'Barcode', 'technical_name': 'Barcode', 'object_id': self.items.id, 'parent_id': self.barcodes.id,
+        })
+        self.barcode_type = self.Attribute.create({
+            'name': 'Type', 'technical_name': 'Type', 'object_id': self.items.id, 'parent_id': self.barcode.id,
+        })
+
+    def test_01_parent_path(self):
+        """Тест: путь реквизита хранится в parent_path"""
+        self.assertEqual(self.barcode_type.parent_path, '%s/%s/%s/' % (self.barcodes.id, self.barcode.id, self.barcode_type.id))
+        self.assertEqual(self.barcode_type.display_name, 'Items / Barcodes / Barcode / Type')
+
+    def test_02_rename_attribute(self):
+        """Тест: переименование реквизита обновляет display_name всех потомков"""
+        self.barcodes.name = 'Codes'
+        self.assertEqual(self.barcode.display_name, 'Items / Codes / Barcode')
+        self.assertEqual(self.barcode_type.display_name, 'Items / Codes / Barcode / Type')
+
+    def test_03_rename_object(self):
+        """Тест: переименование объекта обновляет display_name его реквизитов"""
+        self.items.name = 'Products'
+        self.assertEqual(self.barcodes.display_name, 'Products / Barcodes')
+        self.assertEqual(self.barcode_type.display_name, 'Products / Barcodes / Barcode / Type')
+        # Реквизиты других объектов с тем же началом имени не затрагиваются
+        other = self.Attribute.create({'name': 'Code', 'technical_name': 'Code', 'object_id': self.units.id})
+        self.units.name = 'Items'
+        self.items.name = 'Goods'
+        self.assertEqual(other.display_name, 'Items / Code')
+
+    def test_04_move_attribute(self):
+        """Тест: перенос реквизита к другому родителю обновляет путь и имена потомков"""
+        codes = self.Attribute.create({'name': 'Codes', 'technical_name': 'Codes', 'object_id': self.items.id})
+        self.barcode.parent_id = codes
+        self.assertEqual(self.barcode_type.parent_path, '%s/%s/%s/' % (codes.id, self.barcode.id, self.barcode_type.id))
+        self.assertEqual(self.barcode_type.display_name, 'Items / Codes / Barcode / Type')
+
+    def test_05_search_ranked(self):
+        """Тест: поиск по подстроке упорядочен по сходству"""
+        self.assertEqual(self.Object.search_ranked('Units', [('id', 'in', (self.items | self.units).ids)]), self.units)
+        found = self.Attribute.search_ranked('Barcode', [('object_id', '=', self.items.id)])
+        self.assertEqual(set(found.ids), {self.barcodes.id, self.barcode.id, self.barcode_type.id})
+        if self.env.registry.has_trigram:
+            self.assertEqual(found[0], self.barcode)
+
+        names = [name for _id, name in self.Attribute.name_search('Barcode', [('object_id', '=', self.items.id)])]
+        self.assertIn('Items / Barcodes / Barcode', names)
+        self.assertFalse(self.Object.search_ranked('Nothing like this', [('id', '=', self.items.id)]))
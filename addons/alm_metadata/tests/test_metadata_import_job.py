@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import base64
+
+from odoo.exceptions import AccessError
+from odoo.tests.common import TransactionCase, new_test_user
+
+from .test_metadata_loader import CONFIGURATION_XML
+
+
+class TestMetadataImportJob(TransactionCase):
+
+    def setUp(self):
+        super(TestMetadataImportJob, self).setUp()
+        self.Job = self.env['alm.metadata.import.job']
+        self.unit = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        self.version = self.env['alm.configurable.unit.version'].create({'name': '1.0.0', 'unit_id': self.unit.id})
+        self.user = new_test_user(self.env, login='alm_import_user', groups='base.group_user')
+        self.other_user = new_test_user(self.env, login='alm_import_other', groups='base.group_user')
+
+    def _create_job(self, user):
+        return self.Job.with_user(user).create({
+            'unit_id': self.unit.id,
+            'version_id': self.version.id,
+            'import_mode': 'configuration',
+            'data_file': base64.b64encode(CONFIGURATION_XML),
+            'file_name': 'Configuration.xml',
+        })
+
+    def test_01_user_cannot_write_job_state(self):
+        """Тест: пользователь не может изменить состояние и контрольные точки задания"""
+        job = self._create_job(self.user)
+        self.assertEqual(job.state, 'queued')
+
+        with self.assertRaises(AccessError):
+            job.with_user(self.user).write({'state': 'done'})
+        with self.assertRaises(AccessError):
+            job.with_user(self.other_user).write({'resume_index': 100})
+
+        # Значения состояния при создании игнорируются
+        forged = self.Job.with_user(self.user).create({
+            'unit_id': self.unit.id,
+            'version_id': self.version.id,
+            'import_mode': 'configuration',
+            'state': 'done',
+            'resume_index': 100,
+        })
+        self.assertEqual(forged.state, 'queued')
+        self.assertEqual(forged.resume_index, 0)
+
+    def test_02_retry_and_cancel_by_owner(self):
+        """Тест: отменить и перезапустить задание может только его автор"""
+        job = self._create_job(self.user)
+        with self.assertRaises(AccessError):
+            job.with_user(self.other_user).action_cancel()
+
+        job.with_user(self.user).action_cancel()
+        self.assertEqual(job.state, 'cancelled')
+        job.with_user(self.user).action_retry()
+        self.assertEqual(job.state, 'queued')
+
+    def test_03_resume_restores_counters(self):
+        """Тест: после сбоя загрузка Configuration.xml продолжается с контрольной точки со счетчиками"""
+        job = self._create_job(self.user)
+        type_catalog = self.env.ref('alm_metadata.meta_type_catalog')
+        # Первые два объекта файла записаны и зафиксированы до сбоя
+        self.env['alm.metadata.object'].create([
+            {'name': name, 'technical_name': name, 'type_id': type_catalog.id, 'version_id': self.version.id}
+            for name in ('Items', 'Units')
+        ])
+        job.write({
+            'state': 'running',
+            'resume_index': 2,
+            'result_data': {'total': 2, 'created': 2, 'skipped': 0},
+        })
+
+        loader = self.env['metadata.loader.wizard'].create({
+            'unit_id': self.unit.id,
+            'version_id': self.version.id,
+            'import_mode': 'configuration',
+            'job_id': job.id,
+        })
+        message = loader._run_import()
+        self.assertIn('processed 4 objects. Created: 4, Skipped: 0', message)
+        self.assertEqual(self.env['alm.metadata.object'].search_count([('version_id', '=', self.version.id)]), 4)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+from odoo.addons.alm_metadata.models import metadata_loader
+
+from .test_metadata_parser import CATALOG_XML
+
+CONFIGURATION_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration uuid="0b6a1f9e-1111-4c2d-9a8b-000000000000">
+        <Properties><Name>Trade</Name></Properties>
+        <ChildObjects>
+            <Language>Russian</Language>
+            <Catalog>Items</Catalog>
+            <Catalog>Units</Catalog>
+            <Document>Orders</Document>
+            <Enum>OrderStates</Enum>
+        </ChildObjects>
+    </Configuration>
+</MetaDataObject>
+"""
+
+
+class TestMetadataLoader(TransactionCase):
+
+    def setUp(self):
+        super(TestMetadataLoader, self).setUp()
+        self.Loader = self.env['metadata.loader.wizard']
+        self.Object = self.env['alm.metadata.object']
+        self.Attribute = self.env['alm.metadata.object.attribute']
+
+        self.unit = self.env['alm.configurable.unit'].create({'name': 'Trade', 'unit_type': 'configuration'})
+        self.version = self.env['alm.configurable.unit.version'].create({'name': '1.0.0', 'unit_id': self.unit.id})
+
+    def _make_dump(self, files):
+        """Каталог выгрузки: относительный путь -> содержимое файла"""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        for path, content in files.items():
+            full_path = os.path.join(location, *path.split('/'))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as f:
+                f.write(content)
+        return location
+
+    def _run_loader(self, import_mode, version, **vals):
+        loader = self.Loader.create(dict(vals, unit_id=self.unit.id, version_id=version.id, import_mode=import_mode))
+        return loader._run_import()
+
+    def test_01_full_dump(self):
+        """Тест: загрузка выгрузки создает объекты, реквизиты и реквизиты табличных частей"""
+        location = self._make_dump({'Catalogs/Items.xml': CATALOG_XML})
+        self._run_loader('full', self.version, dump_path=location)
+
+        item = self.Object.search([('version_id', '=', self.version.id)])
+        self.assertEqual(item.technical_name, 'Items')
+        self.assertEqual(item.type_id, self.env.ref('alm_metadata.meta_type_catalog'))
+        self.assertTrue(item.content_hash)
+
+        top_level = item.attribute_ids.filtered(lambda attr: not attr.parent_id)
+        self.assertEqual(top_level.mapped('technical_name'), ['Unit', 'Weight', 'Barcodes'])
+        self.assertEqual(top_level[0].type_id, self.env.ref('alm_metadata.meta_type_catalog'))
+
+        barcode = self.Attribute.search([('object_id', '=', item.id), ('technical_name', '=', 'Barcode')])
+        self.assertEqual(barcode.parent_id, top_level[2])
+        self.assertEqual(barcode.display_name, 'Items / Barcodes / Barcode')
+
+    def test_02_full_dump_reload(self):
+        """Тест: повторная загрузка той же выгрузки не создает дубликатов"""
+        location = self._make_dump({'Catalogs/Items.xml': CATALOG_XML})
+        self._run_loader('full', self.version, dump_path=location)
+        self._run_loader('full', self.version, dump_path=location)
+
+        item = self.Object.search([('version_id', '=', self.version.id)])
+        self.assertEqual(len(item), 1)
+        self.assertEqual(len(item.attribute_ids), 4)
+
+    def test_03_configuration_xml(self):
+        """Тест: Configuration.xml разбирается потоково, объекты создаются пакетно"""
+        data_file = base64.b64encode(CONFIGURATION_XML)
+        self._run_loader('configuration', self.version, data_file=data_file)
+
+        objects = self.Object.search([('version_id', '=', self.version.id)])
+        self.assertEqual(sorted(objects.mapped('technical_name')), ['Items', 'OrderStates', 'Orders', 'Units'])
+        orders = objects.filtered(lambda obj: obj.technical_name == 'Orders')
+        self.assertEqual(orders.type_id, self.env.ref('alm_metadata.meta_type_document'))
+
+        # Повторная загрузка пропускает существующие объекты
+        message = self._run_loader('configuration', self.version, data_file=data_file)
+        self.assertIn('Created: 0, Skipped: 4', message)
+
+    def test_04_configuration_xml_invalid(self):
+        """Тест: некорректный или неполный Configuration.xml отклоняется"""
+        with self.assertRaises(UserError):
+            self._run_loader('configuration', self.version, data_file=base64.b64encode(b'<MetaDataObject>'))
+        with self.assertRaises(UserError):
+            self._run_loader('configuration', self.version, data_file=base64.b64encode(b'<MetaDataObject/>'))
+
+    def test_05_type_id_cache(self):
+        """Тест: кэш типов объектов сбрасывается при создании типа"""
+        Type = self.env['alm.metadata.object.type']
+        type_ids = Type._get_type_id_map()
+        self.assertEqual(type_ids['Catalog'], self.env.ref('alm_metadata.meta_type_catalog').id)
+        self.assertNotIn('Sequence', type_ids)
+
+        sequence_type = Type.create({'name': 'Последовательность', 'technical_name': 'Sequence'})
+        self.assertEqual(Type._get_type_id_map()['Sequence'], sequence_type.id)
+
+        # Неизвестный тип создается один раз и запоминается в кэше загрузки
+        loader = self.Loader.create({'unit_id': self.unit.id, 'version_id': self.version.id})
+        cache = dict(Type._get_type_id_map())
+        type_id = loader._get_or_create_type('FilterCriterion', 'Критерий отбора', cache)
+        self.assertEqual(cache['FilterCriterion'], type_id)
+        self.assertEqual(loader._get_or_create_type('FilterCriterion', 'Критерий отбора', cache), type_id)
+        self.assertEqual(Type.search_count([('technical_name', '=', 'FilterCriterion')]), 1)
+
+    def test_06_derived_dump(self):
+        """Тест: новая версия копирует неизмененные объекты и фиксирует изменения"""
+        orders_xml = CATALOG_XML.replace(b'<Catalog ', b'<Document ').replace(b'</Catalog>', b'</Document>') \
+            .replace(b'<Name>Items</Name>', b'<Name>Orders</Name>').replace(b'000000000001', b'000000000003')
+        units_xml = CATALOG_XML.replace(b'<Name>Items</Name>', b'<Name>Units</Name>') \
+            .replace(b'000000000001', b'000000000004')
+        self._run_loader('full', self.version, dump_path=self._make_dump({
+            'Catalogs/Items.xml': CATALOG_XML,
+            'Catalogs/Units.xml': units_xml,
+            'Documents/Orders.xml': orders_xml,
+        }))
+
+        version2 = self.env['alm.configurable.unit.version'].create({'name': '1.1.0', 'unit_id': self.unit.id})
+        changed_orders_xml = orders_xml.replace(b'Weight', b'Amount')
+        stores_xml = CATALOG_XML.replace(b'<Name>Items</Name>', b'<Name>Stores</Name>') \
+            .replace(b'000000000001', b'000000000005')
+        message = self._run_loader('derive', version2, previous_version_id=self.version.id, dump_path=self._make_dump({
+            'Catalogs/Items.xml': CATALOG_XML,
+            'Catalogs/Stores.xml': stores_xml,
+            'Documents/Orders.xml': changed_orders_xml,
+        }))
+        self.assertIn('Unchanged: 1, Added: 1, Changed: 1, Removed: 1', message)
+
+        objects = self.Object.search([('version_id', '=', version2.id)])
+        self.assertEqual(sorted(objects.mapped('technical_name')), ['Items', 'Orders', 'Stores'])
+        items = objects.filtered(lambda obj: obj.technical_name == 'Items')
+        self.assertEqual(sorted(items.attribute_ids.mapped('display_name')), [
+            'Items / Barcodes', 'Items / Barcodes / Barcode', 'Items / Unit', 'Items / Weight',
+        ])
+        barcode = items.attribute_ids.filtered(lambda attr: attr.technical_name == 'Barcode')
+        self.assertEqual(barcode.parent_path, '%s/%s/' % (barcode.parent_id.id, barcode.id))
+
+        changes = self.env['alm.metadata.change'].search([('version_id', '=', version2.id)])
+        self.assertEqual(
+            sorted((change.change_type, change.technical_name) for change in changes),
+            [('added', 'Stores'), ('changed', 'Orders'), ('removed', 'Units')],
+        )
+
+    def test_07_derived_dump_requires_empty_version(self):
+        """Тест: производную загрузку нельзя выполнить в версию с объектами"""
+        location = self._make_dump({'Catalogs/Items.xml': CATALOG_XML})
+        self._run_loader('full', self.version, dump_path=location)
+        version2 = self.env['alm.configurable.unit.version'].create({'name': '1.1.0', 'unit_id': self.unit.id})
+        self._run_loader('full', version2, dump_path=location)
+
+        with self.assertRaises(UserError):
+            self._run_loader('derive', version2, previous_version_id=self.version.id, dump_path=location)
+
+    def test_08_parse_in_worker_processes(self):
+        """Тест: разбор в процессах (spawn) дает тот же результат, что и в текущем процессе"""
+        files = {
+            'Catalogs/%s.xml' % name: CATALOG_XML.replace(b'<Name>Items</Name>', b'<Name>%s</Name>' % name.encode())
+                .replace(b'000000000001', b'00000000010%d' % i)
+            for i, name in enumerate(['Items', 'Units', 'Stores', 'Prices'])
+        }
+        location = self._make_dump(files)
+        self.env['ir.config_parameter'].sudo().set_param('alm_metadata.import_workers', 2)
+
+        loader = self.Loader.create({'unit_id': self.unit.id, 'version_id': self.version.id})
+        paths = sorted(files)
+        inline = list(loader._iter_dump_files(location))
+        with patch.object(metadata_loader, 'PARSE_CHUNK_SIZE', 1), \
+                patch.object(metadata_loader, 'PARALLEL_MIN_FILES', 1), \
+                patch('os.cpu_count', return_value=4):
+            self.assertEqual(loader._get_parse_workers(), 2)
+            parallel = list(loader._iter_dump_files(location))
+
+        self.assertEqual(parallel, inline)
+        self.assertEqual([data['technical_name'] for _hash, data in parallel], [path[9:-4] for path in paths])
+
+    def test_09_parse_workers_capped(self):
+        """Тест: число процессов разбора ограничено параметром и числом CPU"""
+        loader = self.Loader.create({'unit_id': self.unit.id, 'version_id': self.version.id})
+        Param = self.env['ir.config_parameter'].sudo()
+        with patch('os.cpu_count', return_value=8):
+            Param.set_param('alm_metadata.import_workers', 64)
+            self.assertEqual(loader._get_parse_workers(), 8)
+            Param.set_param('alm_metadata.import_workers', 0)
+            self.assertEqual(loader._get_parse_workers(), 1)
+            Param.search([('key', '=', 'alm_metadata.import_workers')]).unlink()
+            self.assertEqual(loader._get_parse_workers(), metadata_loader.DEFAULT_PARSE_WORKERS)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import zipfile
+
+from lxml import etree
+
+from odoo.tests.common import BaseCase
+from odoo.addons.alm_metadata.tools import metadata_parser
+
+CATALOG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core">
+    <Catalog uuid="0b6a1f9e-1111-4c2d-9a8b-000000000001">
+        <Properties>
+            <Name>Items</Name>
+            <Synonym>
+                <v8:item><v8:lang>ru</v8:lang><v8:content>Номенклатура</v8:content></v8:item>
+            </Synonym>
+        </Properties>
+        <ChildObjects>
+            <Attribute>
+                <Properties>
+                    <Name>Unit</Name>
+                    <Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>Единица</v8:content></v8:item></Synonym>
+                    <Type><v8:Type>cfg:CatalogRef.Units</v8:Type></Type>
+                </Properties>
+            </Attribute>
+            <Attribute>
+                <Properties>
+                    <Name>Weight</Name>
+                    <Type><v8:Type>xs:decimal</v8:Type></Type>
+                </Properties>
+            </Attribute>
+            <Form>ItemForm</Form>
+            <TabularSection>
+                <Properties><Name>Barcodes</Name></Properties>
+                <ChildObjects>
+                    <Attribute>
+                        <Properties>
+                            <Name>Barcode</Name>
+                            <Type><v8:Type>xs:string</v8:Type></Type>
+                        </Properties>
+                    </Attribute>
+                </ChildObjects>
+            </TabularSection>
+        </ChildObjects>
+    </Catalog>
+</MetaDataObject>
+""".encode('utf-8')
+
+FORM_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Form uuid="0b6a1f9e-1111-4c2d-9a8b-000000000002">
+        <Properties><Name>ItemForm</Name></Properties>
+    </Form>
+</MetaDataObject>
+"""
+
+
+class TestMetadataParser(BaseCase):
+
+    def test_01_parse_object_file(self):
+        """Тест: объект, реквизиты и табличная часть разбираются из файла выгрузки"""
+        data = metadata_parser.parse_object_file(CATALOG_XML)
+
+        self.assertEqual(data['type_tag'], 'Catalog')
+        self.assertEqual(data['technical_name'], 'Items')
+        self.assertEqual(data['technical_guid'], '0b6a1f9e-1111-4c2d-9a8b-000000000001')
+        self.assertEqual(data['description'], 'Номенклатура')
+        self.assertEqual(data['content_hash'], metadata_parser.content_hash(CATALOG_XML))
+
+        attributes = data['attributes']
+        self.assertEqual([attr['technical_name'] for attr in attributes], ['Unit', 'Weight', 'Barcodes'])
+        self.assertEqual([attr['sequence'] for attr in attributes], [10, 20, 30])
+        self.assertEqual(attributes[0]['type_technical_name'], 'Catalog')
+        self.assertEqual(attributes[0]['description'], 'Единица')
+        self.assertIsNone(attributes[1]['type_technical_name'])
+        self.assertEqual([child['technical_name'] for child in attributes[2]['children']], ['Barcode'])
+
+    def test_02_unsupported_objects(self):
+        """Тест: объекты неподдерживаемых типов и объекты без имени пропускаются"""
+        self.assertIsNone(metadata_parser.parse_object_file(FORM_XML))
+        nameless = CATALOG_XML.replace(b'<Name>Items</Name>', b'')
+        self.assertIsNone(metadata_parser.parse_object_file(nameless))
+
+    def test_03_malformed_xml(self):
+        """Тест: некорректный XML приводит к ошибке разбора, а не к пустому объекту"""
+        with self.assertRaises(etree.XMLSyntaxError):
+            metadata_parser.parse_object_file(CATALOG_XML[:200])
+        with self.assertRaises(etree.XMLSyntaxError):
+            metadata_parser.parse_object_file(b'')
+
+    def test_04_content_hash(self):
+        """Тест: хэш зависит только от содержимого файла"""
+        changed = CATALOG_XML.replace(b'Weight', b'Volume')
+        self.assertEqual(metadata_parser.content_hash(CATALOG_XML), metadata_parser.content_hash(bytes(CATALOG_XML)))
+        self.assertNotEqual(metadata_parser.content_hash(CATALOG_XML), metadata_parser.content_hash(changed))
+        self.assertEqual(len(metadata_parser.content_hash(CATALOG_XML)), 40)
+
+    def test_05_known_hashes_are_not_parsed(self):
+        """Тест: файлы с известным хэшем не разбираются"""
+        with tempfile.TemporaryDirectory() as location:
+            os.mkdir(os.path.join(location, 'Catalogs'))
+            with open(os.path.join(location, 'Catalogs', 'Items.xml'), 'wb') as f:
+                f.write(CATALOG_XML)
+            known = frozenset([metadata_parser.content_hash(CATALOG_XML)])
+
+            [(hash_value, data)] = metadata_parser.parse_dump_files(location, ['Catalogs/Items.xml'], known)
+            self.assertIn(hash_value, known)
+            self.assertIsNone(data)
+
+            [(hash_value, data)] = metadata_parser.parse_dump_files(location, ['Catalogs/Items.xml'])
+            self.assertEqual(data['content_hash'], hash_value)
+
+    def test_06_list_dump_files(self):
+        """Тест: в выгрузке отбираются только файлы объектов верхнего уровня каталогов типов"""
+        with tempfile.TemporaryDirectory() as location:
+            archive_path = os.path.join(location, 'dump.zip')
+            with zipfile.ZipFile(archive_path, 'w') as archive:
+                archive.writestr('Configuration.xml', b'<Configuration/>')
+                archive.writestr('Catalogs/Items.xml', CATALOG_XML)
+                archive.writestr('Catalogs/Items/Forms/ItemForm.xml', FORM_XML)
+                archive.writestr('Catalogs/Items/Ext/ObjectModule.bsl', b'')
+                archive.writestr('Documents/Orders.xml', CATALOG_XML)
+            with zipfile.ZipFile(archive_path) as archive:
+                self.assertEqual(
+                    sorted(metadata_parser.list_dump_files(archive)),
+                    ['Catalogs/Items.xml', 'Documents/Orders.xml'],
+                )
+
+            [(_hash, data)] = metadata_parser.parse_dump_files(archive_path, ['Catalogs/Items.xml'])
+            self.assertEqual(data['technical_name'], 'Items')
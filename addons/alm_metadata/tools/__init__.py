@@ -0,0 +1 @@
+from . import metadata_parser
@@ -0,0 +1,215 @@
+"""
+Parsing of 1C configuration dumps (DumpConfigToFiles).
+
+The functions here do not touch the ORM, so they can run outside of the
+Odoo worker. They take raw file contents and return plain dicts.
+"""
+import hashlib
+import os
+import zipfile
+
+from lxml import etree
+
+MD_NAMESPACE = 'http://v8.1c.ru/8.3/MDClasses'
+V8_NAMESPACE = 'http://v8.1c.ru/8.1/data/core'
+
+NAMESPACES = {
+    'md': MD_NAMESPACE,
+    'v8': V8_NAMESPACE,
+}
+
+# Тег объекта в выгрузке -> технический код типа alm.metadata.object.type
+TYPE_MAPPING = {
+    'Catalog': 'Catalog',
+    'Document': 'Document',
+    'Report': 'Report',
+    'DataProcessor': 'DataProcessor',
+    'ExchangePlan': 'ExchangePlan',
+    'ChartOfCharacteristicTypes': 'ChartOfCharacteristicTypes',
+    'ChartOfAccounts': 'ChartOfAccounts',
+    'ChartOfCalculationTypes': 'ChartOfCalculationTypes',
+    'InformationRegister': 'InformationRegister',
+    'AccumulationRegister': 'AccumulationRegister',
+    'AccountingRegister': 'AccountingRegister',
+    'CalculationRegister': 'CalculationRegister',
+    'BusinessProcess': 'BusinessProcess',
+    'Task': 'Task',
+    'CommonModule': 'CommonModule',
+    'Role': 'Role',
+    'Subsystem': 'Subsystem',
+    'Constant': 'Constant',
+    'Enum': 'Enumeration',
+    'XDTOPackage': 'XDTO_Package'
+}
+
+# Ссылочные типы реквизитов -> технический код типа объекта
+REFERENCE_TYPE_MAPPING = {
+    'CatalogRef': 'Catalog',
+    'DocumentRef': 'Document',
+    'EnumRef': 'Enumeration',
+    'ExchangePlanRef': 'ExchangePlan',
+    'ChartOfCharacteristicTypesRef': 'ChartOfCharacteristicTypes',
+    'ChartOfAccountsRef': 'ChartOfAccounts',
+    'ChartOfCalculationTypesRef': 'ChartOfCalculationTypes',
+    'BusinessProcessRef': 'BusinessProcess',
+    'TaskRef': 'Task',
+}
+
+# Элементы ChildObjects, которые загружаются как реквизиты
+ATTRIBUTE_TAGS = {
+    'Attribute', 'Dimension', 'Resource', 'AddressingAttribute',
+    'AccountingFlag', 'ExtDimensionAccountingFlag',
+}
+TABULAR_SECTION_TAGS = {'TabularSection'}
+
+CONFIGURATION_FILE = 'Configuration.xml'
+
+
+def list_dump_files(source):
+    """
+    Returns the paths of all per-object XML files of a dump.
+    source is either an opened zipfile.ZipFile or a directory path.
+    Only files directly inside a type folder (e.g. Catalogs/Items.xml)
+    are object descriptions; forms, modules and templates are skipped.
+    """
+    if isinstance(source, zipfile.ZipFile):
+        return [info.filename for info in source.infolist() if not info.is_dir() and is_object_file(info.filename)]
+
+    paths = []
+    for folder in sorted(os.listdir(source)):
+        folder_path = os.path.join(source, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for file_name in sorted(os.listdir(folder_path)):
+            relative_path = '%s/%s' % (folder, file_name)
+            if is_object_file(relative_path):
+                paths.append(relative_path)
+    return paths
+
+
+def read_dump_file(source, path):
+    if isinstance(source, zipfile.ZipFile):
+        return source.read(path)
+    with open(os.path.join(source, *path.split('/')), 'rb') as f:
+        return f.read()
+
+
+def parse_dump_files(location, paths, known_hashes=frozenset()):
+    """
+    Parses a chunk of object files and returns [(content_hash, data)] in
+    the order of paths. Files whose hash is in known_hashes are not parsed
+    (data is None). Meant to run in worker processes, so the dump is passed
+    as a ZIP file name or a directory path instead of an open object.
+    """
+    results = []
+    if os.path.isdir(location):
+        for path in paths:
+            results.append(_parse_dump_file(read_dump_file(location, path), known_hashes))
+        return results
+    with zipfile.ZipFile(location) as archive:
+        for path in paths:
+            results.append(_parse_dump_file(read_dump_file(archive, path), known_hashes))
+    return results
+
+
+def _parse_dump_file(content, known_hashes):
+    hash_value = content_hash(content)
+    if hash_value in known_hashes:
+        return hash_value, None
+    return hash_value, parse_object_file(content, hash_value)
+
+
+def is_object_file(path):
+    parts = path.replace('\\', '/').strip('/').split('/')
+    return len(parts) == 2 and parts[1].lower().endswith('.xml')
+
+
+def content_hash(content):
+    """
+    Hash of a per-object file. The file holds the object together with its
+    whole attribute subtree, so equal hashes mean an unchanged subtree.
+    """
+    return hashlib.sha1(content).hexdigest()
+
+
+def parse_object_file(content, hash_value=None):
+    """
+    Parses one per-object XML file.
+    Returns {'type_tag', 'technical_name', 'technical_guid', 'description',
+    'content_hash', 'attributes': [{..., 'children': [...]}]} or None for
+    unsupported objects. hash_value is content_hash(content) when the
+    caller has already computed it. Malformed XML raises XMLSyntaxError.
+    """
+    root = etree.fromstring(content)
+    for elem in root:
+        if not isinstance(elem.tag, str):
+            continue
+        type_tag = etree.QName(elem).localname
+        if type_tag not in TYPE_MAPPING:
+            return None
+        properties = elem.find('md:Properties', NAMESPACES)
+        name = _get_text(properties, 'md:Name')
+        if not name:
+            return None
+        return {
+            'type_tag': type_tag,
+            'technical_name': name,
+            'technical_guid': elem.get('uuid'),
+            'description': _get_synonym(properties),
+            'content_hash': hash_value or content_hash(content),
+            'attributes': _parse_child_objects(elem),
+        }
+    return None
+
+
+def _parse_child_objects(elem):
+    attributes = []
+    child_objects = elem.find('md:ChildObjects', NAMESPACES)
+    if child_objects is None:
+        return attributes
+
+    sequence = 0
+    for child in child_objects:
+        if not isinstance(child.tag, str):
+            continue
+        tag = etree.QName(child).localname
+        if tag not in ATTRIBUTE_TAGS and tag not in TABULAR_SECTION_TAGS:
+            continue
+        properties = child.find('md:Properties', NAMESPACES)
+        name = _get_text(properties, 'md:Name')
+        if not name:
+            continue
+        sequence += 10
+        attributes.append({
+            'technical_name': name,
+            'description': _get_synonym(properties),
+            'type_technical_name': _get_reference_type(properties),
+            'sequence': sequence,
+            'children': _parse_child_objects(child) if tag in TABULAR_SECTION_TAGS else [],
+        })
+    return attributes
+
+
+def _get_text(parent, path):
+    if parent is None:
+        return None
+    elem = parent.find(path, NAMESPACES)
+    return elem.text.strip() if elem is not None and elem.text else None
+
+
+def _get_synonym(properties):
+    if properties is None:
+        return None
+    content = properties.find('md:Synonym/v8:item/v8:content', NAMESPACES)
+    return content.text if content is not None else None
+
+
+def _get_reference_type(properties):
+    """Type code of a single reference type (cfg:CatalogRef.Items -> Catalog)."""
+    if properties is None:
+        return None
+    types = properties.findall('md:Type/v8:Type', NAMESPACES)
+    if len(types) != 1 or not types[0].text:
+        return None
+    type_name = types[0].text.split(':')[-1].split('.')[0]
+    return REFERENCE_TYPE_MAPPING.get(type_name)
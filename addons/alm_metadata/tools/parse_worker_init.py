@@ -0,0 +1,15 @@
+"""
+Initializer of the dump parsing worker processes.
+
+Workers are started with the 'spawn' method: a fresh interpreter does not
+inherit the threads, locks and database connections of the Odoo worker,
+but it does not know the addons path either. The pool runs this file with
+runpy.run_path() before any task is unpickled; ADDONS_PATHS is passed in
+init_globals and makes odoo.addons.alm_metadata importable. Workers only
+import the ORM-free tools.metadata_parser and never open a cursor.
+"""
+import odoo.addons
+
+for path in ADDONS_PATHS:  # noqa: F821 (задается через init_globals)
+    if path not in odoo.addons.__path__:
+        odoo.addons.__path__.append(path)
@@ -1,7 +1,6 @@
 from odoo import api, fields, models, _
+from odoo.addons.alm_diagram.tools.mxgraph import extract_root
 import base64
-import zlib
-import urllib.parse
 import logging
 import re
 from lxml import etree
@@ -13,7 +12,12 @@ _logger = logging.getLogger(__name__)
 class TestCase(models.Model):
     _name = 'alm.test.case'
     _description = 'Test Case'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'alm.diagram.mixin']
+    _diagram_data_field = 'diagram_data'
+    _diagram_revision_fields = (
+        'name', 'test_case_number', 'test_type', 'test_framework',
+        'gherkin_script', 'includes_ids', 'included_in_ids',
+    )
 
     name = fields.Char(string='Name', required=True, tracking=True)
     description = fields.Html(string='Description')
@@ -236,38 +240,20 @@ class TestCase(models.Model):
         for record in self:
             record.state = 'draft'
 
-    diagram_data = fields.Text(string="Hierarchy Diagram")
-
-    def _extract_diagram_root(self, xml_data):
-        if not xml_data:
-            return None
-        try:
-            if xml_data.strip().startswith('<mxfile'):
-                root = etree.fromstring(xml_data.encode('utf-8'))
-                diagram_elem = root.find('diagram')
-                if diagram_elem is not None and diagram_elem.text is not None:
-                    diagram_content = diagram_elem.text
-                    try:
-                        decoded = base64.b64decode(diagram_content)
-                        decompressed = zlib.decompress(decoded, -15)
-                        unquoted = urllib.parse.unquote(decompressed.decode('utf-8'))
-                        return etree.fromstring(unquoted.encode('utf-8'))
-                    except (base64.binascii.Error, zlib.error, UnicodeDecodeError, etree.XMLSyntaxError):
-                        # Fallback for plain XML inside diagram tag
-                        try:
-                            return etree.fromstring(diagram_content.encode('utf-8'))
-                        except etree.XMLSyntaxError:
-                             _logger.warning("Could not parse diagram content, even as plain XML.", exc_info=True)
-                             return None
-                return None
-            else:
-                return etree.fromstring(xml_data.encode('utf-8'))
-        except (etree.XMLSyntaxError, Exception) as e:
-            _logger.warning(f"Error parsing diagram XML: {e}", exc_info=True)
-            return None
+    diagram_data = fields.Text(string="Hierarchy Diagram", compute='_compute_diagram_data', inverse='_inverse_diagram_data')
 
     def action_generate_hierarchy_diagram_xml(self, current_diagram_xml=None):
         self.ensure_one()
+        all_cases_to_draw = self._get_all_related_cases()
+        # На диаграмме вся связанная иерархия, поэтому в ключ входят ревизии всех её тестов
+        revisions = tuple(sorted(zip(all_cases_to_draw.ids, all_cases_to_draw.mapped('diagram_revision'))))
+        return self._get_cached_diagram_xml(
+            lambda: self._generate_hierarchy_diagram_xml(all_cases_to_draw, current_diagram_xml),
+            revisions,
+            current_diagram_xml,
+        )
+
+    def _generate_hierarchy_diagram_xml(self, all_cases_to_draw, current_diagram_xml):
         _logger.info(f"Generating detailed hierarchy diagram for test case: {self.name}")
 
         # Constants
@@ -277,8 +263,7 @@ class TestCase(models.Model):
         ENTITY_Y_GAP = 50
         START_X, START_Y = 50, 50
 
-        # 1. Gather all cases and prepare color mapping
-        all_cases_to_draw = self._get_all_related_cases()
+        # 1. Prepare color mapping for all related cases
         path_colors = self._get_path_colors(all_cases_to_draw)
 
         # 2. Parse existing positions
@@ -387,7 +372,7 @@ class TestCase(models.Model):
         if not xml_data:
             return {'warning': 'No XML data received.'}
 
-        xml_root = self._extract_diagram_root(xml_data)
+        xml_root = extract_root(xml_data)
         if xml_root is None:
             return {'warning': 'Could not parse diagram XML.'}
 
@@ -458,36 +443,17 @@ class TestCase(models.Model):
         return all_cases
 
     def _get_path_colors(self, all_cases):
-        """Assign a consistent color to each unique call path."""
-        import random
-
-        path_keys = set()
-        for case in all_cases:
-            for included in case.includes_ids:
-                path_keys.add(f"{case.id}-{included.id}")
-
-        predefined_colors = [
-            '#e6194B', '#3cb44b', '#ffe119', '#4363d8', '#f58231',
-            '#911eb4', '#42d4f4', '#f032e6', '#bfef45', '#fabed4',
-            '#469990', '#dcbeff', '#9A6324', '#fffac8', '#800000',
-            '#aaffc3', '#808000', '#ffd8b1', '#000075', '#a9a9a9'
-        ]
-        random.shuffle(predefined_colors)
-
-        path_colors = {}
-        for key in sorted(list(path_keys)):
-            if predefined_colors:
-                path_colors[key] = predefined_colors.pop(0)
-            else:
-                path_colors[key] = '#' + ''.join(random.choice('0123456789ABCDEF') for j in range(6))
-        return path_colors
+        """Assign a stable color to each unique call path."""
+        return self._get_diagram_path_colors(
+            f"{case.id}-{included.id}" for case in all_cases for included in case.includes_ids
+        )
 
     def _parse_existing_positions(self, xml_data):
         """Parse XML to get existing node positions."""
         positions = {}
         if not xml_data:
             return positions
-        xml_root = self._extract_diagram_root(xml_data)
+        xml_root = extract_root(xml_data)
         if xml_root is not None:
             # Find all vertexes that are direct children of layer '1' and have an odoo_id
             for cell in xml_root.xpath("//mxCell[@vertex='1' and @odoo_id and @parent='1']"):
@@ -3,7 +3,10 @@ from odoo import fields, models
 class TestCaseScenario(models.Model):
     _name = 'alm.test.case.scenario'
     _description = 'Test Case Scenario'
+    _inherit = ['alm.diagram.item.mixin']
     _order = 'sequence, id'
+    _diagram_owner_field = 'test_case_id'
+    _diagram_item_fields = ('name', 'sequence')
 
     name = fields.Char(string='Name', required=True)
     parameters = fields.Char(string='Parameters')
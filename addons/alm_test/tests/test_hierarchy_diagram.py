@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class TestHierarchyDiagram(TransactionCase):
+
+    def setUp(self):
+        super(TestHierarchyDiagram, self).setUp()
+        self.TestCase = self.env['alm.test.case']
+        self.login, self.cart, self.payment = self.TestCase.create([
+            {'name': name, 'test_type': 'library', 'test_framework': 'manual'}
+            for name in ('Login', 'Cart', 'Payment')
+        ])
+        self.checkout = self.TestCase.create({
+            'name': 'Checkout', 'test_framework': 'manual',
+            'includes_ids': [(6, 0, (self.login | self.cart).ids)],
+        })
+
+    def _path_key(self, included):
+        return '%s-%s' % (self.checkout.id, included.id)
+
+    def test_01_regenerated_xml_identical(self):
+        """Тест: при неизменной иерархии диаграмма генерируется байт в байт одинаково"""
+        xml = self.checkout.action_generate_hierarchy_diagram_xml()
+        self.assertEqual(self.checkout.action_generate_hierarchy_diagram_xml(), xml)
+        # Повторная генерация в обход кэша даёт тот же XML
+        cases = self.checkout._get_all_related_cases()
+        self.assertEqual(self.checkout._generate_hierarchy_diagram_xml(cases, None), xml)
+
+    def test_02_path_colors_persisted(self):
+        """Тест: цвета путей сохраняются в тесте и не перезаписываются без изменений"""
+        self.checkout.action_generate_hierarchy_diagram_xml()
+        colors = self.checkout.diagram_path_colors
+        self.assertEqual(set(colors), {self._path_key(self.login), self._path_key(self.cart)})
+        self.assertEqual(len(set(colors.values())), 2)
+
+        writes = []
+        original_write = type(self.TestCase).write
+
+        def write(records, vals):
+            writes.append(vals)
+            return original_write(records, vals)
+
+        with patch.object(type(self.TestCase), 'write', write):
+            self.checkout._get_path_colors(self.checkout._get_all_related_cases())
+        self.assertEqual(writes, [])
+
+    def test_03_new_include_keeps_colors(self):
+        """Тест: новое включение не меняет цвета уже нарисованных путей"""
+        self.checkout.action_generate_hierarchy_diagram_xml()
+        colors = dict(self.checkout.diagram_path_colors)
+
+        self.checkout.includes_ids = [(4, self.payment.id)]
+        self.checkout.action_generate_hierarchy_diagram_xml()
+        new_colors = self.checkout.diagram_path_colors
+        self.assertEqual({key: new_colors[key] for key in colors}, colors)
+        self.assertNotIn(new_colors[self._path_key(self.payment)], colors.values())